@@ -0,0 +1,58 @@
+'''
+Measures how long `import library_project` takes in a fresh interpreter and fails if it is
+over budget or if it pulls in the modules that are meant to be imported lazily.
+
+Usage (from the repository root):
+    python benchmarks/bench_import.py [--runs 10] [--budget 0.25]
+
+The reported time excludes interpreter start-up (measured with an empty `python -c pass`).
+'''
+import argparse
+import os
+import statistics
+import subprocess
+import sys
+import time
+
+MODULES = os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'modules')
+# Modules that must not be imported until text is analyzed or a chart is drawn
+LAZY_MODULES = ('nltk', 'matplotlib')
+
+CHECK = (
+    'import sys, library_project; '
+    'print(",".join(sorted({name.split(".")[0] for name in sys.modules} & set(sys.argv[1:]))))'
+)
+
+
+def time_command(args, runs):
+    '''Returns the median wall time of running args in a subprocess.'''
+    timings = []
+    for _ in range(runs):
+        start = time.perf_counter()
+        subprocess.run(args, cwd=MODULES, check=True, stdout=subprocess.DEVNULL)
+        timings.append(time.perf_counter() - start)
+    return statistics.median(timings)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--runs', type=int, default=10)
+    parser.add_argument('--budget', type=float, default=0.25, help='seconds allowed for the import itself')
+    args = parser.parse_args()
+
+    loaded = subprocess.run([sys.executable, '-c', CHECK, *LAZY_MODULES], cwd=MODULES, check=True,
+                            capture_output=True, text=True).stdout.strip()
+    baseline = time_command([sys.executable, '-c', 'pass'], args.runs)
+    total = time_command([sys.executable, '-c', 'import library_project'], args.runs)
+    import_time = total - baseline
+
+    print(f'interpreter start-up: {baseline * 1000:7.1f} ms')
+    print(f'import library_project: {import_time * 1000:5.1f} ms (budget {args.budget * 1000:.0f} ms)')
+    if loaded:
+        sys.exit(f'importing library_project also imported: {loaded}')
+    if import_time > args.budget:
+        sys.exit('import time is over budget')
+
+
+if __name__ == '__main__':
+    main()
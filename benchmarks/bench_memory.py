@@ -0,0 +1,112 @@
+'''
+Measures the memory used per book, comparing the compact Book (__slots__, word tallies as
+vocabulary id and count arrays, interned metadata) with the previous layout (a per-instance
+__dict__ and a dict word tally per book).
+
+Usage (from the repository root):
+    python benchmarks/bench_memory.py [--books 20000] [--words 300]
+
+Memory is the growth of Python allocations seen by tracemalloc while the books are built.
+Strings are created fresh for every book, as they are when records are read from a file.
+'''
+import argparse
+import os
+import random
+import sys
+import tracemalloc
+
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'modules'))
+from library_project import Book, Library
+
+GENRES = ('Fantasy', 'Mystery', 'Classic Literature', 'Dystopian Fiction', 'Romance', 'History')
+VOCABULARY_SIZE = 20000
+
+
+class LegacyBook():
+    '''The previous layout of a Book: attributes in a __dict__ and the word tally as a dict.'''
+
+    def __init__(self, isbn, genre, book_info, word_dict):
+        self.isbn = isbn
+        self.genre = genre
+        self._text = []
+        self.title, self.authors, self.publisher, self.year = book_info
+        self._bookmark = 0
+        self._favorite = 0
+        self._observers = []
+        self._page_index = None
+        self._word_count = sum(word_dict.values()) if word_dict else None
+        self._word_dict = word_dict
+
+
+def fresh(text):
+    '''Returns an equal string that is a new object, like a value parsed from a file.'''
+    return ''.join(list(text))
+
+
+def make_records(books, words, seed=0):
+    '''Builds (isbn, genre, book_info, word_dict) tuples with freshly allocated strings.'''
+    rng = random.Random(seed)
+    vocabulary = [f'word{number}' for number in range(VOCABULARY_SIZE)]
+    records = []
+    for number in range(books):
+        word_dict = {fresh(word): rng.randint(1, 20) for word in rng.sample(vocabulary, words)} if words else None
+        book_info = (f'Synthetic Book {number}', [fresh(f'Author {rng.randrange(500)}')],
+                     fresh('Benchmark Press'), str(1900 + number % 120))
+        records.append((f'978{number:010d}', fresh(rng.choice(GENRES)), book_info, word_dict))
+    return records
+
+
+def legacy_books(records):
+    '''Builds books with the previous layout.'''
+    return [LegacyBook(isbn, genre, book_info, word_dict) for isbn, genre, book_info, word_dict in records]
+
+
+def compact_books(records):
+    '''Builds Book objects, storing each word tally against the shared vocabulary.'''
+    books = []
+    for isbn, genre, book_info, word_dict in records:
+        book = Book(isbn, genre, book_info=book_info)
+        if word_dict is not None:
+            book._store_analysis(sum(word_dict.values()), word_dict)
+        books.append(book)
+    return books
+
+
+def compact_library(records):
+    '''Builds Book objects and adds them to a Library, which interns their metadata.'''
+    library = Library()
+    for book in compact_books(records):
+        library.add_book(book)
+    return library
+
+
+def bytes_per_book(build, books, words):
+    '''Returns the memory still allocated after reading records and building books from them, per book.'''
+    tracemalloc.start()
+    before = tracemalloc.get_traced_memory()[0]
+    # Whatever the books do not keep from the records is freed before measuring
+    result = build(make_records(books, words))
+    after = tracemalloc.get_traced_memory()[0]
+    tracemalloc.stop()
+    del result
+    return (after - before) / books
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--books', type=int, default=20000)
+    parser.add_argument('--words', type=int, default=300, help='distinct words in each analyzed book')
+    args = parser.parse_args()
+
+    for words, label in ((0, 'metadata only'), (args.words, f'analyzed, {args.words} distinct words')):
+        legacy = bytes_per_book(legacy_books, args.books, words)
+        compact = bytes_per_book(compact_books, args.books, words)
+        library = bytes_per_book(compact_library, args.books, words)
+        print(f'{label}:')
+        print(f'  previous Book layout      {legacy:10.0f} bytes per book')
+        print(f'  compact Book              {compact:10.0f} bytes per book ({compact / legacy:.0%})')
+        print(f'  compact Book in a Library {library:10.0f} bytes per book (with the lookup indexes)')
+
+
+if __name__ == '__main__':
+    main()
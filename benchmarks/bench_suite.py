@@ -0,0 +1,237 @@
+'''
+Benchmarks ingestion, analysis, search and export on synthetic libraries, reporting the time
+and peak memory of each operation, and optionally compares the results with an earlier run.
+
+Usage (from the repository root):
+    python benchmarks/bench_suite.py [--books 200 2000] [--pages 20] [--words 250]
+                                     [--output results.json] [--compare baseline.json]
+
+isbnlib.meta is replaced by a stub, so no network access is needed. tally_words needs the
+nltk corpora (see setup_nltk) and is reported as skipped when they are missing.
+
+Each case is timed with time.perf_counter (best of --repeat runs); its peak memory is the
+largest Python allocation seen by tracemalloc during one more run. Save a run with --output
+on one version and pass that file to --compare on another: cases slower than the baseline by
+more than --tolerance are listed and the script exits with status 1.
+'''
+import argparse
+import csv
+import itertools
+import json
+import os
+import platform
+import random
+import sys
+import tempfile
+import time
+import tracemalloc
+
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'modules'))
+import library_project
+from library_project import Book, Library, csv_to_dict
+
+COMMON_WORDS = (
+    'the young wizard stepped into a world unseen where magic breathed life into very stones '
+    'hidden corridors whispered secrets of ancient spells walls echoing with yore was were is '
+    'running quickly dancing shadows light played across grand hall casting enchantments old '
+    'detective found clue butler did it truth commodity few could afford words became whispers'
+).split()
+SYLLABLES = ('ka', 'lo', 'mir', 'den', 'sa', 'tor', 'vi', 'nel', 'ro', 'bas', 'qui', 'fen')
+# Distinct words in the corpus; word frequencies follow Zipf's law like natural text
+VOCABULARY_SIZE = 20000
+GENRES = ('Fantasy', 'Mystery', 'Classic Literature', 'Dystopian Fiction', 'Romance', 'History')
+AUTHOR_POOL = 500
+# Number of quotes and titles looked up by the search cases
+LOOKUPS = 200
+
+
+def make_corpus(books, pages, words, seed=0):
+    '''
+    Builds synthetic book records and the metadata the stubbed isbnlib.meta returns for them.
+
+    Args:
+        books (int): Number of books.
+        pages (int): Pages per book.
+        words (int): Words per page.
+        seed (int): Random seed, so runs on different versions see the same corpus.
+
+    Returns:
+        tuple: A list of records (dicts with 'isbn', 'genre' and 'text', as read by iter_csv)
+               and a dict of ISBN -> isbnlib-style metadata.
+    '''
+    rng = random.Random(seed)
+    vocabulary = list(COMMON_WORDS)
+    while len(vocabulary) < VOCABULARY_SIZE:
+        vocabulary.append(''.join(rng.choices(SYLLABLES, k=rng.randint(2, 4))))
+    cum_weights = list(itertools.accumulate(1 / rank for rank in range(1, len(vocabulary) + 1)))
+    records = []
+    metadata = {}
+    for number in range(books):
+        isbn = f'978{number:010d}'
+        text = [' '.join(rng.choices(vocabulary, cum_weights=cum_weights, k=words)) for _ in range(pages)]
+        records.append({'isbn': isbn, 'genre': rng.choice(GENRES), 'text': text})
+        metadata[isbn] = {'Title': f'Synthetic Book {number}',
+                          'Authors': [f'Author {rng.randrange(AUTHOR_POOL)}'],
+                          'Publisher': 'Benchmark Press', 'Year': str(1900 + number % 120)}
+    return records, metadata
+
+
+def stub_isbnlib(metadata):
+    '''Makes isbnlib.meta answer from metadata instead of the network.'''
+    library_project.isbnlib.meta = lambda isbn, *args, **kwargs: metadata[isbn]
+    Book.metadata_cache = None
+
+
+def build_library(records):
+    '''Builds a library from records, looking metadata up through the stubbed isbnlib.meta.'''
+    library = Library()
+    for record in records:
+        library.add_book(Book(record['isbn'], record['genre'], record['text']))
+    return library
+
+
+def write_import_csv(records, path):
+    '''Writes records in the CSV format read by csv_to_dict.'''
+    with open(path, 'w', encoding='utf-8', newline='') as file:
+        writer = csv.writer(file)
+        for record in records:
+            writer.writerow([record['isbn'], record['genre'], repr(record['text'])])
+
+
+def nltk_available():
+    '''Checks whether the nltk corpora needed by tally_words are installed.'''
+    try:
+        Book.stopword_list
+        Book.lemmatizer.lemmatize('books')
+        library_project.tokenize_pages(['A page.'])
+    except LookupError:
+        return False
+    return True
+
+
+def cases(records, workdir, analyze_books):
+    '''
+    Returns the benchmark cases for one corpus, in order.
+
+    Each case is (name, setup): setup prepares fresh state and returns the callable to measure,
+    so state changed by one run (e.g. sorting) does not leak into the next.
+    '''
+    rng = random.Random(1)
+    quotes = []
+    for _ in range(LOOKUPS):
+        words = rng.choice(rng.choice(records)['text']).split()
+        start = rng.randrange(max(1, len(words) - 4))
+        quotes.append(' '.join(words[start:start + 4]))
+    titles = [f'Synthetic Book {rng.randrange(len(records))}' for _ in range(LOOKUPS)]
+    csv_path = os.path.join(workdir, 'import.csv')
+    export_path = os.path.join(workdir, 'export.csv')
+    write_import_csv(records, csv_path)
+    library = build_library(records)
+    indexed = build_library(records)
+    indexed.search_by_quote(quotes[0])
+
+    def tally_words():
+        books = [Book(record['isbn'], record['genre'], record['text']) for record in records[:analyze_books]]
+        return lambda: [book.tally_words() for book in books]
+
+    def search_quotes(target):
+        return lambda: [target.search_by_quote(quote) for quote in quotes]
+
+    def search_titles():
+        return [library.search_by_title(title) for title in titles]
+
+    def sorted_view(target):
+        # Builds the view, then reads one page from its middle
+        return lambda: target.sorted_view('-year', 'title').page(len(records) // 100, page_size=50)
+
+    return [
+        ('book_construction', lambda: lambda: build_library(records)),
+        ('tally_words', tally_words),
+        # The first quote search also builds the library's full-text index
+        ('search_by_quote_cold', lambda: search_quotes(build_library(records))),
+        ('search_by_quote', lambda: search_quotes(indexed)),
+        ('search_many', lambda: lambda: indexed.search_many(quotes, titles)),
+        ('search_by_title', lambda: search_titles),
+        ('sort_by_author', lambda: build_library(records).sort_by_author),
+        ('sorted_view', lambda: sorted_view(build_library(records))),
+        ('export_to_csv', lambda: lambda: library.export_to_csv(export_path)),
+        ('csv_to_dict', lambda: lambda: csv_to_dict(csv_path)),
+    ]
+
+
+def measure(setup, repeat):
+    '''Returns the best time of repeat runs and the peak traced memory of one more run.'''
+    best = None
+    for _ in range(repeat):
+        run = setup()
+        start = time.perf_counter()
+        run()
+        elapsed = time.perf_counter() - start
+        best = elapsed if best is None else min(best, elapsed)
+    run = setup()
+    tracemalloc.start()
+    run()
+    peak = tracemalloc.get_traced_memory()[1]
+    tracemalloc.stop()
+    return {'seconds': best, 'peak_bytes': peak}
+
+
+def compare(results, baseline, tolerance):
+    '''Prints the change of every case present in both runs and returns the regressed cases.'''
+    regressions = []
+    for key, result in results.items():
+        old = baseline.get(key)
+        if old is None or not old['seconds']:
+            continue
+        ratio = result['seconds'] / old['seconds']
+        print(f'{key:<36} {old["seconds"] * 1000:10.1f} ms -> {result["seconds"] * 1000:10.1f} ms  x{ratio:5.2f}')
+        if ratio > 1 + tolerance:
+            regressions.append(key)
+    return regressions
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--books', type=int, nargs='+', default=[200], help='library sizes to run')
+    parser.add_argument('--pages', type=int, default=20, help='pages per book')
+    parser.add_argument('--words', type=int, default=250, help='words per page')
+    parser.add_argument('--analyze-books', type=int, default=5, help='books analyzed by the tally_words case')
+    parser.add_argument('--repeat', type=int, default=3)
+    parser.add_argument('--only', nargs='+', help='run only these cases')
+    parser.add_argument('--output', help='write the results to this JSON file')
+    parser.add_argument('--compare', help='JSON file of an earlier run to compare with')
+    parser.add_argument('--tolerance', type=float, default=0.2, help='allowed slowdown before a case counts as a regression')
+    args = parser.parse_args()
+
+    analyze = nltk_available()
+    if not analyze:
+        print('nltk corpora not installed: skipping tally_words')
+    results = {}
+    for books in args.books:
+        records, metadata = make_corpus(books, args.pages, args.words)
+        stub_isbnlib(metadata)
+        with tempfile.TemporaryDirectory() as workdir:
+            for name, setup in cases(records, workdir, args.analyze_books):
+                if (args.only and name not in args.only) or (name == 'tally_words' and not analyze):
+                    continue
+                key = f'{name}[books={books}]'
+                results[key] = measure(setup, args.repeat)
+                print(f'{key:<36} {results[key]["seconds"] * 1000:10.1f} ms  '
+                      f'peak {results[key]["peak_bytes"] / 2 ** 20:8.2f} MiB')
+
+    if args.output:
+        report = {'python': platform.python_version(), 'pages': args.pages, 'words': args.words,
+                  'results': results}
+        with open(args.output, 'w') as file:
+            json.dump(report, file, indent=2)
+    if args.compare:
+        with open(args.compare) as file:
+            baseline = json.load(file)['results']
+        print(f'\ncompared with {args.compare}:')
+        regressions = compare(results, baseline, args.tolerance)
+        if regressions:
+            sys.exit(f'slower than the baseline by more than {args.tolerance:.0%}: {", ".join(regressions)}')
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,79 @@
+'''
+Measures tokenization throughput (tokens per second) of Book.tally_words against the
+original one-page-at-a-time implementation, and checks that both give the same word_dict.
+
+Usage (from the repository root, with the nltk corpora installed):
+    python benchmarks/bench_tokenize.py [--pages 400] [--words 250]
+'''
+import argparse
+import os
+import random
+import sys
+import time
+
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'modules'))
+import nltk
+from library_project import Book
+
+VOCABULARY = (
+    'the young wizard stepped into a world unseen where magic breathed life into very stones '
+    'hidden corridors whispered secrets of ancient spells walls echoing with yore was were is '
+    'running quickly dancing shadows light played across grand hall casting enchantments old '
+    'detective found clue butler did it truth commodity few could afford words became whispers'
+).split()
+
+
+def make_pages(pages, words_per_page, seed=0):
+    '''Builds synthetic pages of English-looking text with punctuation and capitals.'''
+    rng = random.Random(seed)
+    text = []
+    for _ in range(pages):
+        words = rng.choices(VOCABULARY, k=words_per_page)
+        words = [word.capitalize() + '.' if rng.random() < 0.08 else word for word in words]
+        text.append(' '.join(words))
+    return text
+
+
+def legacy_tally(book):
+    '''The original per-page tokenizer: one pos_tag call per page, no lemma cache.'''
+    def get_wordnet_pos(treebank_tag):
+        return {'J': 'a', 'V': 'v', 'N': 'n', 'R': 'r'}.get(treebank_tag[0], 'n')
+
+    word_tally = {}
+    for page in book.text:
+        for word, pos in nltk.pos_tag(page.split()):
+            new_word = "".join([char.lower() for char in word if char.isalnum()])
+            lemmatized_word = book.lemmatizer.lemmatize(new_word, pos=get_wordnet_pos(pos))
+            if lemmatized_word not in book.stopword_list:
+                word_tally[lemmatized_word] = word_tally.get(lemmatized_word, 0) + 1
+    return word_tally
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--pages', type=int, default=400)
+    parser.add_argument('--words', type=int, default=250)
+    args = parser.parse_args()
+
+    book = Book('0000000000', text=make_pages(args.pages, args.words),
+                book_info=('Synthetic', ['Nobody'], 'None', '2000'))
+    tokens = args.pages * args.words
+
+    start = time.perf_counter()
+    before = legacy_tally(book)
+    legacy_seconds = time.perf_counter() - start
+
+    start = time.perf_counter()
+    after = book.tally_words()
+    batched_seconds = time.perf_counter() - start
+
+    if before != after or list(before) != list(after):
+        sys.exit('word_dict differs between the legacy and batched tokenizers')
+    print(f'{tokens} tokens on {args.pages} pages')
+    print(f'legacy : {tokens / legacy_seconds:12.0f} tokens/s ({legacy_seconds:.2f} s)')
+    print(f'batched: {tokens / batched_seconds:12.0f} tokens/s ({batched_seconds:.2f} s)')
+    print(f'speedup: {legacy_seconds / batched_seconds:.1f}x')
+
+
+if __name__ == '__main__':
+    main()
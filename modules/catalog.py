@@ -0,0 +1,103 @@
+import sys
+from array import array
+
+# Stored in the year column when a book's year is not a number
+UNKNOWN_YEAR = -1
+
+
+class MetadataColumns():
+    '''
+    Column-oriented store of the metadata a library sorts and groups its books by, indexed by row.
+
+    Genres are stored as small integer codes, so a genre shared by thousands of books is held
+    once, and years are kept in a compact integer array. Titles and authors are not copied here:
+    they are read from the books themselves. Rows of removed books are reused by later additions.
+    '''
+
+    def __init__(self):
+        # Genre code of each row, and code -> genre
+        self.genre_codes = array('I')
+        self.genres = []
+        self._genre_codes = {}
+        self.years = array('i')
+        self._free_rows = []
+
+    def __len__(self):
+        '''
+        Returns the number of stored rows, removed ones excluded.
+
+        Returns:
+            int: The number of books.
+        '''
+        return len(self.years) - len(self._free_rows)
+
+    def genre_code(self, genre):
+        '''
+        Returns the code of a genre, adding the genre if it is new.
+
+        Args:
+            genre (str or None): The genre.
+
+        Returns:
+            int: The code.
+        '''
+        code = self._genre_codes.get(genre)
+        if code is None:
+            if isinstance(genre, str):
+                genre = sys.intern(genre)
+            code = self._genre_codes[genre] = len(self.genres)
+            self.genres.append(genre)
+        return code
+
+    def add(self, genre, year):
+        '''
+        Stores the metadata of one book.
+
+        Args:
+            genre (str or None): The genre.
+            year (str or int): The publication year; anything that is not a number is stored as UNKNOWN_YEAR.
+
+        Returns:
+            int: The row.
+        '''
+        code = self.genre_code(genre)
+        year = _parse_year(year)
+        if self._free_rows:
+            row = self._free_rows.pop()
+            self.genre_codes[row] = code
+            self.years[row] = year
+        else:
+            row = len(self.years)
+            self.genre_codes.append(code)
+            self.years.append(year)
+        return row
+
+    def remove(self, row):
+        '''
+        Frees a row, to be reused by a later add.
+
+        Args:
+            row (int): The row.
+        '''
+        self._free_rows.append(row)
+
+    def genre(self, row):
+        '''
+        Returns the genre stored in a row.
+
+        Args:
+            row (int): The row.
+
+        Returns:
+            str or None: The genre.
+        '''
+        return self.genres[self.genre_codes[row]]
+
+
+def _parse_year(year):
+    '''Converts a year as returned by isbnlib ('2006') to an int, or UNKNOWN_YEAR.'''
+    try:
+        year = int(year)
+    except (TypeError, ValueError):
+        return UNKNOWN_YEAR
+    return year if -2 ** 31 < year < 2 ** 31 else UNKNOWN_YEAR
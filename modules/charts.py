@@ -0,0 +1,96 @@
+import heapq
+import io
+import os
+
+# How each library chart is drawn: title, x axis label, bar color and x tick label layout
+CHART_STYLES = {
+    'author': {'title': 'My Library Author Count', 'xlabel': 'Author', 'color': 'red', 'rotation': 80, 'ha': 'center'},
+    'genre': {'title': 'My Library Genre Count', 'xlabel': 'Genre', 'color': 'blue', 'rotation': 45, 'ha': 'right'},
+}
+# Bars drawn by default when rendering headless; the rest are summed into one "Other" bar
+DEFAULT_TOP = 30
+
+
+def top_counts(counts, top = None, other_label = 'Other'):
+    '''
+    Keeps the largest counts and sums the long tail into a single entry.
+
+    Args:
+        counts (dict): Label -> count.
+        top (int, optional): Number of labels to keep. None keeps every label, in the original order.
+        other_label (str, optional): Label of the entry holding the sum of the others.
+
+    Returns:
+        list of tuple: (label, count) pairs, largest first when top is given.
+    '''
+    if top is None or len(counts) <= top:
+        return list(counts.items())
+    kept = heapq.nlargest(top, counts.items(), key=lambda item: item[1])
+    rest = sum(counts.values()) - sum(count for label, count in kept)
+    if rest:
+        kept.append((other_label, rest))
+    return kept
+
+
+def draw_bars(axes, items, style):
+    '''
+    Draws a bar chart of (label, count) pairs onto matplotlib axes.
+
+    Args:
+        axes (matplotlib.axes.Axes): Where to draw.
+        items (list of tuple): (label, count) pairs.
+        style (dict): One of CHART_STYLES.
+    '''
+    labels = [str(label) for label, count in items]
+    axes.bar(labels, [count for label, count in items], color=style['color'])
+    axes.set_xlabel(style['xlabel'])
+    axes.set_ylabel('Frequency')
+    axes.set_title(style['title'])
+    axes.tick_params(axis='x', labelrotation=style['rotation'])
+    for tick in axes.get_xticklabels():
+        tick.set_horizontalalignment(style['ha'])
+
+
+def make_figure(items, style):
+    '''
+    Builds a bar chart as a standalone Figure on the Agg backend, without touching pyplot state.
+
+    Args:
+        items (list of tuple): (label, count) pairs.
+        style (dict): One of CHART_STYLES.
+
+    Returns:
+        matplotlib.figure.Figure: The chart.
+    '''
+    from matplotlib.figure import Figure
+    from matplotlib.backends.backend_agg import FigureCanvasAgg
+    figure = Figure(figsize=(max(6.4, 0.3 * len(items)), 4.8))
+    FigureCanvasAgg(figure)
+    draw_bars(figure.add_subplot(), items, style)
+    figure.tight_layout()
+    return figure
+
+
+def write_figure(figure, target = None, fmt = None):
+    '''
+    Writes a figure as PNG or SVG to a path or a binary file object.
+
+    Args:
+        figure (matplotlib.figure.Figure): The figure to write.
+        target (str or file object, optional): Where to write. None returns the bytes instead.
+        fmt (str, optional): 'png' or 'svg'. Defaults to the path's extension, else 'png'.
+
+    Returns:
+        bytes or None: The image when target is None.
+    '''
+    if fmt is None:
+        extension = os.path.splitext(target)[1].lstrip('.').lower() if isinstance(target, str) else ''
+        fmt = extension or 'png'
+    if fmt not in ('png', 'svg'):
+        raise ValueError(f"Unsupported chart format {fmt!r}; use 'png' or 'svg'.")
+    if target is None:
+        buffer = io.BytesIO()
+        figure.savefig(buffer, format=fmt)
+        return buffer.getvalue()
+    figure.savefig(target, format=fmt)
+    return None
@@ -0,0 +1,159 @@
+import contextlib
+import functools
+import threading
+import time
+
+# Instrumentation is off unless enable() is called; while off, timed functions only pay for
+# one flag check and section() hands out a shared no-op context manager
+_enabled = False
+_trace = None
+_lock = threading.Lock()
+# name -> [calls, total seconds, longest call in seconds]
+_timers = {}
+# name -> count
+_counters = {}
+_NULL_SECTION = contextlib.nullcontext()
+
+
+def enable(trace = None):
+    '''
+    Starts collecting timings and counts.
+
+    Only work done in this process is measured: Library.analyze runs large batches in worker
+    processes, whose timings are not collected.
+
+    Args:
+        trace (callable, optional): Called as trace(name, seconds) after every timed call or section,
+            e.g. to log slow calls. It runs on the calling thread, so it should be quick.
+    '''
+    global _enabled, _trace
+    _trace = trace
+    _enabled = True
+
+
+def disable():
+    '''Stops collecting. Collected values are kept until reset().'''
+    global _enabled, _trace
+    _enabled = False
+    _trace = None
+
+
+def is_enabled():
+    '''
+    Checks whether instrumentation is collecting.
+
+    Returns:
+        bool: True between enable() and disable().
+    '''
+    return _enabled
+
+
+def reset():
+    '''Forgets all collected timings and counts.'''
+    with _lock:
+        _timers.clear()
+        _counters.clear()
+
+
+def record(name, seconds):
+    '''
+    Adds one call of the given duration to a timer.
+
+    Args:
+        name (str): The timer.
+        seconds (float): The duration of the call.
+    '''
+    with _lock:
+        timer = _timers.get(name)
+        if timer is None:
+            _timers[name] = [1, seconds, seconds]
+        else:
+            timer[0] += 1
+            timer[1] += seconds
+            if seconds > timer[2]:
+                timer[2] = seconds
+    trace = _trace
+    if trace is not None:
+        trace(name, seconds)
+
+
+def count(name, amount = 1):
+    '''
+    Adds to a counter, if instrumentation is enabled.
+
+    Args:
+        name (str): The counter.
+        amount (int, optional): How much to add. Defaults to 1.
+    '''
+    if not _enabled:
+        return
+    with _lock:
+        _counters[name] = _counters.get(name, 0) + amount
+
+
+def timed(name):
+    '''
+    Decorator recording every call of a function under a timer, while instrumentation is enabled.
+
+    Args:
+        name (str): The timer.
+
+    Returns:
+        callable: The decorator.
+    '''
+    def decorator(function):
+        @functools.wraps(function)
+        def wrapper(*args, **kwargs):
+            if not _enabled:
+                return function(*args, **kwargs)
+            start = time.perf_counter()
+            try:
+                return function(*args, **kwargs)
+            finally:
+                record(name, time.perf_counter() - start)
+        return wrapper
+    return decorator
+
+
+class _Section():
+    '''Context manager recording the time spent in a with block.'''
+
+    def __init__(self, name):
+        self.name = name
+
+    def __enter__(self):
+        self.start = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc_info):
+        record(self.name, time.perf_counter() - self.start)
+        return False
+
+
+def section(name):
+    '''
+    Returns a context manager timing a block of code, or a no-op one when instrumentation is disabled.
+
+    Args:
+        name (str): The timer.
+
+    Returns:
+        context manager: Use as `with section('pos_tag'): ...`.
+    '''
+    if not _enabled:
+        return _NULL_SECTION
+    return _Section(name)
+
+
+def snapshot():
+    '''
+    Returns the collected timings and counts.
+
+    Returns:
+        dict: {'timers': {name: {'calls', 'total', 'mean', 'max'}}, 'counters': {name: count}},
+              with times in seconds.
+    '''
+    with _lock:
+        timers = {name: {'calls': calls, 'total': total, 'mean': total / calls, 'max': longest}
+                  for name, (calls, total, longest) in _timers.items()}
+        return {'timers': timers, 'counters': dict(_counters)}
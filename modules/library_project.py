@@ -1,18 +1,182 @@
 import isbnlib
-import nltk
-from nltk.corpus import stopwords, wordnet
-from nltk.stem import WordNetLemmatizer
 import csv
 import ast
-import matplotlib.pyplot as plt
+import functools
+import gzip
+import heapq
+import itertools
+import json
+import os
+import re
+import sys
+import threading
+import time
+import weakref
+from concurrent.futures import Future, ThreadPoolExecutor, ProcessPoolExecutor
+from types import MappingProxyType
+# nltk and matplotlib are slow to import, so they are only imported when text is analyzed
+# or a chart is drawn; importing this module does no downloads or corpus loading
+
+try:
+    from . import instrumentation
+    from .text_index import TextIndex, search_tokens
+    from .snapshot import load_library, save_library
+    from .page_store import PageStore
+    from .term_stats import SIMILAR_PROBE_TERMS, TermStats
+    from .vocabulary import SHARED_VOCABULARY
+    from .catalog import MetadataColumns
+    from .sorted_views import TEXT_FIELDS, SortedView, make_sort_key, parse_sort_fields
+    from .charts import CHART_STYLES, DEFAULT_TOP, draw_bars, make_figure, top_counts, write_figure
+except ImportError:
+    # Loaded as a top-level module, with the modules folder on sys.path
+    import instrumentation
+    from text_index import TextIndex, search_tokens
+    from snapshot import load_library, save_library
+    from page_store import PageStore
+    from term_stats import SIMILAR_PROBE_TERMS, TermStats
+    from vocabulary import SHARED_VOCABULARY
+    from catalog import MetadataColumns
+    from sorted_views import TEXT_FIELDS, SortedView, make_sort_key, parse_sort_fields
+    from charts import CHART_STYLES, DEFAULT_TOP, draw_bars, make_figure, top_counts, write_figure
+
+# Reading-progress states reported by Library.progress_check
+PROGRESS_STATUSES = ('Not Started', 'Reading in Progress', 'Completed')
+
+# NLTK data used by the text analysis, installed by setup_nltk()
+# ('averaged_perceptron_tagger_eng' is the name of the tagger model in newer NLTK releases)
+NLTK_RESOURCES = ('stopwords', 'averaged_perceptron_tagger', 'averaged_perceptron_tagger_eng', 'wordnet')
+
+# First letter of a Penn Treebank tag -> WordNet POS ('a', 'v', 'n', 'r' are wordnet.ADJ, VERB, NOUN, ADV)
+WORDNET_POS = {'J': 'a', 'V': 'v', 'N': 'n', 'R': 'r'}
+# Number of (word, tag) -> lemma results remembered by the tokenizer
+LEMMA_CACHE_SIZE = 200000
+# Number of pages POS-tagged together by tally_words
+TAG_BATCH_PAGES = 256
+# Below this many books, Library.analyze does not start a process pool
+ANALYZE_POOL_MIN_BOOKS = 8
+# Rows handed to the csv writer at a time by Library.export_books
+EXPORT_CHUNK_ROWS = 256
+# Written by Library.export_books in place of a genre, title, publisher or year that is None
+NONE_FIELD = '\\N'
+
+def setup_nltk(quiet = False):
+    '''
+    Downloads the NLTK data needed for text analysis (stopwords, POS tagger, WordNet).
+
+    Run this once per machine (or container image) before analyzing text. Nothing is
+    downloaded automatically, so importing this module works offline.
+
+    Args:
+        quiet (bool, optional): Suppress NLTK's download messages.
+
+    Returns:
+        bool: True if every resource is available.
+    '''
+    import nltk
+    return all([nltk.download(resource, quiet=quiet) for resource in NLTK_RESOURCES])
+
+
+def _missing_nltk_data(error):
+    '''Wraps NLTK's LookupError for missing data with a pointer to setup_nltk.'''
+    return LookupError(f"NLTK data needed for text analysis is missing; run setup_nltk() once. ({error})")
+
+
+def _load_stopwords():
+    '''Loads the English stopword set from the NLTK data.'''
+    from nltk.corpus import stopwords
+    try:
+        return set(stopwords.words('english'))
+    except LookupError as error:
+        raise _missing_nltk_data(error) from None
+
+
+def _load_lemmatizer():
+    '''Creates the WordNet lemmatizer and loads WordNet, so missing data is reported here.'''
+    from nltk.stem import WordNetLemmatizer
+    lemmatizer = WordNetLemmatizer()
+    try:
+        lemmatizer.lemmatize('books')
+    except LookupError as error:
+        raise _missing_nltk_data(error) from None
+    return lemmatizer
+
+
+class _LazyClassAttribute():
+    '''
+    Class attribute computed by a loader on first access, then stored on the class in place
+    of this descriptor. Assigning the attribute directly (e.g. in tests) still works.
+    '''
+
+    def __init__(self, loader):
+        self.loader = loader
+
+    def __set_name__(self, owner, name):
+        self.name = name
+
+    def __get__(self, instance, owner):
+        value = self.loader()
+        setattr(owner, self.name, value)
+        return value
 
-nltk.download('stopwords')
-nltk.download('averaged_perceptron_tagger')
-nltk.download('wordnet')
 
 class Library():
+    # Maximum number of blocking jobs (metadata fetches, searches) the async methods run at once
+    async_concurrency = 8
+
     def __init__(self):
-        self.list = []
+        # Books in library order: book -> sequence number, so removal does not shift a list
+        self._books = {}
+        self._next_seq = 0
+        self._list_cache = None
+        # Columnar copy of the books' metadata, and the row of each book in it
+        self._columns = MetadataColumns()
+        self._rows = {}
+        # Lookup indexes: normalized key -> the book with that key, or a list when there are several
+        self._by_title = {}
+        self._by_isbn = {}
+        self._by_author = {}
+        # The callback registered with every book of the library; one bound method shared by all of them
+        self._book_observer = self._book_changed
+        # Aggregates kept up to date on every change, so reading them never rescans the library
+        self._author_counts = {}
+        self._genre_counts = {}
+        self._favorites = {}
+        self._progress = {}
+        self._progress_buckets = {status: {} for status in PROGRESS_STATUSES}
+        # Positional full-text index over the pages of every book (TextIndex, keyed by book).
+        # Built on the first quote search, then kept up to date by add_book, remove_book and page edits
+        self._text_index = None
+        # TF-IDF term statistics over the analyzed books, and the word_vector ids each book was added from
+        self._term_stats = TermStats()
+        self._term_sources = {}
+        # Sorted views handed out by sorted_view: field names -> SortedView, kept up to date on every change
+        self._sorted_views = {}
+        # ProgressJournal recording bookmark and favorite changes, set by attach_journal
+        self._journal = None
+        # State of the async methods: event loop -> (concurrency limit, ISBN -> metadata fetch in
+        # progress), created on first use inside each loop, and the lock serializing their blocking work
+        self._async_state = weakref.WeakKeyDictionary()
+        self._async_lock = threading.Lock()
+
+    @property
+    def list(self):
+        """
+        The books in the library, in library order.
+
+        This is a read-only snapshot (a tuple) rebuilt only after the library changes;
+        use add_book and remove_book to change the library. Assigning a new sequence of
+        books replaces the whole content of the library.
+        """
+        if self._list_cache is None:
+            self._list_cache = tuple(self._books)
+        return self._list_cache
+
+    @list.setter
+    def list(self, books):
+        for book in list(self._books):
+            self._discard(book)
+        for book in books:
+            self.add_book(book)
 
     def list_titles(self):
         """
@@ -27,24 +191,532 @@ class Library():
         param book: the book data provided to the function
         return none
         """
-        self.list.append(book)
+        if book in self._books:
+            raise ValueError("Book is already in the library")
+        self._books[book] = self._next_seq
+        self._next_seq += 1
+        self._list_cache = None
+        row = self._rows[book] = self._columns.add(book.genre, book.year)
+        # The book shares the interned genre, year and author names, so repeated values are stored once
+        book.genre = self._columns.genre(row)
+        if isinstance(book.year, str):
+            book.year = sys.intern(book.year)
+        if isinstance(book.authors, list):
+            book.authors[:] = [sys.intern(name) if isinstance(name, str) else name for name in book.authors]
+        _index_add(self._by_title, _normalize(book.title), book)
+        _index_add(self._by_isbn, _normalize(book.isbn), book)
+        for author in _author_names(book):
+            _index_add(self._by_author, sys.intern(_normalize(author)), book)
+        if self._text_index is not None:
+            self._text_index.add_document(book, book.text)
+        for author in _author_names(book):
+            _count(self._author_counts, author, 1)
+        _count(self._genre_counts, book.genre, 1)
+        if book.get_favorite() == 1:
+            self._favorites[book] = None
+        self._update_progress(book)
+        for view in self._sorted_views.values():
+            view.add(book)
+        book._observers += (self._book_observer,)
+        if self._journal is not None:
+            self._restore_progress(book)
+
+    def _discard(self, book):
+        """
+        Removes a book from the library and from every index. O(1) apart from the full-text index and sorted views.
+        """
+        del self._books[book]
+        self._list_cache = None
+        self._columns.remove(self._rows.pop(book))
+        _index_remove(self._by_title, _normalize(book.title), book)
+        _index_remove(self._by_isbn, _normalize(book.isbn), book)
+        for author in _author_names(book):
+            _index_remove(self._by_author, _normalize(author), book)
+        if self._text_index is not None:
+            self._text_index.remove_document(book)
+        for author in _author_names(book):
+            _count(self._author_counts, author, -1)
+        _count(self._genre_counts, book.genre, -1)
+        self._favorites.pop(book, None)
+        status = self._progress.pop(book, None)
+        if status is not None:
+            del self._progress_buckets[status][book]
+        if self._term_sources.pop(book, None) is not None:
+            self._term_stats.remove(book)
+        for view in self._sorted_views.values():
+            view.remove(book)
+        book._observers = tuple(observer for observer in book._observers if observer is not self._book_observer)
+
+    def _book_changed(self, book, event, change = None):
+        """
+        Called by a book of this library when its bookmark, favorite status or text changes.
+        """
+        if event in ('bookmark', 'favorite') and self._journal is not None:
+            self._journal.record(book.isbn, book.get_bookmark(), book.get_favorite())
+        if event == 'favorite':
+            if book.get_favorite() == 1:
+                self._favorites[book] = None
+            else:
+                self._favorites.pop(book, None)
+        else:
+            self._update_progress(book)
+            if event == 'text':
+                if self._text_index is not None:
+                    self._reindex_text(book, change)
+                for names, view in self._sorted_views.items():
+                    if any(name.lstrip('-') in TEXT_FIELDS for name in names):
+                        view.update(book)
+
+    def _update_progress(self, book):
+        """
+        Moves a book to the reading-progress bucket matching its bookmark.
+        """
+        old = self._progress.get(book)
+        new = _progress_status(book)
+        if old == new:
+            return
+        if old is not None:
+            del self._progress_buckets[old][book]
+        if new is None:
+            self._progress.pop(book, None)
+        else:
+            self._progress[book] = new
+            self._progress_buckets[new][book] = None
+
+    def _reindex_text(self, book, change):
+        """
+        Updates the full-text index after a book's text changed: only the edited page, or the
+        whole book when its text was replaced outright (change is None).
+        """
+        if change is None:
+            self._text_index.remove_document(book)
+            self._text_index.add_document(book, book.text)
+        else:
+            self._text_index.edit_page(book, change['page'], change['old'], change['new'])
+
+    def add_books_bulk(self, records, workers = 8, processes = None, fetch = None, retries = 2,
+                       retry_delay = 0.5, rate_limit = None, chunk_size = 256):
+        """
+        Adds many books at once, fetching their metadata concurrently.
+
+        Metadata is fetched over a bounded thread pool (with optional rate limiting and retries),
+        then the Book objects are built. With processes, their text is analyzed right away in a
+        process pool (see analyze) started once for the whole call, while the metadata of the next
+        chunk is fetched; otherwise it is analyzed lazily on first use. A record that fails is reported back instead of aborting the batch.
 
-    def remove_book(self, title):
+        Args:
+        - records (iterable of dict): Records with keys 'isbn', 'genre' and 'text', e.g. from iter_csv or csv_to_dict.
+                                      Generators are consumed chunk_size records at a time. Records that also
+                                      have 'book_info' (as read back from export_books) are not fetched, and
+                                      their 'bookmark' and 'favorite' are restored.
+        - workers (int): Number of threads used to fetch metadata. Defaults to 8.
+        - processes (int or None): Number of worker processes used to analyze the books. None leaves analysis lazy.
+        - fetch (callable or None): Metadata source called as fetch(isbn), returning a dict like isbnlib.meta.
+                                    Defaults to Book.metadata_cache.lookup when a cache is set, else isbnlib.meta.
+        - retries (int): How many times a failed fetch is retried. Invalid ISBNs and ISBNs missing from an offline
+                         metadata cache are never retried.
+        - retry_delay (float): Seconds to wait before the first retry; doubled after every attempt.
+        - rate_limit (float or None): Maximum number of fetches per second across all threads.
+        - chunk_size (int): Number of records read from records and processed together. Defaults to 256.
+
+        Returns:
+        - list: (record, exception) tuples for the records that could not be added, in input order.
+        """
+        if fetch is None:
+            fetch = Book.metadata_cache.lookup if Book.metadata_cache is not None else isbnlib.meta
+        limiter = _RateLimiter(rate_limit) if rate_limit else None
+
+        def fetch_info(record):
+            # Runs in a thread; returns (book_info, None) or (None, exception)
+            if record.get('book_info') is not None:
+                # Full records, as written by export_books, already carry their metadata
+                return tuple(record['book_info']), None
+            try:
+                meta = _fetch_with_retry(fetch, record['isbn'], retries, retry_delay, limiter)
+                return Book.parse_book_info(meta), None
+            except isbnlib._exceptions.NotValidISBNError:
+                return None, ValueError('Invalid ISBN')
+            except Exception as error:
+                return None, error
+
+        failures = []
+        records = iter(records)
+        # One process pool for the whole call; its workers load the NLTK data once
+        analysis_pool = None
+        if processes is not None and processes > 1:
+            analysis_pool = ProcessPoolExecutor(max_workers=processes, initializer=_init_analysis_worker)
+        try:
+            with ThreadPoolExecutor(max_workers=max(1, workers)) as pool:
+                # Records are consumed chunk by chunk, so a streamed source is never held in memory at once.
+                # A chunk is added once the next one is fetched, so fetching overlaps with its analysis
+                previous = None
+                while True:
+                    chunk = list(itertools.islice(records, chunk_size))
+                    current = None
+                    if chunk:
+                        infos = list(pool.map(fetch_info, chunk))
+                        current = self._build_chunk(chunk, infos, processes, analysis_pool)
+                    if previous is not None:
+                        failures.extend(self._add_chunk(*previous))
+                    if current is None:
+                        break
+                    previous = current
+        finally:
+            if analysis_pool is not None:
+                analysis_pool.shutdown(cancel_futures=True)
+        return failures
+
+    def _build_chunk(self, records, infos, processes, analysis_pool):
+        """
+        Builds the books of one chunk of add_books_bulk and starts their analysis. Returns the records,
+        the Book or exception of each, and book -> analysis Future (or the exception of a failed analysis).
+        """
+        outcomes = []
+        for record, (info, error) in zip(records, infos):
+            if error is None:
+                try:
+                    book = Book(record['isbn'], record.get('genre'), record.get('text'), book_info=info,
+                                bookmark=record.get('bookmark', 0), favorite=record.get('favorite', 0))
+                    outcomes.append(book)
+                except Exception as build_error:
+                    outcomes.append(build_error)
+            else:
+                outcomes.append(error)
+
+        analyses = {}
+        if processes:
+            books = [outcome for outcome in outcomes if isinstance(outcome, Book)]
+            if analysis_pool is not None and len(books) >= ANALYZE_POOL_MIN_BOOKS:
+                analyses = {book: analysis_pool.submit(_analyze_text, list(book.text)) for book in books}
+            else:
+                analyses = dict(self.analyze(workers=1, books=books))
+        return records, outcomes, analyses
+
+    def _add_chunk(self, records, outcomes, analyses):
+        """
+        Stores the analysis of the books built by _build_chunk and adds them, returning the chunk's failures.
+        """
+        failures = []
+        for record, outcome in zip(records, outcomes):
+            if outcome in analyses:
+                analysis = _settle(analyses[outcome])
+                if isinstance(analysis, Exception):
+                    outcome = analysis
+                else:
+                    outcome._store_analysis(*analysis)
+            if isinstance(outcome, Exception):
+                failures.append((record, outcome))
+            else:
+                self.add_book(outcome)
+        return failures
+
+    async def aadd_isbn(self, isbn, genre = None, text = None, fetch = None):
+        """
+        Async version of add_book(Book(isbn, genre, text)) for asyncio applications.
+
+        The metadata fetch runs in the event loop's default executor, so the loop is not blocked.
+        Concurrent calls for the same ISBN share a single fetch, and at most async_concurrency
+        blocking jobs of this library run at once in each event loop; further calls wait for a free slot.
+
+        Args:
+        - isbn (str): The ISBN of the book.
+        - genre (str or None): The genre of the book.
+        - text (list of str or None): The pages of the book.
+        - fetch (callable or None): Metadata source called as fetch(isbn), like isbnlib.meta.
+                                    Defaults to Book.metadata_cache.lookup when a cache is set, else isbnlib.meta.
+
+        Returns:
+        - Book: The book added to the library.
+
+        Raises:
+        - ValueError: If the ISBN is invalid or the book is already in the library.
+        """
+        import asyncio
+        inflight = self._loop_state()[1]
+        pending = inflight.get(isbn)
+        if pending is None:
+            pending = asyncio.ensure_future(self._arun(_fetch_book_info, isbn, fetch, locked=False))
+            inflight[isbn] = pending
+            pending.add_done_callback(lambda done: inflight.pop(isbn, None))
+        # Shielded, so one caller being cancelled does not cancel the fetch the others wait for
+        info = await asyncio.shield(pending)
+        # Every caller gets its own authors list, so the books sharing this fetch never share (and change) one
+        title, authors, publisher, year = info
+        if isinstance(authors, list):
+            authors = list(authors)
+        book = Book(isbn, genre, text, book_info=(title, authors, publisher, year))
+        await self._arun(self.add_book, book)
+        return book
+
+    async def asearch_by_quote(self, quote, with_pages = False):
+        """
+        Async version of search_by_quote: the search runs in the event loop's default executor.
+
+        Args:
+        - quote (str): The quote to search for.
+        - with_pages (bool): If True, return (title, page number) pairs instead of titles.
+
+        Returns:
+        - list: As returned by search_by_quote.
+        """
+        return await self._arun(self.search_by_quote, quote, with_pages)
+
+    async def _arun(self, function, *args, locked = True):
+        """
+        Runs a blocking call in the default executor, within the async concurrency limit.
+        Calls that read or change the library hold a lock, so they do not overlap with each other.
+        """
+        import asyncio
+        semaphore = self._loop_state()[0]
+        if locked:
+            function = functools.partial(_call_locked, self._async_lock, function)
+        async with semaphore:
+            return await asyncio.get_running_loop().run_in_executor(None, function, *args)
+
+    def _loop_state(self):
+        """
+        Returns the concurrency limit and the metadata fetches in progress of the running event loop.
+        Each loop has its own, since asyncio objects cannot be shared between event loops.
+        """
+        import asyncio
+        loop = asyncio.get_running_loop()
+        state = self._async_state.get(loop)
+        if state is None:
+            state = self._async_state[loop] = (asyncio.Semaphore(self.async_concurrency), {})
+        return state
+
+    def analyze(self, workers = None, books = None, force = False):
+        """
+        Computes word_count and word_dict for many books, in parallel worker processes.
+
+        Book texts are sent to a process pool whose workers load the stopword list and the
+        lemmatizer once, and the results are stored back into the Book objects. Small batches
+        (fewer than ANALYZE_POOL_MIN_BOOKS books) or workers=1 run in this process instead.
+
+        Args:
+        - workers (int or None): Number of worker processes. Defaults to the number of CPUs.
+        - books (iterable of Book or None): The books to analyze. Defaults to every book in the library.
+        - force (bool): Re-analyze books that were already analyzed.
+
+        Returns:
+        - list: (book, exception) tuples for the books whose analysis failed.
+        """
+        if books is None:
+            books = self._books
+        books = [book for book in books if force or not book.is_analyzed()]
+        if workers is None:
+            workers = os.cpu_count() or 1
+
+        failures = []
+        if workers < 2 or len(books) < ANALYZE_POOL_MIN_BOOKS:
+            for book in books:
+                try:
+                    book._store_analysis(*_analyze_text(book.text))
+                except Exception as error:
+                    failures.append((book, error))
+            return failures
+
+        with ProcessPoolExecutor(max_workers=workers, initializer=_init_analysis_worker) as pool:
+            pending = [pool.submit(_analyze_text, list(book.text)) for book in books]
+            for book, future in zip(books, pending):
+                outcome = _settle(future)
+                if isinstance(outcome, Exception):
+                    failures.append((book, outcome))
+                else:
+                    book._store_analysis(*outcome)
+        return failures
+
+    def themes(self, theme_count = 5, title = None):
+        """
+        Identifies the themes of the books by TF-IDF over the whole library: a word ranks high
+        in a book when it is frequent there and rare in the other books, so words common to
+        every book are not reported as themes.
+
+        Books that were not analyzed yet are analyzed here one at a time; call analyze() first
+        to do that in parallel. Document frequencies are kept between calls and only books whose
+        word_dict changed are re-counted.
+
+        - theme_count (int): number of themes per book
+        - title (str or None): only return the themes of this book
+        raises ValueError: if no book has the title, or several do
+
+        return: list of themes of the book if a title is given, otherwise a dictionary of
+                title -> list of themes for every book, computed in one pass
+        """
+        if title is not None:
+            book = self._find_book(title)
+            if book is None:
+                raise ValueError("No book found")
+            self._sync_terms()
+            return self._term_stats.top_terms(book, theme_count)
+        self._sync_terms()
+        top_terms = self._term_stats.all_top_terms(theme_count)
+        return {book.title: top_terms[book] for book in self.list}
+
+    def similar_books(self, title, k = 5, isbn = None, exact = False):
+        """
+        Finds the books whose text is most similar to a book's, by cosine similarity of their
+        word tallies (word_dict).
+
+        Uses the same term statistics as themes(), which keep an inverted index and the norm of
+        every book, so only books sharing words with this one are compared. By default only the
+        book's most distinctive words are compared (term_stats.SIMILAR_PROBE_TERMS), which keeps
+        queries fast on large libraries; exact=True compares every word.
+
+        - title (str): title of the book
+        - k (int): number of similar books to return
+        - isbn (str or None): ISBN to pick the book when several have the title
+        - exact (bool): compare every word instead of the most distinctive ones
+        raises ValueError: if the book is not found, or several books have the title
+
+        return: list of (title, similarity) tuples, most similar first
+        """
+        book = self._find_book(title, isbn)
+        if book is None:
+            raise ValueError("No book found")
+        self._sync_terms()
+        similar = self._term_stats.similar(book, k, probe=None if exact else SIMILAR_PROBE_TERMS)
+        return [(other.title, score) for other, score in similar]
+
+    def books_with_word(self, word):
+        """
+        Finds the books whose text uses a word, from the library's word index rather than by
+        scanning each book's word_dict. Books not analyzed yet are analyzed first, as in themes().
+
+        - word (str): the word, as it appears in word_dict (lowercase and lemmatized)
+
+        return: list of (title, count) tuples in library order
+        """
+        self._sync_terms()
+        books = self._term_stats.documents_with(word)
+        return [(book.title, books[book]) for book in self._in_order(books)]
+
+    def word_totals(self, top = None):
+        """
+        Counts every word over the whole library, merged from the books' word tallies as they
+        are analyzed. Books not analyzed yet are analyzed first, as in themes().
+
+        - top (int or None): only return this many of the most frequent words, most frequent first
+
+        return: dictionary of word -> number of occurrences in the library
+        """
+        self._sync_terms()
+        return self._term_stats.totals(top)
+
+    def _sync_terms(self):
+        """
+        Brings the term statistics up to date with the word tally of every book.
+        """
+        for book in self._books:
+            ids, counts = book.word_vector
+            if self._term_sources.get(book) is not ids:
+                # Both use the shared vocabulary, so the book's arrays are stored as they are
+                self._term_stats.add_vector(book, ids, counts)
+                self._term_sources[book] = ids
+
+    def save(self, path):
+        """
+        Saves the whole library to a binary snapshot file.
+
+        The snapshot keeps everything needed to restore the library without going back to
+        isbnlib or NLTK: metadata, page texts, word counts and tallies already computed,
+        bookmarks and favorites. See snapshot.py for the file format.
+
+        Args:
+        - path (str): The file to write. An existing file is replaced.
+
+        Returns:
+        - int: The number of books saved.
+        """
+        return save_library(self, path)
+
+    def store_text(self, path):
+        """
+        Moves the page texts of every book into a memory-mapped page store file.
+
+        Each book's text is replaced by a read-only view of the store, which behaves like the
+        list of pages but only reads a page from disk when it is used. Word counts, tallies and
+        search indexes already computed are kept, since the text itself does not change.
+
+        Args:
+        - path (str): The page store file to write. An existing file is replaced.
+
+        Returns:
+        - PageStore: The opened store.
+        """
+        books = self.list
+        store, views = PageStore.build(path, (book.text for book in books))
+        for book, pages in zip(books, views):
+            book._swap_text(pages)
+        return store
+
+    @classmethod
+    def load(cls, path, lazy = True):
+        """
+        Loads a library from a snapshot file written by save.
+
+        Args:
+        - path (str): The snapshot file.
+        - lazy (bool): If True, page texts stay in the memory-mapped file and are read on access,
+                       so loading does not read every page. If False, all text is read into memory.
+
+        Returns:
+        - Library: The restored library.
+
+        Raises:
+        - ValueError: If the file is not a snapshot this version can read.
+        """
+        return load_library(path, cls, Book, lazy=lazy)
+
+    @classmethod
+    def from_csv(cls, csv_file, **options):
+        """
+        Builds a new library from a CSV file in the format read by csv_to_dict, or a JSON lines
+        file (.jsonl). The file is streamed, one chunk of records at a time. Files written by
+        export_books (also gzip-compressed, or split in shards) are read back with their metadata
+        and reading state, without ISBN lookups.
+
+        Args:
+        - csv_file (str or list of str): The path to the CSV or JSON lines file, or the paths of several
+                                         files (e.g. the shards returned by export_books), read in order.
+        - options: Passed on to add_books_bulk (workers, processes, fetch, ...).
+
+        Returns:
+        - tuple: The new Library and the list of (record, exception) failures.
+        """
+        library = cls()
+        paths = [csv_file] if isinstance(csv_file, str) else csv_file
+        records = itertools.chain.from_iterable(iter_records(path) for path in paths)
+        failures = library.add_books_bulk(records, **options)
+        return library, failures
+
+    def remove_book(self, title, isbn = None):
         """
         Removes book from the list of the library
         parm title: the user inputs title of the book that they want to remove
+        parm isbn: optional, picks the book by ISBN instead (e.g. when several books share the title)
         return: none
         value error: if book is not found with the title provided, we return No book found
+        raises ValueError: if several books match, see search_by_title
         """
         
-        book = self.search_by_title(title)
+        book = self._find_book(title, isbn)
         print(book)
         if book is None:
             return ValueError("No book found")
         else:
-            #removes the book from list
-            self.list.remove(book)
+            #removes the book from the library and its indexes
+            self._discard(book)
+
+    def _find_book(self, title, isbn = None):
+        """
+        Looks a single book up by ISBN if one is given, else by title.
+        """
+        if isbn is not None:
+            return self.get_by_isbn(isbn)
+        return self.search_by_title(title)
 
+    @instrumentation.timed('search_by_title')
     def search_by_title(self, title):
         """
         Search for a book by its title.
@@ -55,31 +727,139 @@ class Library():
         Returns:
         - Book or None: If a book with the specified title is found, the function returns
                        the Book object. If not found, returns None.
+
+        Raises:
+        - ValueError: If several books have that title. Use search_all_by_title or get_by_isbn instead.
         """
-        # Search for a book by title
-        for book in self.list:
-            if book.title.lower() == title.lower():
-                return book
-        return None
+        # Search for a book by title, through the title index
+        return _single(_index_get(self._by_title, _normalize(title)), 'title', title)
+
+    def search_all_by_title(self, title):
+        """
+        Search for every book with a given title.
+
+        Args:
+        - title (str): The title to search for. Case-insensitive.
+
+        Returns:
+        - list: The Book objects with that title, in library order. Empty if none.
+        """
+        return self._in_order(_index_get(self._by_title, _normalize(title)))
 
-    def search_by_quote(self, quote):
+    def get_by_isbn(self, isbn):
+        """
+        Search for a book by its ISBN.
+
+        Args:
+        - isbn (str): The ISBN of the book, exactly as the book was created with.
+
+        Returns:
+        - Book or None: The book with that ISBN, or None if there is none.
+
+        Raises:
+        - ValueError: If several copies of the book were added to the library.
+        """
+        return _single(_index_get(self._by_isbn, _normalize(isbn)), 'ISBN', isbn)
+
+    @instrumentation.timed('search_by_author')
+    def search_by_author(self, author):
+        """
+        Search for the books by an author.
+
+        Args:
+        - author (str): The author's name. Case-insensitive, must match the whole name.
+
+        Returns:
+        - list: The Book objects by that author, in library order. Empty if none.
+        """
+        return self._in_order(_index_get(self._by_author, _normalize(author)))
+
+    def _in_order(self, books):
+        """
+        Returns the given books sorted into library order.
+        """
+        return sorted(books, key=self._books.__getitem__)
+
+    @instrumentation.timed('search_by_quote')
+    def search_by_quote(self, quote, with_pages = False):
         """
         Search for books containing a specific quote within their text.
 
+        The library keeps a positional index of the words on every page of every book (TextIndex):
+        the quote is located by walking the occurrences of its rarest word, or of its rarest pair of
+        neighbouring words, and checking the words next to each, so books without them are never
+        visited. The quote may start or end in the middle of a word, as in a plain substring search.
+
         Args:
         - quote (str): The quote to search for within the book texts. Case-insensitive.
+        - with_pages (bool): If True, return (title, page number) pairs instead of titles.
 
         Returns:
-        - list: A list containing titles of books that contain the specified quote in their text.
+        - list: A list containing titles of books that contain the specified quote in their text,
+                once per matching page, or (title, page) tuples when with_pages is True.
         """
 
         # Search for a book by a quote
-        found_books = []
-        for book in self.list:
-          for page in book.text:
-              if quote.lower() in page.lower():
-                  found_books.append(book.title)
-        return found_books
+        found = self._find_quotes([quote])[quote]
+        if with_pages:
+            return [(book.title, page) for book, page in found]
+        return [book.title for book, page in found]
+
+    @instrumentation.timed('search_many')
+    def search_many(self, quotes = (), titles = ()):
+        """
+        Answers many quote and title lookups in one call.
+
+        Repeated queries are answered once. The quotes are located in the library's positional
+        index together: quotes walked from the same word (or pair of words) are checked in a
+        single pass over its occurrences, and each candidate page is lowercased at most once for
+        all the quotes checked against it. The cost follows the occurrences walked and the
+        candidate pages, not the number of books times the number of quotes.
+
+        Args:
+        - quotes (iterable of str): Quotes to search for, as in search_by_quote.
+        - titles (iterable of str): Titles to look up, as in search_all_by_title.
+
+        Returns:
+        - dict: 'quotes' holds one list of (title, page number) tuples per quote and 'titles'
+                one list of Book objects per title, both in the order the queries were given.
+        """
+        quotes = list(quotes)
+        found = self._find_quotes(quotes)
+        return {
+            'quotes': [[(book.title, page) for book, page in found[quote]] for quote in quotes],
+            'titles': [self.search_all_by_title(title) for title in titles],
+        }
+
+    def _find_quotes(self, quotes):
+        """
+        Returns quote -> list of (book, page number) for each distinct quote, in library order.
+        Candidate pages come from the full-text index, all quotes at once, and are confirmed by a
+        case-insensitive substring check; a quote without any word characters is checked against
+        every page.
+        """
+        if self._text_index is None:
+            self._text_index = TextIndex((book, book.text) for book in self._books)
+        order = self._books
+        quotes = list(dict.fromkeys(quotes))
+        tokens = [search_tokens(quote) for quote in quotes]
+        candidates = iter(self._text_index.find_many([words for words in tokens if words]))
+        lowered_pages = {}
+        found = {}
+        for quote, words in zip(quotes, tokens):
+            needle = quote.lower()
+            if not words:
+                found[quote] = [(book, number) for book in order for number, page in enumerate(book.text)
+                                if needle in page.lower()]
+                continue
+            found[quote] = matches = []
+            for page in sorted(next(candidates), key=lambda page: (order[page[0]], page[1])):
+                text = lowered_pages.get(page)
+                if text is None:
+                    text = lowered_pages[page] = page[0].text[page[1]].lower()
+                if needle in text:
+                    matches.append(page)
+        return found
 
     def sort_by_author(self):
         """
@@ -87,10 +867,41 @@ class Library():
 
         This method sorts the list of books in the library based on the primary author's name.
         It uses the first author's name for sorting purposes (assuming authors[0] represents the primary author).
+        Books with the same author keep their order. To list the books by author without changing
+        the library order, use sorted_view('author') instead.
+        """
+        # Sorts the books in the library by author, renumbering the library order
+        ordered = list(self.sorted_view('author'))
+        # Renumbered in place: the key functions of the sorted views read this dict
+        self._books.clear()
+        self._books.update((book, seq) for seq, book in enumerate(ordered))
+        self._next_seq = len(ordered)
+        self._list_cache = None
+        # Ties in the views were broken by the old library order
+        for view in self._sorted_views.values():
+            view.resort()
+
+    def sorted_view(self, *fields):
+        """
+        Returns the books sorted by one or more fields, without changing the library order.
+
+        The view is built on the first call for a combination of fields, then kept sorted as
+        books are added, removed or edited, so later calls cost nothing. Books that tie on every
+        field keep their library order. Read one page at a time with view.page(number, page_size),
+        or slice the view; only the books read are copied.
+
+        - fields (str): 'author', 'title', 'year', 'genre', 'word_count' or 'page_count', most significant
+          first; prefix a field with '-' for descending order, e.g. sorted_view('-year', 'title')
+        return SortedView: the live sorted view (supports len, iteration, indexing and slicing)
+        raises ValueError: if no field is given or a field is unknown
         """
-        # Sorts the books in the library by author
-        self.list.sort(key=lambda book: book.authors[0])
+        view = self._sorted_views.get(fields)
+        if view is None:
+            key = make_sort_key(parse_sort_fields(fields), self._columns, self._rows, self._books)
+            view = self._sorted_views[fields] = SortedView(key, self._books)
+        return view
 
+    @instrumentation.timed('export_to_csv')
     def export_to_csv(self, filename):
         """
         Exports the library content to a CSV file.
@@ -108,86 +919,141 @@ class Library():
             writer.writerow(['Title', 'Author', 'Genre', 'ISBN'])
             for book in self.list:
                 writer.writerow([book.title, ', '.join(book.authors), book.genre, book.isbn])
+        instrumentation.count('export_to_csv.books', len(self._books))
+
+    @instrumentation.timed('export_books')
+    def export_books(self, path, shards = 1, workers = None, chunk_size = EXPORT_CHUNK_ROWS):
+        """
+        Exports every book with all its data, in the CSV format read back by iter_csv and from_csv.
+
+        Unlike export_to_csv, the rows keep the page texts, metadata and reading state
+        (columns: isbn, genre, text, title, authors, publisher, year, bookmark, favorite; no header),
+        so Library.from_csv rebuilds the same library without any ISBN lookups. Rows are produced by
+        a generator and written chunk_size at a time, so memory use does not grow with the library.
 
+        Args:
+        - path (str): The file to write. A name ending in .gz is gzip-compressed.
+        - shards (int): Split the books over this many files, written in parallel threads (gzip
+                        compression runs outside the GIL). Shard files are named like
+                        library-00001-of-00004.csv.gz for path library.csv.gz.
+        - workers (int or None): Number of threads writing shards. Defaults to one per shard.
+        - chunk_size (int): Number of rows handed to the csv writer at a time.
+
+        Returns:
+        - list: The paths written, in library order.
+        """
+        books = self.list
+        instrumentation.count('export_books.books', len(books))
+        if shards <= 1:
+            write_book_csv(path, books, chunk_size)
+            return [path]
+        paths = shard_paths(path, shards)
+        size = -(-len(books) // shards)
+        with ThreadPoolExecutor(max_workers=workers or shards) as pool:
+            pending = [pool.submit(write_book_csv, shard_path, books[number * size:(number + 1) * size], chunk_size)
+                       for number, shard_path in enumerate(paths)]
+            for future in pending:
+                future.result()
+        return paths
+
+
+    def author_counts(self):
+        """
+        Returns how many books of the library each author wrote (co-authors each count once).
+        Served from counters maintained on add and remove, without drawing anything.
+
+        return: dictionary of author name -> number of books
+        """
+        return dict(self._author_counts)
 
-    def freq_author(self):
+    def genre_counts(self):
+        """
+        Returns how many books of the library belong to each genre.
+        Served from counters maintained on add and remove, without drawing anything.
+
+        return: dictionary of genre -> number of books
+        """
+        return dict(self._genre_counts)
+
+    def freq_author(self, output = None, fmt = None, top = None):
         """
         Tracks the times an author exists within the library and creates a
         visualization of it (bar chart)
 
         param self
+        - output (str or file object, optional): if given, the chart is rendered headless (Agg backend,
+          no window) and written there as PNG or SVG instead of being shown with pyplot
+        - fmt (str, optional): 'png' or 'svg', by default taken from the output file extension
+        - top (int, optional): number of authors drawn, the rest are summed into an "Other" bar.
+          Defaults to every author when showing and to charts.DEFAULT_TOP when writing to output
 
         return author_freq: The dictionary used for the visualization
 
         """
-        #initializing frequency dictionary
-        author_freq = {}
-
-        #for loop that checks each other for each book in library
-        for book in self.list:
-            author_list = book.authors
-            #the book.authors returns authors as indivudal lists, we can fist that by doing another for loop to rechieve the values within those lists
-            for writer in author_list:
-                author = writer
-
-            #if the author exists in the dictionary then we add 1 to value of freq
-            if author in author_freq:
-                author_freq[author] += 1
-            else:
-            #if author does not exists in dictionary (else), then we set the author as 1
-                author_freq[author] = 1
-
-        authorname = list(author_freq.keys())
-        freq = list(author_freq.values())
-
-        #creating a bar plot
-        plt.bar(authorname, freq, color='red')
-        plt.xlabel('Author')
-        plt.xticks(rotation = 80)
-        plt.ylabel('Frequency')
-        plt.title('My Library Author Count')
-        plt.show()
-
+        #the counts are kept up to date by add_book and remove_book, every author of a book is counted
+        author_freq = self.author_counts()
+        self._draw_chart('author', author_freq, output, fmt, top)
         return author_freq
 
 
-    def freq_genre(self):
+    def freq_genre(self, output = None, fmt = None, top = None):
         """
         Tracks the times a genre exists within the library and creates a
         visualization of it (bar chart)
 
         param self
+        - output (str or file object, optional): if given, the chart is rendered headless (Agg backend,
+          no window) and written there as PNG or SVG instead of being shown with pyplot
+        - fmt (str, optional): 'png' or 'svg', by default taken from the output file extension
+        - top (int, optional): number of genres drawn, the rest are summed into an "Other" bar.
+          Defaults to every genre when showing and to charts.DEFAULT_TOP when writing to output
 
         return genre_freq: The dictionary used for the visualization
 
         """
 
-        #initialzie genre frequency dictionary
-        genre_freq = {}
-        for book in self.list:
-            #rechieving value necesary
-            genre = book.genre
+        #the counts are kept up to date by add_book and remove_book
+        genre_freq = self.genre_counts()
+        self._draw_chart('genre', genre_freq, output, fmt, top)
+        return genre_freq
 
-            #Checking if genre already exists in dictionary, if so add 1
-            if genre in genre_freq:
-                genre_freq[genre] += 1
-            #else is that the genre does not exist in dictionary so we add genre with value of 1
-            else:
-                genre_freq[genre] = 1
-
-        #retreiving the values in dictionary to use in our visualization
-        genre_name = list(genre_freq.keys())
-        freq = list(genre_freq.values())
-
-        #creating a bar plot
-        plt.bar(genre_name, freq, color='blue')
-        plt.xlabel('Genre')
-        plt.xticks(rotation = 45, ha='right')
-        plt.ylabel('Frequency')
-        plt.title('My Library Genre Count')
-        plt.show()
+    def render_charts(self, outputs, fmt = None, top = DEFAULT_TOP):
+        """
+        Renders several statistics charts headless in one pass, from a single snapshot of the counts.
+        Nothing is shown and no pyplot state is used, so this is safe on servers and in threads.
 
-        return genre_freq
+        - outputs (dict): chart name ('author' or 'genre') -> path or binary file object to write to,
+          or None to get the image bytes back
+        - fmt (str, optional): 'png' or 'svg', by default taken from each output file extension
+        - top (int, optional): number of bars per chart, the rest are summed into an "Other" bar;
+          None draws every bar
+
+        return: dictionary of chart name -> image bytes (for None outputs) or None
+        """
+        unknown = set(outputs) - set(CHART_STYLES)
+        if unknown:
+            raise ValueError(f"Unknown chart(s) {sorted(unknown)}; choose from {sorted(CHART_STYLES)}.")
+        counts = {'author': self.author_counts, 'genre': self.genre_counts}
+        rendered = {}
+        for name, output in outputs.items():
+            figure = make_figure(top_counts(counts[name](), top), CHART_STYLES[name])
+            rendered[name] = write_figure(figure, output, fmt)
+        return rendered
+
+    def _draw_chart(self, name, counts, output, fmt, top):
+        """
+        Shows a statistics chart with pyplot, or writes it headless when an output is given
+        """
+        if output is not None:
+            figure = make_figure(top_counts(counts, DEFAULT_TOP if top is None else top), CHART_STYLES[name])
+            write_figure(figure, output, fmt)
+            return
+        #an explicit figure, closed after showing, so figures do not pile up across calls
+        import matplotlib.pyplot as plt
+        figure, axes = plt.subplots()
+        draw_bars(axes, top_counts(counts, top), CHART_STYLES[name])
+        plt.show()
+        plt.close(figure)
 
     def progress_check(self):
         """
@@ -200,54 +1066,94 @@ class Library():
         return page_check_dict: the dictionary with the title and progress of book
         """
 
-        #Creating a dictionary to record our values
+        #the progress of each book is kept up to date when bookmarks change, so nothing is recomputed here
         page_check_dict = {}
+        for book, status in self._progress.items():
+            page_check_dict[book.title] = status
 
-            #for loop for all books in self.list
-        for book in self.list:
-            #grabbing values for bookmark and title
-            bookmark = book.get_bookmark()
-            title = book.title
+        return page_check_dict
 
-            #checking if statement for books if they have not started, currently reading, or completed
-            if bookmark == 0:
-                page_check_dict[title] = 'Not Started'
+    def attach_journal(self, journal):
+        """
+        Keeps the reading progress (bookmarks and favorites) of the library in a ProgressJournal,
+        so it survives restarts without saving or exporting the whole library.
 
-            #if bookmark is equal to the pagecount of the book, then that would mean it is completed
-            elif bookmark == book.page_count - 1:
-                page_check_dict[title] = 'Completed'
+        The progress recorded in the journal is restored onto the books of the library, and onto
+        every book added later, which also brings progress_check and list_favorites up to date.
+        From then on every bookmark or favorite change is appended to the journal. Books are
+        matched by ISBN; progress of books the journal does not know yet is recorded in it.
 
-            #if the bookmark is greater then 0 then that means that the book is currently in progress of being read
-            elif bookmark > 0:
-                page_check_dict[title] = 'Reading in Progress'
+        - journal (ProgressJournal or None): the journal, e.g. ProgressJournal("progress.jsonl"); None stops recording
+        """
+        self._journal = journal
+        if journal is not None:
+            for book in list(self._books):
+                self._restore_progress(book)
 
-        return page_check_dict
+    def _restore_progress(self, book):
+        """
+        Applies the progress recorded in the journal to a book, or records the book's progress if there is none.
+        """
+        recorded = self._journal.get(book.isbn)
+        if recorded is None:
+            if book.get_bookmark() or book.get_favorite():
+                self._journal.record(book.isbn, book.get_bookmark(), book.get_favorite())
+            return
+        bookmark, favorite = recorded
+        # Set directly: the journal may be restored before the book's text is loaded
+        if bookmark is not None and bookmark != book.get_bookmark():
+            book._bookmark = bookmark
+            book._notify('bookmark')
+        if favorite is not None and favorite != book.get_favorite():
+            book._favorite = favorite
+            book._notify('favorite')
+
+    def progress_summary(self):
+        """
+        Counts the books in each reading-progress state, in O(1) per state.
+
+        return: dictionary of 'Not Started' / 'Reading in Progress' / 'Completed' -> number of books
+        """
+        return {status: len(books) for status, books in self._progress_buckets.items()}
+
+    def books_by_progress(self, status):
+        """
+        Lists the titles of the books in one reading-progress state.
+
+        param status: 'Not Started', 'Reading in Progress' or 'Completed'
+
+        return: list of titles, in library order
+        raises KeyError: if status is not one of the three states
+        """
+        return [book.title for book in self._in_order(self._progress_buckets[status])]
 
-    def favorite_book(self, title):
+    def favorite_book(self, title, isbn = None):
         """
         sets the recieved book as a favorite, sets the favorite value to 1
 
         param title: the title of the book
+        param isbn: optional, picks the book by ISBN instead of title
 
         return none
         """
         #Sets book to 1 to indicate that it is a favorite book
-        book = self.search_by_title(title)
+        book = self._find_book(title, isbn)
         if book is None:
             return ValueError("No book found")
         else:
             book.set_favorite(1)
 
-    def unfavorite_book(self, title):
+    def unfavorite_book(self, title, isbn = None):
         """
         sets the recieved book as not a favorite (or unfavorites the book), sets the favorite value to 0
 
         param title: the title of the book
+        param isbn: optional, picks the book by ISBN instead of title
 
         return none
         """
         #Unfavorite book, set the favorite value to 0 to indicate that it is not a favorite
-        book = self.search_by_title(title)
+        book = self._find_book(title, isbn)
         if book is None:
             return ValueError("No book found")
         else:
@@ -262,22 +1168,63 @@ class Library():
 
         return favorite_books: list of all favorite books
         """
+        #favorites are tracked as they change, so only the favorite books are looked at
         favorite_books = []
-        for book in self.list:
-            if book.get_favorite() == 1:
-                favorite_books.append(book.title)
+        for book in self._in_order(self._favorites):
+            favorite_books.append(book.title)
         return favorite_books
 
+    def metrics(self):
+        """
+        Returns a snapshot of the performance metrics of this process and of this library.
+
+        Timings and counts (metadata lookups, tokenizing with its POS tagging and lemmatizing
+        parts, word tallies, searches, export) are only collected after instrumentation.enable()
+        is called; cache statistics and index sizes are always reported.
+
+        return: dictionary with 'timers' and 'counters' (see instrumentation.snapshot), 'caches'
+                (hit rates of Book.metadata_cache, when set, and of the lemma cache) and 'indexes'
+                (number of entries of each lookup index; 'tokens' is None until the first quote search)
+        """
+        metrics = instrumentation.snapshot()
+        lemma_info = _lemmatize_tagged.cache_info()
+        lookups = lemma_info.hits + lemma_info.misses
+        caches = {'lemma': {'hits': lemma_info.hits, 'misses': lemma_info.misses,
+                            'hit_rate': lemma_info.hits / lookups if lookups else 0.0,
+                            'size': lemma_info.currsize}}
+        if Book.metadata_cache is not None:
+            caches['metadata'] = Book.metadata_cache.stats()
+        metrics['caches'] = caches
+        metrics['indexes'] = {
+            'books': len(self._books),
+            'titles': len(self._by_title),
+            'isbns': len(self._by_isbn),
+            'authors': len(self._by_author),
+            'tokens': None if self._text_index is None else len(self._text_index),
+            'terms': self._term_stats.vocabulary_size(),
+            'term_documents': len(self._term_stats),
+            'sorted_views': len(self._sorted_views),
+        }
+        return metrics
+
 class Book():
     '''
     Represents a book with attributes like ISBN, genre, text, and more.
     It provides functionalities such as fetching book information using ISBN,
     managing reading progress, and analyzing the text for themes and word frequencies.
     '''
-    stopword_list = set(stopwords.words('english'))
-    lemmatizer = WordNetLemmatizer()
-
-    def __init__(self, isbn,  genre = None, text = None):
+    # Loaded from the NLTK data on first use rather than when the module is imported
+    stopword_list = _LazyClassAttribute(lambda: _load_stopwords())
+    lemmatizer = _LazyClassAttribute(lambda: _load_lemmatizer())
+    # Shared MetadataCache consulted by get_book_info; None means always ask isbnlib
+    metadata_cache = None
+    # Vocabulary the word tallies of all books are stored against
+    vocabulary = SHARED_VOCABULARY
+    # No per-instance __dict__: large catalogues hold many books, so each one is kept small
+    __slots__ = ('isbn', 'genre', '_text', 'title', 'authors', 'publisher', 'year', '_bookmark', '_favorite',
+                 '_observers', '_page_index', '_word_count', '_word_ids', '_word_counts', '_word_view', '_page_tallies')
+
+    def __init__(self, isbn,  genre = None, text = None, book_info = None, bookmark = 0, favorite = 0):
         '''
         Initializes a new instance of the Book class.
 
@@ -285,27 +1232,34 @@ class Book():
             isbn (str): The ISBN number of the book.
             genre (str, optional): The genre of the book.
             text (list of str, optional): The text content of the book, split into a list of pages.
+            book_info (tuple, optional): Already fetched (title, authors, publisher, year).
+                When given, get_book_info is not called.
+            bookmark (int, optional): The bookmarked page, e.g. as read back from Library.export_books. Defaults to 0.
+            favorite (int, optional): The favorite status (0 or 1). Defaults to 0.
 
         Raises:
             TypeError: If the ISBN is not provided.
             ValueError: If provided ISBN is invalid.
+            LookupError: If Book.metadata_cache is offline and does not know the ISBN.
         '''
         if isbn is None:
           raise TypeError("ISBN number is required before proceeding.")
         else:
           self.isbn = isbn
         self.genre = genre
+        # Callbacks called as observer(book, event, change) when the bookmark, favorite or text changes;
+        # a Library registers one to keep its statistics current. A tuple, smaller than a list
+        self._observers = ()
+        # Assigning text also resets the lazily computed analysis (word_count, word_dict, page_index)
         self.text = text if text is not None else []
-        book_info = self.get_book_info()
+        if book_info is None:
+            book_info = self.get_book_info()
         if book_info == 'Invalid ISBN':
             raise ValueError(book_info)
         else:
             self.title, self.authors, self.publisher, self.year = book_info
-        self._bookmark = 0
-        self._favorite = 0
-        self.page_count = len(self.text)
-        self.word_count = self.count_words()
-        self.word_dict = self.tally_words()
+        self._bookmark = bookmark
+        self._favorite = favorite
 
     def __str__(self):
         '''
@@ -325,10 +1279,262 @@ class Book():
         '''
         return len(self.text)
 
+    @property
+    def text(self):
+        '''
+        The text content of the book, as a list of pages, or a read-only sequence of pages
+        such as a PageStore view.
+
+        Assigning a new list invalidates the cached text analysis. To change single pages, use
+        append_page, replace_page and delete_page, which update the analysis instead of discarding
+        it. If the list is changed in place, call invalidate_analysis() afterwards.
+        '''
+        return self._text
+
+    @text.setter
+    def text(self, pages):
+        self._text = pages
+        self.invalidate_analysis()
+
+    @property
+    def page_count(self):
+        '''
+        Returns the number of pages in the book.
+
+        Returns:
+            int: The number of pages.
+        '''
+        return len(self._text)
+
+    @property
+    def word_count(self):
+        '''
+        The total number of words in the book, computed by count_words() on first access.
+
+        Returns:
+            int: The total number of words in the book's text.
+        '''
+        if self._word_count is None:
+            self._word_count = self.count_words()
+        return self._word_count
+
+    @property
+    def word_dict(self):
+        '''
+        The frequency of each word in the book, computed by tally_words() on first access.
+
+        This is the expensive part of a Book (POS tagging and lemmatizing every page), so it
+        is only paid for books that are actually analyzed. The tally is kept as arrays of
+        vocabulary ids and counts (see word_vector); the first access decodes them into a
+        read-only mapping, which is kept until the tally changes. Assign a dict to replace the tally.
+
+        Returns:
+            mappingproxy: A read-only mapping of words to their frequency counts.
+        '''
+        if self._word_view is None:
+            ids, counts = self.word_vector
+            self._word_view = MappingProxyType(self.vocabulary.decode(ids, counts))
+        return self._word_view
+
+    @word_dict.setter
+    def word_dict(self, word_dict):
+        self._set_tally(*self.vocabulary.encode(word_dict))
+        self._page_tallies = None
+
+    @property
+    def word_vector(self):
+        '''
+        The word tally in its compact form, computed by tally_words() on first access.
+
+        Returns:
+            tuple: (array('I') of ids in Book.vocabulary, array('I') of counts). The arrays are
+                   replaced, never changed in place, when the tally changes.
+        '''
+        if self._word_ids is None:
+            self._set_tally(*self.vocabulary.encode(self.tally_words()))
+        return self._word_ids, self._word_counts
+
+    @property
+    def page_index(self):
+        '''
+        The positional inverted index over the book's pages, built on first access.
+
+        Returns:
+            TextIndex: The index used by search_text; the book's pages are its one document, keyed None.
+        '''
+        if self._page_index is None:
+            self._page_index = TextIndex([(None, self._text)])
+        return self._page_index
+
+    def is_analyzed(self):
+        '''
+        Checks whether the word tally has already been computed.
+
+        Returns:
+            bool: True if word_dict is cached.
+        '''
+        return self._word_ids is not None
+
+    async def aanalyze(self, executor = None):
+        '''
+        Computes word_count and word_dict without blocking the running event loop.
+
+        Args:
+            executor (concurrent.futures.Executor, optional): Where the analysis runs. Defaults to the
+                event loop's default thread pool; a ProcessPoolExecutor also works and avoids the GIL.
+
+        Returns:
+            mappingproxy: The word tally, as returned by word_dict.
+        '''
+        import asyncio
+        if not self.is_analyzed():
+            outcome = await asyncio.get_running_loop().run_in_executor(executor, _analyze_text, list(self.text))
+            self._store_analysis(*outcome)
+        return self.word_dict
+
+    def _swap_text(self, pages):
+        '''Replaces the text with an equal sequence of pages (e.g. a PageStore view), keeping the cached analysis.'''
+        self._text = pages
+
+    def _store_analysis(self, word_count, word_dict):
+        '''Stores a word count and word tally computed elsewhere (e.g. in a worker process).'''
+        self._word_count = word_count
+        self._set_tally(*self.vocabulary.encode(word_dict))
+        self._page_tallies = None
+
+    def _set_tally(self, ids, counts):
+        '''Replaces the word tally arrays, dropping the decoded word_dict.'''
+        self._word_ids = ids
+        self._word_counts = counts
+        self._word_view = None
+
+    def invalidate_analysis(self):
+        '''
+        Forgets the cached word count, word tally and page index so they are rebuilt on next access,
+        and tells the observers the whole text changed, so the libraries holding the book reindex it.
+        '''
+        self._page_index = None
+        self._word_count = None
+        self._set_tally(None, None)
+        self._page_tallies = None
+        self._notify('text')
+
+    def append_page(self, page):
+        '''
+        Adds a page at the end of the book, updating the cached analysis instead of discarding it.
+
+        Args:
+            page (str): The text of the new page.
+        '''
+        self._edit_page(self.page_count, None, page)
+
+    def replace_page(self, number, page):
+        '''
+        Replaces the text of one page, updating the cached analysis instead of discarding it.
+
+        Only the edited page is tokenized: word_count, word_dict and the page index are corrected
+        by the difference between the old and the new page. The word tally of every edited page is
+        kept, so the old text needs tokenizing only the first time a page is edited.
+
+        Args:
+            number (int): The page number.
+            page (str): The new text of the page.
+
+        Raises:
+            IndexError: If the page number is out of bounds.
+        '''
+        self._edit_page(number, self._page(number), page)
+
+    def delete_page(self, number):
+        '''
+        Removes one page; the pages after it move down by one. The cached analysis is updated
+        instead of discarded. A bookmark after the page moves back with its page, and a bookmark
+        on a deleted last page moves back to the new last page.
+
+        Args:
+            number (int): The page number.
+
+        Raises:
+            IndexError: If the page number is out of bounds.
+        '''
+        self._edit_page(number, self._page(number), None)
+        last_page = max(self.page_count - 1, 0)
+        if number < self._bookmark:
+            self._bookmark -= 1
+            self._notify('bookmark')
+        elif self._bookmark > last_page:
+            self._bookmark = last_page
+            self._notify('bookmark')
+
+    def _page(self, number):
+        '''Returns the text of an existing page, raising IndexError for any other page number.'''
+        if 0 <= number < self.page_count:
+            return self._text[number]
+        raise IndexError(f"Page {number} is out of bounds. The book's pages go from 0 to {self.page_count - 1}.")
+
+    def _edit_page(self, number, old, new):
+        '''
+        Inserts (old is None), replaces or deletes (new is None) page number, applying the
+        difference to whatever analysis is cached, then tells the observers what changed.
+        '''
+        if not isinstance(self._text, list):
+            # A read-only sequence (e.g. a PageStore view) becomes a list on its first edit
+            self._text = list(self._text)
+        if self._word_count is not None:
+            for page, sign in ((old, -1), (new, 1)):
+                if page is not None:
+                    self._word_count += sign * len(page.split())
+        if self._word_ids is not None:
+            self._update_tally(number, old, new)
+        else:
+            self._page_tallies = None
+        if new is None:
+            del self._text[number]
+        elif old is None:
+            self._text.append(new)
+        else:
+            self._text[number] = new
+        if self._page_index is not None:
+            self._page_index.edit_page(None, number, old, new)
+        self._notify('text', {'page': number, 'old': old, 'new': new})
+
+    def _update_tally(self, number, old, new):
+        '''Applies a page edit to the word tally, tokenizing only the new page (and the old one if its tally is unknown).'''
+        vocabulary = self.vocabulary
+        tallies = self._page_tallies
+        if tallies is None:
+            # Page tallies aligned with the pages; None until a page is tokenized on its own
+            tallies = self._page_tallies = [None] * len(self._text)
+        word_dict = dict(self.word_dict)
+        if old is not None:
+            old_tally = tallies[number]
+            old_tally = vocabulary.decode(*old_tally) if old_tally is not None else tally_pages([old])
+            for word, count in old_tally.items():
+                left = word_dict.get(word, 0) - count
+                if left > 0:
+                    word_dict[word] = left
+                else:
+                    word_dict.pop(word, None)
+        if new is None:
+            del tallies[number]
+        else:
+            new_tally = tally_pages([new])
+            for word, count in new_tally.items():
+                word_dict[word] = word_dict.get(word, 0) + count
+            if old is None:
+                tallies.append(vocabulary.encode(new_tally))
+            else:
+                tallies[number] = vocabulary.encode(new_tally)
+        self._set_tally(*vocabulary.encode(word_dict))
+
+    @instrumentation.timed('get_book_info')
     def get_book_info(self):
         '''
         Fetches and returns detailed information about the book using its ISBN.
 
+        If Book.metadata_cache is set, the cache is consulted first and isbnlib is
+        only called on a miss.
+
         Returns:
             tuple: A tuple containing the title, authors, publisher, and year of the book.
             str: 'Invalid ISBN' if the ISBN is not valid.
@@ -337,18 +1543,37 @@ class Book():
             isbnlib._exceptions.NotValidISBNError: If the ISBN is not valid.
         '''
         try:
-            #Get book information
-            book = isbnlib.meta(self.isbn)
-
-            # Extract title from book information
-            title = book.get('Title', 'Title not found')
-            authors = book.get('Authors', 'Author not found')
-            publisher = book.get('Publisher', 'Publisher not found')
-            year = book.get('Year', 'Year not found')
-            return (title, authors, publisher, year)
+            #Get book information, from the cache when one is configured
+            if self.metadata_cache is not None:
+                book = self.metadata_cache.lookup(self.isbn)
+            else:
+                book = isbnlib.meta(self.isbn)
+
+            return Book.parse_book_info(book)
         except isbnlib._exceptions.NotValidISBNError:
             return 'Invalid ISBN'
 
+    @staticmethod
+    def parse_book_info(meta):
+        '''
+        Converts a metadata record, as returned by isbnlib.meta, into the tuple used by Book.
+
+        Args:
+            meta (dict): The metadata record.
+
+        Returns:
+            tuple: A tuple containing the title, authors, publisher, and year of the book.
+        '''
+        # Extract title from book information
+        title = meta.get('Title', 'Title not found')
+        authors = meta.get('Authors', 'Author not found')
+        # A list of its own, so books never share (and change) the record's list
+        if isinstance(authors, list):
+            authors = list(authors)
+        publisher = meta.get('Publisher', 'Publisher not found')
+        year = meta.get('Year', 'Year not found')
+        return (title, authors, publisher, year)
+
     def get_bookmark(self):
         '''
         Retrieves the current bookmark page number.
@@ -370,12 +1595,14 @@ class Book():
         '''
         if page < self.page_count:
           self._bookmark = page
+          self._notify('bookmark')
         else:
           raise IndexError(f"Page {page} is out of bounds. The book's pages go from 0 to {self.page_count - 1}.")
 
     def reset_bookmark(self):
         '''Resets the bookmark to the beginning of the book'''
         self._bookmark = 0
+        self._notify('bookmark')
 
     def get_favorite(self):
         '''
@@ -394,22 +1621,57 @@ class Book():
             number (int): The value to set the favorite status (0 or 1).
         '''
         self._favorite = number
+        self._notify('favorite')
+
+    def _notify(self, event, change = None):
+        '''
+        Tells the observers (e.g. the libraries holding this book) that something changed.
+        For a 'text' event, change is {'page': number, 'old': text, 'new': text} for a single page
+        edit (old is None for an added page, new None for a deleted one), or None when the whole
+        text was replaced.
+        '''
+        for observer in self._observers:
+            observer(self, event, change)
+
+    def __getstate__(self):
+        '''
+        Leaves the observers out when the book is pickled; they belong to this process.
+        The word tally is pickled as a dict, since vocabulary ids differ between processes.
+        '''
+        state = {name: getattr(self, name) for name in self.__slots__}
+        state['_observers'] = ()
+        state['_page_tallies'] = None
+        del state['_word_ids'], state['_word_counts']
+        del state['_word_view']
+        state['word_dict'] = dict(self.word_dict) if self.is_analyzed() else None
+        return state
+
+    def __setstate__(self, state):
+        word_dict = state.pop('word_dict')
+        for name, value in state.items():
+            setattr(self, name, value)
+        self._set_tally(None, None)
+        if word_dict is not None:
+            self._set_tally(*self.vocabulary.encode(word_dict))
 
     def search_text(self, quotation):
         '''
-        Searches for a given quotation in the book's text.
+        Searches for a given quotation in the book's text. Case-insensitive; the book's page
+        index narrows the search to the pages that may contain the quotation.
 
         Args:
             quotation (str): The quotation to search for.
 
         Returns:
-            list of int: A list of page numbers where the quotation is found, or None if not found.
+            list of int: A list of page numbers where the quotation is found, empty if not found.
         '''
-        pages_found = []
-        for i in range(len(self.text)):
-            if quotation in self.text[i]:
-                pages_found.append(i)
-        return pages_found
+        tokens = search_tokens(quotation)
+        if tokens:
+            candidates = sorted(number for key, number in self.page_index.find(tokens))
+        else:
+            candidates = range(len(self.text))
+        needle = quotation.lower()
+        return [number for number in candidates if needle in self.text[number].lower()]
 
     @staticmethod
     def get_wordnet_pos(treebank_tag):
@@ -425,14 +1687,7 @@ class Book():
         Returns:
             str: A simplified POS tag compatible with the WordNetLemmatizer.
         '''
-        tag = {
-            'J': wordnet.ADJ,
-            'V': wordnet.VERB,
-            'N': wordnet.NOUN,
-            'R': wordnet.ADV
-        }.get(treebank_tag[0], wordnet.NOUN)  # Default to noun
-
-        return tag
+        return WORDNET_POS.get(treebank_tag[0], 'n')  # Default to noun
 
     def tokenize(self, page):
         '''
@@ -444,41 +1699,18 @@ class Book():
         Returns:
             list of str: A list of tokenized words.
         '''
-        words = page.split()
-
-        '''
-        The following step is necessary to prevent the lemmatizer from making mistakes
-        like considering 'was' a noun and removing the 's' in order to singularize it.
-        '''
-        tokens_with_pos = nltk.pos_tag(words)
-
-        y = []
-        for word, pos in tokens_with_pos:
-            new_word = "".join([char.lower() for char in word if char.isalnum()])
-            lemmatized_word = self.lemmatizer.lemmatize(new_word, pos=Book.get_wordnet_pos(pos))
-            if lemmatized_word not in self.stopword_list:
-                y.append(lemmatized_word)
-        return y
+        return tokenize_pages([page])[0]
 
     def tally_words(self):
         '''
         Counts the frequency of each word in the book's text.
 
+        Pages are tokenized in batches with tokenize_pages, which tags many pages per call.
+
         Returns:
             dict: A dictionary mapping words to their frequency counts.
         '''
-        words = []
-        for page in self.text:
-            words.extend(self.tokenize(page))
-
-        word_tally = {}
-        for word in words:
-            if word in word_tally:
-                word_tally[word] += 1
-            else:
-                word_tally[word] = 1
-
-        return word_tally
+        return tally_pages(self.text)
 
     def count_words(self):
       '''
@@ -500,19 +1732,521 @@ class Book():
         '''
         Identifies the most frequent themes (words) in the book.
 
+        Use Library.themes to rank words by TF-IDF across all the books of a library instead.
+
         Args:
             theme_count (int, optional): The number of themes to identify. Defaults to 5.
 
         Returns:
             list of str: A list of the most frequent words in the book.
         '''
-        sorted_words = sorted(self.word_dict.items(), key=lambda item: item[1], reverse=True)
-        theme_words = []
-        for word in sorted_words:
-            theme_words.append(word[0])
-            theme_count -= 1
-            if theme_count == 0:
-                return theme_words
+        # A heap keeps only the top theme_count words instead of sorting the whole tally
+        top_words = heapq.nlargest(theme_count, self.word_dict.items(), key=lambda item: item[1])
+        return [word for word, count in top_words]
+
+
+class _NormalizeTable(dict):
+    '''
+    str.translate table that drops characters which are not alphanumeric and lowercases the rest.
+    Entries are filled in the first time a character is seen, so any Unicode text is handled.
+    '''
+
+    def __missing__(self, ordinal):
+        char = chr(ordinal)
+        mapped = char.lower() if char.isalnum() else None
+        self[ordinal] = mapped
+        return mapped
+
+
+_NORMALIZE_TABLE = _NormalizeTable()
+
+
+@functools.lru_cache(maxsize=LEMMA_CACHE_SIZE)
+def _lemmatize_tagged(word, treebank_tag):
+    '''
+    Normalizes a raw word and lemmatizes it for its Penn Treebank tag. Memoized, since words repeat a lot.
+    Lemmas are interned, so every book's tally shares one string per word with the vocabulary.
+    '''
+    return sys.intern(Book.lemmatizer.lemmatize(word.translate(_NORMALIZE_TABLE), pos=Book.get_wordnet_pos(treebank_tag)))
+
+
+@instrumentation.timed('tokenize')
+def tokenize_pages(pages):
+    '''
+    Tokenizes many pages at once into lemmatized words, excluding stopwords.
+
+    All pages are POS-tagged with a single nltk.pos_tag_sents call (which loads the tagger once),
+    and lemmas are looked up through a bounded cache. The pages may come from several books.
+    The result for each page is the same as Book.tokenize(page).
+
+    The following tagging step is necessary to prevent the lemmatizer from making mistakes
+    like considering 'was' a noun and removing the 's' in order to singularize it.
+
+    Args:
+        pages (list of str): The page texts.
+
+    Returns:
+        list of list of str: The tokenized words of each page, in page order.
+    '''
+    import nltk
+    instrumentation.count('tokenize.pages', len(pages))
+    try:
+        with instrumentation.section('tokenize.pos_tag'):
+            tagged_pages = nltk.pos_tag_sents([page.split() for page in pages])
+    except LookupError as error:
+        raise _missing_nltk_data(error) from None
+    stopword_list = Book.stopword_list
+    tokenized = []
+    with instrumentation.section('tokenize.lemmatize'):
+        for tagged in tagged_pages:
+            words = []
+            for word, tag in tagged:
+                lemmatized_word = _lemmatize_tagged(word, tag)
+                if lemmatized_word not in stopword_list:
+                    words.append(lemmatized_word)
+            tokenized.append(words)
+    return tokenized
+
+
+@instrumentation.timed('tally_words')
+def tally_pages(pages):
+    '''
+    Counts the frequency of each tokenized word over a list of pages, tagging TAG_BATCH_PAGES pages per call.
+
+    Args:
+        pages (list of str): The page texts.
+
+    Returns:
+        dict: A dictionary mapping words to their frequency counts, in order of first appearance.
+    '''
+    word_tally = {}
+    for start in range(0, len(pages), TAG_BATCH_PAGES):
+        for words in tokenize_pages(pages[start:start + TAG_BATCH_PAGES]):
+            for word in words:
+                word_tally[word] = word_tally.get(word, 0) + 1
+    return word_tally
+
+
+def _normalize(key):
+    '''Normalizes a title, ISBN or author name into a lookup key.'''
+    normalized = str(key).strip().lower()
+    # An already normalized key (e.g. most ISBNs) is shared with the book rather than copied
+    return key if normalized == key else normalized
+
+
+def _author_names(book):
+    '''Returns a book's authors as a list; isbnlib gives a list, but a missing author is a plain string.'''
+    if isinstance(book.authors, str):
+        return [book.authors]
+    return list(book.authors)
+
+
+def _count(counts, key, delta):
+    '''Adds delta to counts[key], dropping the key when it reaches zero.'''
+    total = counts.get(key, 0) + delta
+    if total:
+        counts[key] = total
+    else:
+        del counts[key]
+
+
+def _progress_status(book):
+    '''
+    Returns the reading-progress state of a book: 'Not Started' at page 0, 'Completed' on the
+    last page, 'Reading in Progress' in between (None if the bookmark is somehow negative).
+    '''
+    bookmark = book.get_bookmark()
+    if bookmark == 0:
+        return 'Not Started'
+    elif bookmark == book.page_count - 1:
+        return 'Completed'
+    elif bookmark > 0:
+        return 'Reading in Progress'
+    return None
+
+
+def _index_add(index, key, book):
+    '''Adds a book under key in a key -> book (or list of books) index.'''
+    books = index.get(key)
+    if books is None:
+        # Most keys belong to a single book, which is stored without a list
+        index[key] = book
+    elif isinstance(books, list):
+        books.append(book)
+    else:
+        index[key] = [books, book]
+
+
+def _index_remove(index, key, book):
+    '''Removes a book from a key -> book (or list of books) index, dropping the key when it empties.'''
+    books = index.get(key)
+    if books is book:
+        del index[key]
+    elif isinstance(books, list):
+        for i, other in enumerate(books):
+            if other is book:
+                del books[i]
+                break
+        if len(books) == 1:
+            index[key] = books[0]
+
+
+def _index_get(index, key):
+    '''Returns the books under key in a key -> book (or list of books) index, as a sequence.'''
+    books = index.get(key)
+    if books is None:
+        return ()
+    if isinstance(books, list):
+        return books
+    return (books,)
+
+
+def _single(books, field, value):
+    '''Returns the only book in books, None if there is none, or raises ValueError if there are several.'''
+    if not books:
+        return None
+    if len(books) > 1:
+        raise ValueError(f"{len(books)} books in the library match {field} {value!r}")
+    return books[0]
+
+
+class _RateLimiter():
+    '''Spaces out calls from several threads so that at most `rate` happen per second.'''
+
+    def __init__(self, rate):
+        self.interval = 1.0 / rate
+        self.next_time = 0.0
+        self.lock = threading.Lock()
+
+    def wait(self):
+        with self.lock:
+            now = time.monotonic()
+            start = max(now, self.next_time)
+            self.next_time = start + self.interval
+        if start > now:
+            time.sleep(start - now)
+
+
+def _fetch_with_retry(fetch, isbn, retries, retry_delay, limiter):
+    '''
+    Calls fetch(isbn), retrying transient errors with exponential backoff. Invalid ISBNs and
+    LookupErrors (e.g. an offline MetadataCache missing the ISBN) would fail again, so they are raised at once.
+    '''
+    attempt = 0
+    while True:
+        if limiter is not None:
+            limiter.wait()
+        try:
+            return fetch(isbn)
+        except (isbnlib._exceptions.NotValidISBNError, LookupError):
+            raise
+        except Exception:
+            if attempt >= retries:
+                raise
+            time.sleep(retry_delay * 2 ** attempt)
+            attempt += 1
+
+
+def _fetch_book_info(isbn, fetch = None):
+    '''Fetches the metadata of an ISBN as the (title, authors, publisher, year) tuple used by Book.'''
+    if fetch is None:
+        fetch = Book.metadata_cache.lookup if Book.metadata_cache is not None else isbnlib.meta
+    try:
+        return Book.parse_book_info(fetch(isbn))
+    except isbnlib._exceptions.NotValidISBNError:
+        raise ValueError('Invalid ISBN') from None
+
+
+def _call_locked(lock, function, *args):
+    '''Calls function(*args) while holding lock.'''
+    with lock:
+        return function(*args)
+
+
+def _init_analysis_worker():
+    '''Process pool initializer: loads the stopword list, lemmatizer and tagger once per worker.'''
+    Book.stopword_list
+    Book.lemmatizer.lemmatize('warm')
+    tokenize_pages(['warm up'])
+
+
+def _analyze_text(pages):
+    '''
+    Computes (word_count, word_dict) for a list of pages, as Book.count_words and Book.tally_words do.
+    Module level so process pools can pickle it.
+    '''
+    return sum(len(page.split()) for page in pages), tally_pages(pages)
+
+
+def _settle(outcome):
+    '''Returns the result of a Future, or the exception it raised. Anything else is returned unchanged.'''
+    if isinstance(outcome, Future):
+        try:
+            return outcome.result()
+        except Exception as error:
+            return error
+    return outcome
+
+
+# One Python string literal, single or double quoted, with backslash escapes
+_STRING_LITERAL_RE = re.compile(r"'[^'\\\n]*(?:\\.[^'\\\n]*)*'|\"[^\"\\\n]*(?:\\.[^\"\\\n]*)*\"", re.S)
+_SEPARATOR_RE = re.compile(r'\s*(?:,\s*)?')
+_WHITESPACE_RE = re.compile(r'\s*')
+
+
+def parse_page_list(literal):
+    '''
+    Parses the text column of the book CSV format: a Python list of strings, as written by repr().
+
+    String literals are matched with a regular expression and only the ones containing escapes are
+    decoded with ast.literal_eval, so this is much faster and lighter than evaluating the whole list.
+    Anything that does not look like a plain list of strings falls back to ast.literal_eval.
+
+    Args:
+        literal (str): The list literal, e.g. "['page one', \"page two's\"]".
+
+    Returns:
+        list of str: The pages.
+
+    Raises:
+        ValueError: If the literal cannot be parsed.
+    '''
+    text = literal.strip()
+    if not (text.startswith('[') and text.endswith(']')):
+        return _literal_page_list(literal)
+    pages = []
+    pos = _WHITESPACE_RE.match(text, 1).end()
+    end = len(text) - 1
+    while pos < end:
+        match = _STRING_LITERAL_RE.match(text, pos)
+        if match is None:
+            return _literal_page_list(literal)
+        page = match.group()
+        pages.append(page[1:-1] if '\\' not in page else ast.literal_eval(page))
+        pos = match.end()
+        separator = _SEPARATOR_RE.match(text, pos)
+        if separator.end() < end and ',' not in separator.group():
+            # Two literals next to each other are concatenated by Python; leave that to literal_eval
+            return _literal_page_list(literal)
+        pos = separator.end()
+    return pages
+
+
+def _literal_page_list(literal):
+    '''Parses a page list with ast.literal_eval, checking that it really is a list.'''
+    try:
+        pages = ast.literal_eval(literal)
+    except SyntaxError as error:
+        raise ValueError(f"Malformed page list: {error}") from None
+    if isinstance(pages, tuple):
+        pages = list(pages)
+    if not isinstance(pages, list):
+        raise ValueError("The text field must be a list of pages.")
+    return pages
+
+
+def _parse_authors(field):
+    '''Parses the authors column of a full book row: a list literal, or a plain string literal.'''
+    if field.lstrip().startswith('['):
+        return parse_page_list(field)
+    return ast.literal_eval(field)
+
+
+def _open_text(path, mode):
+    '''Opens a UTF-8 text file for csv or line access, through gzip if the name ends in .gz.'''
+    if path.endswith('.gz'):
+        return gzip.open(path, mode + 't', encoding='utf-8', newline='')
+    return open(path, mode, encoding='utf-8', newline='')
+
+
+def book_row(book):
+    '''
+    Returns the full CSV row of a book, as written by Library.export_books.
+
+    Args:
+        book (Book): The book.
+
+    Returns:
+        list: isbn, genre, text, title, authors, publisher, year, bookmark and favorite,
+              with the page list and authors written as Python literals.
+    '''
+    authors = book.authors if isinstance(book.authors, str) else list(book.authors)
+    return [book.isbn, _none_field(book.genre), repr(list(book.text)), _none_field(book.title), repr(authors),
+            _none_field(book.publisher), _none_field(book.year), book.get_bookmark(), book.get_favorite()]
+
+
+def _none_field(value):
+    '''Replaces None with NONE_FIELD, since the csv module writes None and '' alike.'''
+    return NONE_FIELD if value is None else value
+
+
+def _parse_none_field(field):
+    '''Reads back a field written by _none_field.'''
+    return None if field == NONE_FIELD else field
+
+
+def write_book_csv(path, books, chunk_size = EXPORT_CHUNK_ROWS):
+    '''
+    Writes the full rows of books to a CSV file, gzip-compressed if the name ends in .gz.
+
+    Args:
+        path (str): The file to write.
+        books (iterable of Book): The books, in order.
+        chunk_size (int, optional): Number of rows handed to the csv writer at a time.
+
+    Returns:
+        int: The number of rows written.
+    '''
+    rows = map(book_row, books)
+    written = 0
+    with _open_text(path, 'w') as file:
+        writer = csv.writer(file)
+        while True:
+            chunk = list(itertools.islice(rows, chunk_size))
+            if not chunk:
+                return written
+            writer.writerows(chunk)
+            written += len(chunk)
+
+
+def shard_paths(path, shards):
+    '''
+    Returns the file names of the shards of an export, e.g. library-00001-of-00004.csv.gz.
+
+    Args:
+        path (str): The name of the unsharded export.
+        shards (int): The number of shards.
+
+    Returns:
+        list of str: One path per shard, numbered from 1.
+    '''
+    directory, name = os.path.split(path)
+    stem, dot, extension = name.partition('.')
+    return [os.path.join(directory, f'{stem}-{number:05d}-of-{shards:05d}{dot}{extension}')
+            for number in range(1, shards + 1)]
+
+
+def _allow_large_csv_fields():
+    '''Raises the csv module's field size limit (128 KB by default) so whole novels fit in one field.'''
+    limit = sys.maxsize
+    while True:
+        try:
+            csv.field_size_limit(limit)
+            return
+        except OverflowError:
+            limit //= 2
+
+
+def iter_csv(csv_file):
+    '''
+    Reads a book CSV file one row at a time.
+
+    The file has the format described in csv_to_dict. Only one record is held in memory at a time,
+    so this can feed Library.add_books_bulk with files of any size. Files whose name ends in .gz
+    are decompressed on the fly.
+
+    Rows written by Library.export_books have six more columns (title, authors, publisher, year,
+    bookmark, favorite), which are returned as the record's 'book_info', 'bookmark' and 'favorite',
+    so Book(**record) rebuilds the exported book. In those rows NONE_FIELD stands for None.
+
+    Args:
+        csv_file (str): The path to the CSV file to be read.
+
+    Yields:
+        dict: A record with keys 'isbn', 'genre', and 'text', plus 'book_info', 'bookmark'
+              and 'favorite' for full rows.
+
+    Raises:
+        FileNotFoundError: If the specified CSV file does not exist.
+        ValueError: If the 'text' field in a row cannot be converted to a list.
+        IndexError: If a row in the CSV file does not contain the expected number of fields.
+    '''
+    _allow_large_csv_fields()
+    with _open_text(csv_file, 'r') as file:
+        for row in csv.reader(file):
+            record = {
+                "isbn": row[0],
+                "genre": row[1],
+                "text": parse_page_list(row[2])
+            }
+            if len(row) > 3:
+                record["genre"] = _parse_none_field(row[1])
+                record["book_info"] = (_parse_none_field(row[3]), _parse_authors(row[4]),
+                                       _parse_none_field(row[5]), _parse_none_field(row[6]))
+                record["bookmark"] = int(row[7])
+                record["favorite"] = int(row[8])
+            yield record
+
+
+def iter_jsonl(jsonl_file):
+    '''
+    Reads a JSON lines file of books one line at a time.
+
+    Each non-empty line is a JSON object with keys 'isbn', 'genre' and 'text' (a list of pages).
+    Lines converted from full rows (see iter_csv) also keep their 'book_info', 'bookmark' and 'favorite'.
+
+    Args:
+        jsonl_file (str): The path to the JSON lines file.
+
+    Yields:
+        dict: A record with keys 'isbn', 'genre', and 'text', plus 'book_info', 'bookmark'
+              and 'favorite' when the line has them.
+
+    Raises:
+        FileNotFoundError: If the file does not exist.
+        ValueError: If a line is not valid JSON.
+    '''
+    with _open_text(jsonl_file, 'r') as file:
+        for line in file:
+            if line.strip():
+                record = json.loads(line)
+                result = {
+                    "isbn": record["isbn"],
+                    "genre": record.get("genre"),
+                    "text": record.get("text", [])
+                }
+                if "book_info" in record:
+                    result["book_info"] = tuple(record["book_info"])
+                    result["bookmark"] = record.get("bookmark", 0)
+                    result["favorite"] = record.get("favorite", 0)
+                yield result
+
+
+def iter_records(path):
+    '''
+    Streams book records from a CSV file or, if the name ends in .jsonl, a JSON lines file.
+    Either can be gzip-compressed, with .gz added to the name.
+
+    Args:
+        path (str): The path to the file.
+
+    Returns:
+        iterator of dict: Records with keys 'isbn', 'genre', and 'text'.
+    '''
+    if path.endswith(('.jsonl', '.jsonl.gz')):
+        return iter_jsonl(path)
+    return iter_csv(path)
+
+
+def csv_to_jsonl(csv_file, jsonl_file):
+    '''
+    Converts a book CSV file to the JSON lines format, streaming one record at a time.
+    Either file can be gzip-compressed, with .gz added to the name.
+
+    Args:
+        csv_file (str): The path to the CSV file to read.
+        jsonl_file (str): The path to the JSON lines file to write.
+
+    Returns:
+        int: The number of records written.
+    '''
+    count = 0
+    with _open_text(jsonl_file, 'w') as file:
+        for record in iter_csv(csv_file):
+            file.write(json.dumps(record, ensure_ascii=False))
+            file.write('\n')
+            count += 1
+    return count
 
 
 def csv_to_dict(csv_file):
@@ -521,7 +2255,9 @@ def csv_to_dict(csv_file):
 
     This function reads a CSV file where each row represents a book. It expects each row to have 
     at least three fields: ISBN, genre, and text. The 'text' field should be a string representation
-    of a list, which is converted back into a list using `ast.literal_eval`.
+    of a list, which is converted back into a list using parse_page_list.
+
+    This loads the whole file; use iter_csv to stream large files instead.
 
     Args:
         csv_file (str): The path to the CSV file to be read.
@@ -535,17 +2271,7 @@ def csv_to_dict(csv_file):
         ValueError: If the 'text' field in a row cannot be converted to a list.
         IndexError: If a row in the CSV file does not contain the expected number of fields.
     '''
-    books_dict = []
-    with open(csv_file, mode='r', encoding='utf-8') as file:
-        reader = csv.reader(file)
-        for row in reader:
-            book = {
-                "isbn": row[0],
-                "genre": row[1],
-                "text": ast.literal_eval(row[2])
-            }
-            books_dict.append(book)
-    return books_dict
+    return list(iter_csv(csv_file))
 
 
 if __name__ == '__main__':
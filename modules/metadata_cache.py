@@ -0,0 +1,215 @@
+import shelve
+import threading
+import time
+from collections import OrderedDict
+
+import isbnlib
+
+
+class MetadataCache():
+    '''
+    Caches ISBN metadata lookups so that building a Book does not have to go
+    over the network every time.
+
+    Lookups go through two tiers: a bounded in-memory LRU (with an optional
+    time-to-live) in front of an optional on-disk shelve store that survives
+    restarts. Invalid ISBNs are cached as well (negative caching), and in
+    offline mode the network is never touched: a key that is not cached
+    raises a LookupError instead of being fetched.
+    '''
+
+    def __init__(self, path=None, maxsize=1024, ttl=None, negative_ttl=None, offline=False, fetch=None):
+        '''
+        Initializes a new metadata cache.
+
+        Args:
+            path (str, optional): Path of the on-disk shelve store. If None, only the in-memory tier is used.
+            maxsize (int, optional): Maximum number of entries kept in memory. Defaults to 1024.
+            ttl (float, optional): Seconds before a cached record is considered stale. None means never.
+            negative_ttl (float, optional): Seconds before a cached 'invalid ISBN' result is considered stale.
+                None means never, which is safe because ISBN validity does not change.
+            offline (bool, optional): If True, never call the metadata source; stale entries are still served.
+            fetch (callable, optional): The metadata source, called as fetch(isbn). Defaults to isbnlib.meta.
+
+        Raises:
+            ValueError: If maxsize is smaller than 1.
+        '''
+        if maxsize < 1:
+            raise ValueError("maxsize must be at least 1.")
+        self.path = path
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self.negative_ttl = negative_ttl
+        self.offline = offline
+        self.fetch = fetch if fetch is not None else isbnlib.meta
+        self.hits = 0
+        self.misses = 0
+        self._memory = OrderedDict()
+        self._lock = threading.Lock()
+        self._disk = shelve.open(path) if path is not None else None
+
+    def __len__(self):
+        '''
+        Returns the number of entries held in memory.
+
+        Returns:
+            int: The number of in-memory entries.
+        '''
+        return len(self._memory)
+
+    def __contains__(self, isbn):
+        '''
+        Checks whether an ISBN is cached in either tier, stale or not.
+
+        Args:
+            isbn (str): The ISBN to look for.
+
+        Returns:
+            bool: True if the ISBN is cached.
+        '''
+        key = self._key(isbn)
+        with self._lock:
+            if key in self._memory:
+                return True
+            return self._disk is not None and key in self._disk
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.close()
+
+    @staticmethod
+    def _key(isbn):
+        '''Normalizes an ISBN into the key used by both tiers.'''
+        return str(isbn).strip()
+
+    def _is_fresh(self, entry):
+        '''Checks whether a (stored_at, meta) entry is still within its time-to-live.'''
+        stored_at, meta = entry
+        ttl = self.negative_ttl if meta is None else self.ttl
+        return ttl is None or time.time() - stored_at < ttl
+
+    def _remember(self, key, entry):
+        '''Puts an entry at the front of the in-memory LRU, evicting the oldest if full.'''
+        self._memory[key] = entry
+        self._memory.move_to_end(key)
+        while len(self._memory) > self.maxsize:
+            self._memory.popitem(last=False)
+
+    def _get(self, key):
+        '''Returns the cached entry for key from memory or disk, or None.'''
+        with self._lock:
+            entry = self._memory.get(key)
+            if entry is not None:
+                self._memory.move_to_end(key)
+                return entry
+            if self._disk is not None:
+                entry = self._disk.get(key)
+                if entry is not None:
+                    self._remember(key, entry)
+            return entry
+
+    def put(self, isbn, meta):
+        '''
+        Stores a metadata record in both tiers.
+
+        Args:
+            isbn (str): The ISBN the record belongs to.
+            meta (dict or None): The metadata returned by the source, or None to mark the ISBN invalid.
+        '''
+        key = self._key(isbn)
+        entry = (time.time(), meta)
+        with self._lock:
+            self._remember(key, entry)
+            if self._disk is not None:
+                self._disk[key] = entry
+
+    def lookup(self, isbn):
+        '''
+        Returns the metadata for an ISBN, fetching and caching it on a miss.
+
+        Args:
+            isbn (str): The ISBN to look up.
+
+        Returns:
+            dict: A copy of the metadata record, in the format returned by isbnlib.meta, that the
+                  caller may change without affecting the cache.
+
+        Raises:
+            isbnlib.NotValidISBNError: If the ISBN is (or was cached as) invalid.
+            LookupError: If the cache is offline and the ISBN is not cached.
+        '''
+        key = self._key(isbn)
+        entry = self._get(key)
+        if entry is not None and (self.offline or self._is_fresh(entry)):
+            self.hits += 1
+            if entry[1] is None:
+                raise isbnlib.NotValidISBNError(isbn)
+            return _copy_meta(entry[1])
+
+        self.misses += 1
+        if self.offline:
+            raise LookupError(f"ISBN {isbn} is not cached and the metadata cache is offline.")
+        try:
+            meta = self.fetch(isbn)
+        except isbnlib.NotValidISBNError:
+            self.put(key, None)
+            raise
+        self.put(key, meta)
+        return _copy_meta(meta)
+
+    def invalidate(self, isbn):
+        '''
+        Removes an ISBN from both tiers.
+
+        Args:
+            isbn (str): The ISBN to forget.
+        '''
+        key = self._key(isbn)
+        with self._lock:
+            self._memory.pop(key, None)
+            if self._disk is not None and key in self._disk:
+                del self._disk[key]
+
+    def clear(self):
+        '''Removes every entry from both tiers and resets the hit/miss counters.'''
+        with self._lock:
+            self._memory.clear()
+            if self._disk is not None:
+                self._disk.clear()
+        self.hits = 0
+        self.misses = 0
+
+    def stats(self):
+        '''
+        Reports how effective the cache has been.
+
+        Returns:
+            dict: Keys 'hits', 'misses', 'hit_rate' and 'size' (in-memory entries).
+        '''
+        total = self.hits + self.misses
+        return {
+            'hits': self.hits,
+            'misses': self.misses,
+            'hit_rate': self.hits / total if total else 0.0,
+            'size': len(self._memory),
+        }
+
+    def sync(self):
+        '''Flushes pending writes of the on-disk store.'''
+        with self._lock:
+            if self._disk is not None:
+                self._disk.sync()
+
+    def close(self):
+        '''Flushes and closes the on-disk store. The in-memory tier stays usable.'''
+        with self._lock:
+            if self._disk is not None:
+                self._disk.close()
+                self._disk = None
+
+
+def _copy_meta(meta):
+    '''Copies a metadata record and its lists (e.g. 'Authors'), so callers never share the cached ones.'''
+    return {key: list(value) if isinstance(value, list) else value for key, value in meta.items()}
@@ -0,0 +1,197 @@
+import mmap
+import os
+import struct
+import sys
+from array import array
+from collections.abc import Sequence
+
+# File layout:
+#   preamble: magic, format version, offset table position, number of pages (little endian)
+#   page text: every page, UTF-8 encoded, back to back
+#   offset table: unsigned 64-bit ints, the start of each page in the page text plus the end
+MAGIC = b'PAGESTO\0'
+FORMAT_VERSION = 1
+_PREAMBLE = struct.Struct('<8sHQQ')
+
+
+class MappedPages(Sequence):
+    '''
+    Read-only list of pages whose text stays in a memory-mapped file.
+
+    Pages are decoded on access, so only the pages that are actually read take up memory.
+    Supports len(), indexing, slicing and iteration like the list of pages it replaces.
+    '''
+
+    def __init__(self, buffer, text_start, offsets, first, count):
+        '''
+        Args:
+            buffer (mmap.mmap): The mapped file.
+            text_start (int): Position of the page text region in the file.
+            offsets (sequence of int): Start of each page in the text region, plus the end of the last.
+            first (int): Index of this sequence's first page in offsets.
+            count (int): Number of pages in this sequence.
+        '''
+        self._buffer = buffer
+        self._text_start = text_start
+        self._offsets = offsets
+        self._first = first
+        self._count = count
+
+    def __len__(self):
+        return self._count
+
+    def __getitem__(self, index):
+        if isinstance(index, slice):
+            return [self[i] for i in range(*index.indices(self._count))]
+        if index < 0:
+            index += self._count
+        if not 0 <= index < self._count:
+            raise IndexError('page index out of range')
+        page = self._first + index
+        start = self._text_start + self._offsets[page]
+        end = self._text_start + self._offsets[page + 1]
+        return self._buffer[start:end].decode('utf-8')
+
+    def __repr__(self):
+        return f'<MappedPages of {self._count} pages>'
+
+
+def write_pages(file, page_lists):
+    '''
+    Writes pages to an open binary file, back to back, and returns their offset table.
+
+    Args:
+        file (file object): The file to write to, positioned where the text region starts.
+        page_lists (iterable of iterable of str): The pages of each book.
+
+    Returns:
+        tuple: The offsets (array of unsigned 64-bit ints, relative to the start of the text region)
+               and a list of (first page, page count) spans, one per page list.
+    '''
+    offsets = array('Q', [0])
+    spans = []
+    position = 0
+    for pages in page_lists:
+        first = len(offsets) - 1
+        for page in pages:
+            data = page.encode('utf-8')
+            file.write(data)
+            position += len(data)
+            offsets.append(position)
+        spans.append((first, len(offsets) - 1 - first))
+    return offsets, spans
+
+
+def write_offsets(file, offsets):
+    '''Writes an offset table to a binary file in little-endian order.'''
+    if sys.byteorder != 'little':
+        offsets = array('Q', offsets)
+        offsets.byteswap()
+    file.write(offsets.tobytes())
+
+
+def map_offsets(buffer, position, page_total):
+    '''
+    Returns the offset table stored at position in a mapped file without copying it when possible.
+
+    Args:
+        buffer (mmap.mmap): The mapped file.
+        position (int): Where the table starts.
+        page_total (int): The number of pages (the table has one more entry).
+
+    Returns:
+        sequence of int: The offsets.
+    '''
+    end = position + 8 * (page_total + 1)
+    if sys.byteorder == 'little':
+        return memoryview(buffer)[position:end].cast('Q')
+    offsets = array('Q')
+    offsets.frombytes(buffer[position:end])
+    offsets.byteswap()
+    return offsets
+
+
+class PageStore():
+    '''
+    A file holding the pages of many books, memory-mapped for reading.
+
+    Book.text can be a view from a PageStore instead of a list of strings: the views behave like
+    read-only lists, and a page is only read from the file when it is accessed, so resident
+    memory depends on the pages touched rather than on the size of the library.
+    '''
+
+    def __init__(self, path):
+        '''
+        Opens an existing page store file.
+
+        Args:
+            path (str): The file, as written by PageStore.build.
+
+        Raises:
+            ValueError: If the file is not a page store or was written by a newer format version.
+        '''
+        self.path = path
+        with open(path, 'rb') as file:
+            if os.fstat(file.fileno()).st_size < _PREAMBLE.size:
+                raise ValueError(f'{path} is not a page store')
+            self._buffer = mmap.mmap(file.fileno(), 0, access=mmap.ACCESS_READ)
+        magic, version, offsets_position, self.page_total = _PREAMBLE.unpack_from(self._buffer, 0)
+        if magic != MAGIC:
+            raise ValueError(f'{path} is not a page store')
+        if version > FORMAT_VERSION:
+            raise ValueError(f'{path} uses page store format {version}; this version reads up to {FORMAT_VERSION}')
+        self._offsets = map_offsets(self._buffer, offsets_position, self.page_total)
+
+    def __len__(self):
+        '''
+        Returns the total number of pages in the store.
+
+        Returns:
+            int: The number of pages.
+        '''
+        return self.page_total
+
+    def close(self):
+        '''Unmaps the file. Views returned by pages() can no longer be read afterwards.'''
+        if isinstance(self._offsets, memoryview):
+            self._offsets.release()
+        self._buffer.close()
+
+    def pages(self, first, count):
+        '''
+        Returns a read-only view of count pages starting at page first.
+
+        Args:
+            first (int): Index of the first page in the store.
+            count (int): Number of pages.
+
+        Returns:
+            MappedPages: The pages, decoded from the file on access.
+        '''
+        if first < 0 or count < 0 or first + count > self.page_total:
+            raise IndexError(f'Pages {first} to {first + count} are outside the store of {self.page_total} pages.')
+        return MappedPages(self._buffer, _PREAMBLE.size, self._offsets, first, count)
+
+    @classmethod
+    def build(cls, path, page_lists):
+        '''
+        Writes the pages of several books to a new page store file and opens it.
+
+        Args:
+            path (str): The file to write. An existing file is replaced atomically.
+            page_lists (iterable of iterable of str): The pages of each book.
+
+        Returns:
+            tuple: The opened PageStore and one MappedPages view per page list, in order.
+        '''
+        temp_path = path + '.tmp'
+        with open(temp_path, 'wb') as file:
+            file.write(b'\0' * _PREAMBLE.size)
+            offsets, spans = write_pages(file, page_lists)
+            offsets_position = file.tell()
+            write_offsets(file, offsets)
+            file.seek(0)
+            file.write(_PREAMBLE.pack(MAGIC, FORMAT_VERSION, offsets_position, len(offsets) - 1))
+        os.replace(temp_path, path)
+        store = cls(path)
+        return store, [store.pages(first, count) for first, count in spans]
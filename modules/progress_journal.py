@@ -0,0 +1,205 @@
+import json
+import os
+import threading
+import time
+
+
+class ProgressJournal():
+    '''
+    Append-only log of reading-progress changes (bookmarks and favorites), keyed by ISBN.
+
+    Each change is one JSON line. Lines are buffered and written together (group commit)
+    once batch_size changes are pending or flush_interval seconds have passed since the
+    oldest pending one, so a reader moving the bookmark on every page turn costs a buffer
+    append, not a file write. Opening a journal replays it into the current state; when the
+    log grows to several times the number of books it describes, it is rewritten with one
+    line per book (compaction).
+
+    Changes still in the buffer are lost if the process dies: call flush() (or close())
+    where they must be on disk.
+    '''
+
+    def __init__(self, path, batch_size = 64, flush_interval = 1.0, sync = False,
+                 compact_ratio = 4, min_compact_lines = 1024):
+        '''
+        Opens a journal, replaying the changes already written to it.
+
+        Args:
+            path (str): The journal file. Created if it does not exist.
+            batch_size (int, optional): Pending changes that trigger a write. Defaults to 64.
+            flush_interval (float, optional): Seconds a change may stay pending before a write is
+                triggered by the next change. None means only batch_size triggers writes.
+            sync (bool, optional): If True, every write is followed by os.fsync. Defaults to False.
+            compact_ratio (int, optional): The log is compacted when it holds more than this many
+                lines per book. Defaults to 4.
+            min_compact_lines (int, optional): Logs shorter than this are never compacted. Defaults to 1024.
+
+        Raises:
+            ValueError: If batch_size or compact_ratio is smaller than 1.
+        '''
+        if batch_size < 1 or compact_ratio < 1:
+            raise ValueError("batch_size and compact_ratio must be at least 1.")
+        self.path = path
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self.sync = sync
+        self.compact_ratio = compact_ratio
+        self.min_compact_lines = min_compact_lines
+        # ISBN -> [bookmark, favorite], either None when never recorded
+        self._state = {}
+        self._pending = []
+        self._pending_since = None
+        self._lines = 0
+        self._lock = threading.Lock()
+        self._replay()
+        self._file = open(path, 'a', encoding='utf-8')
+
+    def __len__(self):
+        '''
+        Returns the number of books the journal holds a state for.
+
+        Returns:
+            int: The number of ISBNs.
+        '''
+        return len(self._state)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.close()
+
+    def _replay(self):
+        '''
+        Rebuilds the state from the journal file. A last line cut short by a crash is skipped and
+        truncated away, so the next change is not appended to it.
+        '''
+        if not os.path.exists(self.path):
+            return
+        # Length of the complete lines
+        end = 0
+        with open(self.path, 'rb') as file:
+            for line in file:
+                if not line.endswith(b'\n'):
+                    break
+                end += len(line)
+                try:
+                    entry = json.loads(line)
+                except ValueError:
+                    continue
+                self._apply(entry)
+                self._lines += 1
+        if end < os.path.getsize(self.path):
+            os.truncate(self.path, end)
+
+    def _apply(self, entry):
+        '''Applies one journal entry to the state.'''
+        state = self._state.setdefault(entry['isbn'], [None, None])
+        if 'bookmark' in entry:
+            state[0] = entry['bookmark']
+        if 'favorite' in entry:
+            state[1] = entry['favorite']
+
+    def get(self, isbn):
+        '''
+        Returns the recorded progress of a book.
+
+        Args:
+            isbn (str): The ISBN of the book.
+
+        Returns:
+            tuple or None: (bookmark, favorite), either None if never recorded, or None for an unknown ISBN.
+        '''
+        with self._lock:
+            state = self._state.get(isbn)
+            return None if state is None else tuple(state)
+
+    def state(self):
+        '''
+        Returns the recorded progress of every book.
+
+        Returns:
+            dict: ISBN -> (bookmark, favorite).
+        '''
+        with self._lock:
+            return {isbn: tuple(state) for isbn, state in self._state.items()}
+
+    def record(self, isbn, bookmark = None, favorite = None):
+        '''
+        Records a bookmark and/or favorite change. Nothing is written if the values are already recorded.
+
+        Args:
+            isbn (str): The ISBN of the book.
+            bookmark (int, optional): The new bookmark page.
+            favorite (int, optional): The new favorite status (0 or 1).
+        '''
+        entry = {'isbn': isbn}
+        with self._lock:
+            state = self._state.get(isbn, (None, None))
+            if bookmark is not None and bookmark != state[0]:
+                entry['bookmark'] = bookmark
+            if favorite is not None and favorite != state[1]:
+                entry['favorite'] = favorite
+            if len(entry) == 1:
+                return
+            self._apply(entry)
+            self._pending.append(json.dumps(entry, ensure_ascii=False) + '\n')
+            now = time.monotonic()
+            if self._pending_since is None:
+                self._pending_since = now
+            if (len(self._pending) >= self.batch_size or self.flush_interval is not None
+                    and now - self._pending_since >= self.flush_interval):
+                self._write_pending()
+
+    def flush(self):
+        '''Writes the pending changes to the journal file.'''
+        with self._lock:
+            self._write_pending()
+
+    def _write_pending(self):
+        '''Writes the pending lines in one call, then compacts the log if it has grown too long.'''
+        if self._pending:
+            self._file.write(''.join(self._pending))
+            self._file.flush()
+            if self.sync:
+                os.fsync(self._file.fileno())
+            self._lines += len(self._pending)
+            self._pending = []
+            self._pending_since = None
+        if self._lines >= self.min_compact_lines and self._lines > self.compact_ratio * len(self._state):
+            self._compact()
+
+    def compact(self):
+        '''Rewrites the journal with a single line per book, dropping the changes it supersedes.'''
+        with self._lock:
+            self._write_pending()
+            self._compact()
+
+    def _compact(self):
+        '''Writes the state next to the journal file and renames it over the journal.'''
+        temp_path = self.path + '.tmp'
+        lines = 0
+        with open(temp_path, 'w', encoding='utf-8') as file:
+            for isbn, (bookmark, favorite) in self._state.items():
+                entry = {'isbn': isbn}
+                if bookmark is not None:
+                    entry['bookmark'] = bookmark
+                if favorite is not None:
+                    entry['favorite'] = favorite
+                file.write(json.dumps(entry, ensure_ascii=False) + '\n')
+                lines += 1
+            file.flush()
+            if self.sync:
+                os.fsync(file.fileno())
+        self._file.close()
+        os.replace(temp_path, self.path)
+        self._file = open(self.path, 'a', encoding='utf-8')
+        self._lines = lines
+
+    def close(self):
+        '''Writes the pending changes and closes the journal file.'''
+        with self._lock:
+            if self._file.closed:
+                return
+            self._write_pending()
+            self._file.close()
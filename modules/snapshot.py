@@ -0,0 +1,123 @@
+import json
+import mmap
+import os
+import struct
+import zlib
+
+try:
+    from .page_store import MappedPages, map_offsets, write_offsets, write_pages
+except ImportError:
+    # Loaded as a top-level module, with the modules folder on sys.path
+    from page_store import MappedPages, map_offsets, write_offsets, write_pages
+
+# File layout:
+#   preamble: magic, format version, offset table position, number of pages,
+#             header position, header length (little endian)
+#   page text: every page of every book, UTF-8 encoded, back to back
+#   offset table: array of unsigned 64-bit ints, the start of each page in the page text plus the end
+#   header: zlib-compressed JSON with the metadata, reading state and word tallies of each book
+MAGIC = b'LIBSNAP\0'
+FORMAT_VERSION = 1
+_PREAMBLE = struct.Struct('<8sHQQQQ')
+
+
+def save_library(library, path):
+    '''
+    Writes a whole library to a snapshot file.
+
+    The file is written next to path and then renamed over it, so an existing snapshot
+    (which may still be memory-mapped by a loaded library) is replaced atomically.
+
+    Args:
+        library (Library): The library to save.
+        path (str): The snapshot file to write.
+
+    Returns:
+        int: The number of books written.
+    '''
+    library_books = library.list
+    temp_path = path + '.tmp'
+    with open(temp_path, 'wb') as file:
+        file.write(b'\0' * _PREAMBLE.size)
+        offsets, spans = write_pages(file, (book.text for book in library_books))
+        offsets_position = file.tell()
+        write_offsets(file, offsets)
+
+        books = []
+        for book, (first, count) in zip(library_books, spans):
+            books.append({
+                'isbn': book.isbn,
+                'genre': book.genre,
+                'title': book.title,
+                'authors': book.authors,
+                'publisher': book.publisher,
+                'year': book.year,
+                'bookmark': book.get_bookmark(),
+                'favorite': book.get_favorite(),
+                'first_page': first,
+                'page_count': count,
+                'word_count': book._word_count,
+                'word_dict': dict(book.word_dict) if book.is_analyzed() else None,
+            })
+        header = zlib.compress(json.dumps({'books': books}, ensure_ascii=False).encode('utf-8'))
+        header_position = file.tell()
+        file.write(header)
+        file.seek(0)
+        file.write(_PREAMBLE.pack(MAGIC, FORMAT_VERSION, offsets_position, len(offsets) - 1,
+                                  header_position, len(header)))
+    os.replace(temp_path, path)
+    return len(books)
+
+
+def load_library(path, library_class, book_class, lazy = True):
+    '''
+    Reads a library back from a snapshot file written by save_library.
+
+    Args:
+        path (str): The snapshot file.
+        library_class (type): The Library class to instantiate.
+        book_class (type): The Book class to instantiate.
+        lazy (bool, optional): If True (the default), page text stays in the memory-mapped file
+            and is decoded on access. If False, every page is read into memory and the file is closed.
+
+    Returns:
+        Library: The restored library, with metadata, text, word tallies and reading state.
+
+    Raises:
+        ValueError: If the file is not a snapshot or was written by a newer format version.
+    '''
+    with open(path, 'rb') as file:
+        if os.fstat(file.fileno()).st_size < _PREAMBLE.size:
+            raise ValueError(f'{path} is not a library snapshot')
+        buffer = mmap.mmap(file.fileno(), 0, access=mmap.ACCESS_READ)
+
+    magic, version, offsets_position, page_total, header_position, header_length = \
+        _PREAMBLE.unpack_from(buffer, 0)
+    if magic != MAGIC:
+        raise ValueError(f'{path} is not a library snapshot')
+    if version > FORMAT_VERSION:
+        raise ValueError(f'{path} uses snapshot format {version}; this version reads up to {FORMAT_VERSION}')
+
+    offsets = map_offsets(buffer, offsets_position, page_total)
+    header = json.loads(zlib.decompress(buffer[header_position:header_position + header_length]))
+
+    library = library_class()
+    for record in header['books']:
+        pages = MappedPages(buffer, _PREAMBLE.size, offsets, record['first_page'], record['page_count'])
+        if not lazy:
+            pages = list(pages)
+        book = book_class(record['isbn'], record['genre'], pages,
+                          book_info=(record['title'], record['authors'], record['publisher'], record['year']))
+        book._bookmark = record['bookmark']
+        book._favorite = record['favorite']
+        if record['word_dict'] is not None:
+            book._store_analysis(record['word_count'], record['word_dict'])
+        elif record['word_count'] is not None:
+            book._word_count = record['word_count']
+        library.add_book(book)
+    if not lazy:
+        # The offset table may be a view into the mapping, which has to be released before closing it
+        if isinstance(offsets, memoryview):
+            offsets.release()
+        buffer.close()
+    return library
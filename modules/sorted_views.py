@@ -0,0 +1,197 @@
+from bisect import bisect_left
+
+
+def _author_key(book, columns, row):
+    '''Primary author; a missing author is the plain string 'Author not found'.'''
+    authors = book.authors
+    if not isinstance(authors, str):
+        authors = authors[0] if authors else ''
+    return authors.casefold()
+
+
+def _title_key(book, columns, row):
+    return str(book.title).casefold()
+
+
+def _genre_key(book, columns, row):
+    genre = columns.genre(row)
+    return genre.casefold() if isinstance(genre, str) else ''
+
+
+def _year_key(book, columns, row):
+    return columns.years[row]
+
+
+def _word_count_key(book, columns, row):
+    return book.word_count
+
+
+def _page_count_key(book, columns, row):
+    return book.page_count
+
+
+# Sort field name -> function(book, columns, row) returning the book's value for that field
+SORT_FIELDS = {
+    'author': _author_key,
+    'title': _title_key,
+    'year': _year_key,
+    'genre': _genre_key,
+    'word_count': _word_count_key,
+    'page_count': _page_count_key,
+}
+# Fields whose value changes when a book's text changes
+TEXT_FIELDS = frozenset(('word_count', 'page_count'))
+
+
+class _Descending():
+    '''Wraps a value so that it sorts in reverse order inside a key tuple.'''
+    __slots__ = ('value',)
+
+    def __init__(self, value):
+        self.value = value
+
+    def __eq__(self, other):
+        return self.value == other.value
+
+    def __lt__(self, other):
+        return other.value < self.value
+
+
+def parse_sort_fields(names):
+    '''
+    Converts sort field names, optionally prefixed with '-' for descending order, into
+    (function, descending) pairs.
+
+    Args:
+        names (iterable of str): The field names, most significant first.
+
+    Returns:
+        tuple: One (function, descending) pair per name.
+
+    Raises:
+        ValueError: If no name is given or a name is not in SORT_FIELDS.
+    '''
+    fields = []
+    for name in names:
+        field = SORT_FIELDS.get(name[1:] if name.startswith('-') else name)
+        if field is None:
+            raise ValueError(f"Unknown sort field {name!r}; use one of {', '.join(SORT_FIELDS)}")
+        fields.append((field, name.startswith('-')))
+    if not fields:
+        raise ValueError("At least one sort field is required")
+    return tuple(fields)
+
+
+class SortedView():
+    '''
+    The books of a library in a sorted order, kept up to date as books are added and removed.
+
+    A new book is inserted at its place with a binary search instead of sorting again, and
+    reading a range of the view (e.g. one page of results) only copies that range.
+    The view supports len(), iteration, indexing and slicing.
+    '''
+
+    def __init__(self, key, books = ()):
+        '''
+        Sorts the given books.
+
+        Args:
+            key (callable): Returns the sort key of a book: a tuple, unique to the book,
+                so that no two keys compare equal.
+            books (iterable, optional): The books to start with.
+        '''
+        self._key = key
+        # Book -> its key, and the sorted keys with the books in the same order
+        self._keys = {book: key(book) for book in books}
+        ordered = sorted(self._keys.items(), key=lambda item: item[1])
+        self._sorted_keys = [item[1] for item in ordered]
+        self._books = [item[0] for item in ordered]
+
+    def __len__(self):
+        return len(self._books)
+
+    def __iter__(self):
+        return iter(self._books)
+
+    def __getitem__(self, index):
+        return self._books[index]
+
+    def page(self, number, page_size = 50):
+        '''
+        Returns one page of the sorted books.
+
+        Args:
+            number (int): The page number, starting at 0.
+            page_size (int, optional): The number of books per page. Defaults to 50.
+
+        Returns:
+            list of Book: The books of the page, empty past the last page.
+        '''
+        if number < 0 or page_size < 1:
+            raise ValueError("Page number must be at least 0 and page size at least 1")
+        start = number * page_size
+        return self._books[start:start + page_size]
+
+    def add(self, book):
+        '''
+        Inserts a book at its place in the order.
+
+        Args:
+            book (Book): The book.
+        '''
+        key = self._keys[book] = self._key(book)
+        position = bisect_left(self._sorted_keys, key)
+        self._sorted_keys.insert(position, key)
+        self._books.insert(position, book)
+
+    def remove(self, book):
+        '''
+        Removes a book from the view.
+
+        Args:
+            book (Book): The book.
+        '''
+        position = bisect_left(self._sorted_keys, self._keys.pop(book))
+        del self._sorted_keys[position]
+        del self._books[position]
+
+    def resort(self):
+        '''Computes the key of every book again and sorts the view, after the order the keys depend on changed.'''
+        ordered = sorted(((book, self._key(book)) for book in self._keys), key=lambda item: item[1])
+        self._keys = dict(ordered)
+        self._sorted_keys[:] = [item[1] for item in ordered]
+        self._books[:] = [item[0] for item in ordered]
+
+    def update(self, book):
+        '''
+        Moves a book to its new place after a sort field of it changed.
+
+        Args:
+            book (Book): The book.
+        '''
+        self.remove(book)
+        self.add(book)
+
+
+def make_sort_key(fields, columns, rows, order):
+    '''
+    Builds the key function of a SortedView over a library's books.
+
+    Ties are broken by library order, so the sort is stable.
+
+    Args:
+        fields (tuple): (function, descending) pairs, as returned by parse_sort_fields.
+        columns (MetadataColumns): The library's metadata columns.
+        rows (dict): Book -> row in the columns.
+        order (dict): Book -> position in the library order.
+
+    Returns:
+        callable: The key function.
+    '''
+    def key(book):
+        row = rows[book]
+        values = [_Descending(field(book, columns, row)) if descending else field(book, columns, row)
+                  for field, descending in fields]
+        values.append(order[book])
+        return tuple(values)
+    return key
@@ -0,0 +1,269 @@
+import heapq
+import math
+
+try:
+    from .vocabulary import SHARED_VOCABULARY
+except ImportError:
+    # Loaded as a top-level module, with the modules folder on sys.path
+    from vocabulary import SHARED_VOCABULARY
+
+# similar() compares a document through its most distinctive terms only (highest TF-IDF weight),
+# which keeps query time independent of how long the document is
+SIMILAR_PROBE_TERMS = 64
+
+
+class TermStats():
+    '''
+    Sparse document-term counts over a collection of documents (books), with document
+    frequencies and corpus totals kept up to date as documents are added and removed.
+
+    Each document is stored as two parallel arrays, word ids and counts, like one row of a
+    compressed sparse row matrix. Ids come from a Vocabulary, by default the one shared by
+    every Book, so a book's word_vector is stored as is, without re-hashing any word.
+    Per-term statistics are only kept for the terms the stored documents use, so they shrink
+    again as documents are removed, however large the shared vocabulary has grown.
+    Terms are scored by TF-IDF, so words that appear in every book rank below the words
+    that set a book apart.
+
+    An inverted index (term -> documents) and the norm of every document vector are kept
+    alongside, so similar() and documents_with() only visit documents that use the terms.
+    '''
+
+    def __init__(self, vocabulary = SHARED_VOCABULARY):
+        '''
+        Args:
+            vocabulary (Vocabulary, optional): Where term ids come from. Defaults to the shared vocabulary.
+        '''
+        self.vocabulary = vocabulary
+        # document key -> (array of term ids, array of counts)
+        self._docs = {}
+        # id -> {document key -> count}, for the terms used by at least one document;
+        # the document frequency of a term is the size of its postings
+        self._postings = {}
+        # id -> total count over all documents, for the same terms
+        self._totals = {}
+        # document key -> Euclidean norm of its counts
+        self._norms = {}
+
+    def __len__(self):
+        '''
+        Returns the number of documents.
+
+        Returns:
+            int: The number of documents.
+        '''
+        return len(self._docs)
+
+    def __contains__(self, key):
+        return key in self._docs
+
+    def add(self, key, word_dict):
+        '''
+        Adds a document, replacing any document already stored under key.
+
+        Args:
+            key (hashable): The document, e.g. a Book.
+            word_dict (dict): Term -> count in the document.
+        '''
+        ids, counts = self.vocabulary.encode({term: count for term, count in word_dict.items() if count > 0})
+        self.add_vector(key, ids, counts)
+
+    def add_vector(self, key, ids, counts):
+        '''
+        Adds a document given as arrays of term ids and counts, e.g. a Book's word_vector.
+        The arrays are kept, not copied, so they must not be changed afterwards.
+
+        Args:
+            key (hashable): The document.
+            ids (array of int): Term ids in the vocabulary, each at most once.
+            counts (array of int): The positive count of each term.
+        '''
+        if key in self._docs:
+            self.remove(key)
+        totals = self._totals
+        postings = self._postings
+        for term_id, count in zip(ids, counts):
+            documents = postings.get(term_id)
+            if documents is None:
+                documents = postings[term_id] = {}
+                totals[term_id] = 0
+            documents[key] = count
+            totals[term_id] += count
+        self._docs[key] = (ids, counts)
+        self._norms[key] = math.sqrt(sum(count * count for count in counts))
+
+    def remove(self, key):
+        '''
+        Removes a document.
+
+        Args:
+            key (hashable): The document.
+
+        Raises:
+            KeyError: If the document is not stored.
+        '''
+        ids, counts = self._docs.pop(key)
+        del self._norms[key]
+        totals = self._totals
+        postings = self._postings
+        for term_id, count in zip(ids, counts):
+            documents = postings[term_id]
+            del documents[key]
+            if documents:
+                totals[term_id] -= count
+            else:
+                del postings[term_id]
+                del totals[term_id]
+
+    def vocabulary_size(self):
+        '''
+        Returns the number of distinct terms used by the documents.
+
+        Returns:
+            int: The number of terms.
+        '''
+        return len(self._postings)
+
+    def documents_with(self, term):
+        '''
+        Returns the documents using a term and how often each uses it, from the inverted index.
+
+        Args:
+            term (str): The term.
+
+        Returns:
+            dict: Document key -> count. Empty if no document uses the term.
+        '''
+        term_id = self.vocabulary.get_id(term)
+        return dict(self._postings.get(term_id, ()))
+
+    def total(self, term):
+        '''
+        Returns how many times a term occurs over all documents.
+
+        Args:
+            term (str): The term.
+
+        Returns:
+            int: The total count.
+        '''
+        term_id = self.vocabulary.get_id(term)
+        return self._totals.get(term_id, 0)
+
+    def totals(self, top = None):
+        '''
+        Returns the corpus-wide count of every term used by the documents.
+
+        Args:
+            top (int, optional): Only return the top most frequent terms, most frequent first.
+
+        Returns:
+            dict: Term -> total count.
+        '''
+        totals = self._totals
+        term_ids = self._postings.keys()
+        if top is not None:
+            term_ids = heapq.nlargest(top, term_ids, key=totals.__getitem__)
+        word = self.vocabulary.word
+        return {word(term_id): totals[term_id] for term_id in term_ids}
+
+    def document_frequency(self, term):
+        '''
+        Returns the number of documents containing a term.
+
+        Args:
+            term (str): The term.
+
+        Returns:
+            int: The number of documents.
+        '''
+        term_id = self.vocabulary.get_id(term)
+        return len(self._postings.get(term_id, ()))
+
+    def idf_table(self):
+        '''
+        Returns the smoothed inverse document frequency of every term the documents use,
+        log((1 + documents) / (1 + document frequency)) + 1.
+
+        Returns:
+            dict: Term id -> idf.
+        '''
+        numerator = 1 + len(self._docs)
+        return {term_id: math.log(numerator / (1 + len(documents))) + 1
+                for term_id, documents in self._postings.items()}
+
+    def top_terms(self, key, k = 5, idf = None):
+        '''
+        Returns the k terms of a document with the highest TF-IDF score.
+
+        Args:
+            key (hashable): The document.
+            k (int, optional): The number of terms. Defaults to 5.
+            idf (dict, optional): A table from idf_table(), to share between calls.
+
+        Returns:
+            list of str: The terms, best first. Ties keep the document's term order.
+
+        Raises:
+            KeyError: If the document is not stored.
+        '''
+        if idf is None:
+            idf = self.idf_table()
+        ids, counts = self._docs[key]
+        best = heapq.nlargest(k, zip(ids, counts), key=lambda entry: entry[1] * idf[entry[0]])
+        word = self.vocabulary.word
+        return [word(term_id) for term_id, count in best]
+
+    def all_top_terms(self, k = 5):
+        '''
+        Returns the top TF-IDF terms of every document, computing the idf table only once.
+
+        Args:
+            k (int, optional): The number of terms per document. Defaults to 5.
+
+        Returns:
+            dict: Document key -> list of terms, best first.
+        '''
+        idf = self.idf_table()
+        return {key: self.top_terms(key, k, idf) for key in self._docs}
+
+    def similar(self, key, k = 5, probe = SIMILAR_PROBE_TERMS):
+        '''
+        Finds the documents whose term counts are closest to a document's, by cosine similarity.
+
+        Dot products are accumulated from the inverted index, so only documents sharing a term
+        with the query are visited, and divided by the precomputed norms. With probe set, only
+        the query's probe most distinctive terms are used: the scores are then a lower
+        bound of the exact cosine, which ignores the shared frequent words.
+
+        Args:
+            key (hashable): The query document.
+            k (int, optional): The number of documents to return. Defaults to 5.
+            probe (int, optional): The number of query terms to use. None uses every term (exact).
+
+        Returns:
+            list of tuple: (document key, similarity) pairs, most similar first, excluding key itself.
+
+        Raises:
+            KeyError: If the document is not stored.
+        '''
+        ids, counts = self._docs[key]
+        norm = self._norms[key]
+        if not norm:
+            return []
+        terms = zip(ids, counts)
+        if probe is not None and len(ids) > probe:
+            numerator = 1 + len(self._docs)
+            postings = self._postings
+            terms = heapq.nlargest(probe, terms,
+                                   key=lambda entry: entry[1] * math.log(numerator / (1 + len(postings[entry[0]]))))
+        scores = {}
+        get_score = scores.get
+        postings = self._postings
+        for term_id, query_count in terms:
+            for other, count in postings[term_id].items():
+                scores[other] = get_score(other, 0) + query_count * count
+        scores.pop(key, None)
+        norms = self._norms
+        best = heapq.nlargest(k, scores.items(), key=lambda entry: entry[1] / norms[entry[0]])
+        return [(other, dot / (norm * norms[other])) for other, dot in best]
@@ -0,0 +1,405 @@
+import re
+from array import array
+from bisect import bisect_left, bisect_right
+
+# Words are runs of letters, digits and underscores; everything else separates them
+_TOKEN_RE = re.compile(r'\w+')
+# An occurrence packs its page id and its word position on the page into one integer
+_POSITION_BITS = 32
+_POSITION_MASK = (1 << _POSITION_BITS) - 1
+# Marks the start and end of a token in its three-character substrings; never part of a token
+_EDGE = '\0'
+# Removed pages stay in the postings until they hold more occurrences than the live pages,
+# and at least this many, so removing a page costs nothing until a compaction
+COMPACT_MIN_OCCURRENCES = 1 << 16
+# Tokens with at least one occurrence in 2 ** _DENSE_SHIFT also have their occurrences sorted by
+# the token that follows each, once a quotation needs them; the next token of the last word of
+# a page, or of a removed page, is _NO_TOKEN
+_DENSE_SHIFT = 9
+_NO_TOKEN = (1 << 32) - 1
+
+
+def search_tokens(text):
+    '''
+    Splits text into the lowercase tokens used by the full-text index.
+
+    Args:
+        text (str): The text to split.
+
+    Returns:
+        list of str: The lowercase word tokens, in order.
+    '''
+    return _TOKEN_RE.findall(text.lower())
+
+
+def _trigrams(text):
+    '''Returns the three-character substrings of text.'''
+    return {text[i:i + 3] for i in range(len(text) - 2)}
+
+
+class TextIndex():
+    '''
+    Positional inverted index over the pages of several documents, e.g. the books of a library.
+
+    Every page gets an id. Each token maps to its occurrences, (page id, word position) pairs
+    packed into the integers of an array, and each page keeps the ids of its tokens in order,
+    so a phrase is found by walking the occurrences of its rarest token and checking the tokens
+    next to each one; documents without that token are never visited. Tokens are also indexed
+    by their three-character substrings, so the tokens that contain, start or end with a string
+    are found without scanning the vocabulary.
+
+    A phrase made only of common tokens would still mean walking many thousands of occurrences,
+    so the occurrences of the most common tokens are also sorted by the token that follows each:
+    the occurrences of a common token followed by a given one are then a slice of its postings,
+    and a phrase is walked from its rarest position or its rarest such pair, whichever has fewer.
+
+    Removing a page only marks it as removed; its occurrences are dropped from the postings
+    in one pass once they outnumber the live ones (compaction).
+    '''
+
+    def __init__(self, documents = ()):
+        '''
+        Builds the index for some documents.
+
+        Args:
+            documents (iterable, optional): (key, pages) pairs, where key identifies the document
+                (any hashable object) and pages is a sequence of page texts.
+        '''
+        # token -> token id, and token id -> token (None for an id free for reuse)
+        self._ids = {}
+        self._tokens = []
+        self._free_ids = []
+        # token id -> array('Q') of occurrences, page id << _POSITION_BITS | word position
+        self._postings = []
+        # three-character substring of _EDGE + token + _EDGE -> ids of the tokens containing it
+        self._trigrams = {}
+        # page id -> [document key, page number, array('I') of the page's token ids in order]
+        self._pages = {}
+        # document key -> its page ids, in page order
+        self._documents = {}
+        self._next_page = 0
+        # dense token id -> array('I') of the ids of the tokens following its first occurrences,
+        # sorted; its postings start with those occurrences in the same order
+        self._followers = {}
+        # pattern shorter than a trigram -> ids of the tokens matching it, until the vocabulary changes
+        self._short_matches = {}
+        # Occurrences in the postings on live pages and on removed pages, and the tokens of removed pages
+        self._live = 0
+        self._dead = 0
+        self._stale = set()
+        for key, pages in documents:
+            self.add_document(key, pages)
+
+    def __len__(self):
+        '''
+        Returns the number of distinct tokens in the index.
+
+        Returns:
+            int: The vocabulary size.
+        '''
+        return len(self._ids)
+
+    def __contains__(self, token):
+        return token in self._ids
+
+    def add_document(self, key, pages):
+        '''
+        Indexes the pages of a document.
+
+        Args:
+            key (hashable): Identifies the document in the results of find.
+            pages (iterable of str): The page texts, in page order.
+
+        Raises:
+            ValueError: If a document with this key is already indexed.
+        '''
+        if key in self._documents:
+            raise ValueError("The document is already indexed")
+        self._documents[key] = [self._add_page(key, number, page) for number, page in enumerate(pages)]
+
+    def remove_document(self, key):
+        '''
+        Removes a document from the index.
+
+        Args:
+            key (hashable): The document.
+        '''
+        for page_id in self._documents.pop(key):
+            self._drop_page(page_id)
+        self._compact_if_stale()
+
+    def edit_page(self, key, number, old, new):
+        '''
+        Applies a page edit to a document: new is inserted as page number when old is None, the
+        page is deleted when new is None, and replaced otherwise. Later pages are renumbered.
+
+        Args:
+            key (hashable): The document.
+            number (int): The page number.
+            old (str or None): The text of the page before the edit, None for an inserted page.
+            new (str or None): The text of the page after the edit, None for a deleted page.
+        '''
+        page_ids = self._documents[key]
+        if old is not None:
+            self._drop_page(page_ids[number])
+        if new is None:
+            del page_ids[number]
+            shift = -1
+        elif old is None:
+            page_ids.insert(number, self._add_page(key, number, new))
+            number += 1
+            shift = 1
+        else:
+            page_ids[number] = self._add_page(key, number, new)
+            shift = 0
+        if shift:
+            for page_id in page_ids[number:]:
+                self._pages[page_id][1] += shift
+        self._compact_if_stale()
+
+    def _add_page(self, key, number, text):
+        '''Indexes the text of a page, returning its new page id.'''
+        page_id = self._next_page
+        self._next_page += 1
+        token_ids = array('I', map(self._token_id, search_tokens(text)))
+        base = page_id << _POSITION_BITS
+        postings = self._postings
+        for position, token_id in enumerate(token_ids):
+            postings[token_id].append(base | position)
+        self._pages[page_id] = [key, number, token_ids]
+        self._live += len(token_ids)
+        return page_id
+
+    def _drop_page(self, page_id):
+        '''Marks a page as removed; its occurrences stay in the postings until the next compaction.'''
+        token_ids = self._pages.pop(page_id)[2]
+        self._live -= len(token_ids)
+        self._dead += len(token_ids)
+        self._stale.update(token_ids)
+
+    def _token_id(self, token):
+        '''Returns the id of a token, adding the token if it is new.'''
+        token_id = self._ids.get(token)
+        if token_id is None:
+            if self._free_ids:
+                token_id = self._free_ids.pop()
+                self._tokens[token_id] = token
+                self._postings[token_id] = array('Q')
+            else:
+                token_id = len(self._tokens)
+                self._tokens.append(token)
+                self._postings.append(array('Q'))
+            self._ids[token] = token_id
+            self._short_matches.clear()
+            for trigram in _trigrams(_EDGE + token + _EDGE):
+                token_ids = self._trigrams.get(trigram)
+                if token_ids is None:
+                    self._trigrams[trigram] = {token_id}
+                else:
+                    token_ids.add(token_id)
+        return token_id
+
+    def _compact_if_stale(self):
+        '''Compacts the postings once removed pages hold more occurrences than the live ones.'''
+        if self._dead >= COMPACT_MIN_OCCURRENCES and self._dead > self._live:
+            self.compact()
+
+    def compact(self):
+        '''Drops the occurrences of removed pages from the postings, and the tokens left without any.'''
+        pages = self._pages
+        for token_id in self._stale:
+            self._followers.pop(token_id, None)
+            occurrences = array('Q', [occurrence for occurrence in self._postings[token_id]
+                                      if occurrence >> _POSITION_BITS in pages])
+            if occurrences:
+                self._postings[token_id] = occurrences
+                continue
+            token = self._tokens[token_id]
+            del self._ids[token]
+            for trigram in _trigrams(_EDGE + token + _EDGE):
+                token_ids = self._trigrams[trigram]
+                token_ids.discard(token_id)
+                if not token_ids:
+                    del self._trigrams[trigram]
+            self._tokens[token_id] = None
+            self._postings[token_id] = None
+            self._free_ids.append(token_id)
+            self._short_matches.clear()
+        self._dead = 0
+        self._stale = set()
+
+    def _matching(self, pattern):
+        '''
+        Returns the ids of the tokens t for which _EDGE + t + _EDGE contains pattern.
+
+        A pattern of three characters or more is looked up by its rarest trigram; a shorter one
+        matches whole trigram entries, found among the distinct trigrams (not the tokens) and
+        remembered until a token is added or dropped.
+        '''
+        trigrams = self._trigrams
+        if len(pattern) < 3:
+            token_ids = self._short_matches.get(pattern)
+            if token_ids is None:
+                token_ids = set()
+                for trigram, ids in trigrams.items():
+                    if pattern in trigram:
+                        token_ids.update(ids)
+                self._short_matches[pattern] = token_ids
+            return token_ids
+        rarest = None
+        for trigram in _trigrams(pattern):
+            ids = trigrams.get(trigram)
+            if not ids:
+                return set()
+            if rarest is None or len(ids) < len(rarest):
+                rarest = ids
+        if len(pattern) == 3:
+            return rarest
+        tokens = self._tokens
+        return {token_id for token_id in rarest if pattern in _EDGE + tokens[token_id] + _EDGE}
+
+    def _quote_plan(self, tokens):
+        '''
+        Lists the token ids each token of a quotation can match when the quotation is looked for
+        as a plain substring of the text: the first token can be the end of an indexed token, the
+        last token the start of one, a single token any part of one, and the tokens in between
+        are whole words. Returns the sets of token ids, one per position, and their numbers of
+        occurrences, or None if some position cannot match.
+        '''
+        last = len(tokens) - 1
+        allowed = []
+        for i, token in enumerate(tokens):
+            if 0 < i < last:
+                token_id = self._ids.get(token)
+                token_ids = {token_id} if token_id is not None else set()
+            elif last == 0:
+                token_ids = self._matching(token)
+            elif i == 0:
+                token_ids = self._matching(token + _EDGE)
+            else:
+                token_ids = self._matching(_EDGE + token)
+            if not token_ids:
+                return None
+            allowed.append(token_ids)
+        postings = self._postings
+        sizes = [sum(len(postings[token_id]) for token_id in token_ids) for token_ids in allowed]
+        return allowed, sizes
+
+    def _following(self, token_id):
+        '''
+        Returns the sorted ids of the tokens following the occurrences of a dense token, sorting
+        its postings the same way first. Occurrences added since stay unsorted at the end of the
+        postings until they make up a thirty-second of them.
+        '''
+        occurrences = self._postings[token_id]
+        following = self._followers.get(token_id)
+        if following is None or len(occurrences) - len(following) > len(following) >> 5:
+            pages = self._pages
+            next_ids = []
+            for occurrence in occurrences:
+                page = pages.get(occurrence >> _POSITION_BITS)
+                position = (occurrence & _POSITION_MASK) + 1
+                next_ids.append(page[2][position] if page is not None and position < len(page[2]) else _NO_TOKEN)
+            order = sorted(range(len(occurrences)), key=next_ids.__getitem__)
+            self._postings[token_id] = array('Q', map(occurrences.__getitem__, order))
+            following = self._followers[token_id] = array('I', map(next_ids.__getitem__, order))
+        return following
+
+    def _anchor(self, allowed, sizes):
+        '''
+        Chooses the occurrences to walk for a quotation: those of its position with the fewest, or
+        those of a pair of neighbouring positions whose first tokens are all dense, when fewer.
+        Returns the position the occurrences are at and the (token id, start, end) ranges of the
+        postings holding them.
+        '''
+        postings = self._postings
+        total = self._live + self._dead
+        anchor = min(range(len(allowed)), key=sizes.__getitem__)
+        size = sizes[anchor]
+        walked = [(token_id, 0, len(postings[token_id])) for token_id in allowed[anchor]]
+        for i in range(len(allowed) - 1):
+            if sizes[i] <= size or any(len(postings[token_id]) << _DENSE_SHIFT < total for token_id in allowed[i]):
+                continue
+            ranges = []
+            count = 0
+            for token_id in allowed[i]:
+                following = self._following(token_id)
+                for next_id in allowed[i + 1]:
+                    low = bisect_left(following, next_id)
+                    high = bisect_right(following, next_id, low)
+                    if low < high:
+                        ranges.append((token_id, low, high))
+                        count += high - low
+                if len(following) < len(postings[token_id]):
+                    ranges.append((token_id, len(following), len(postings[token_id])))
+                    count += len(postings[token_id]) - len(following)
+            if count < size:
+                anchor, size, walked = i, count, ranges
+        return anchor, walked
+
+    def find(self, tokens):
+        '''
+        Finds the pages on which a quotation with these tokens may appear as a substring: the
+        tokens appear on consecutive positions, the first one possibly cut at its start, the last
+        one at its end. Callers confirm each page with a substring check, which also compares
+        the characters between the tokens.
+
+        Args:
+            tokens (list of str): The quotation, as returned by search_tokens. Must not be empty.
+
+        Returns:
+            set of tuple: (document key, page number) of every candidate page.
+        '''
+        return self.find_many([tokens])[0]
+
+    def find_many(self, queries):
+        '''
+        Finds the candidate pages of several quotations, as find does for one. Quotations walked
+        from the same occurrences (the same rarest token, or pair of tokens) are all checked in
+        one pass over them.
+
+        Args:
+            queries (list of list of str): The quotations, as returned by search_tokens. None may
+                be empty.
+
+        Returns:
+            list of set: For each quotation, in order, the (document key, page number) of every
+                candidate page.
+        '''
+        # (token id, start, end) range of a postings array -> [anchor, length, checks, page ids found]
+        # of the quotations walking it
+        walks = {}
+        searches = []
+        for tokens in queries:
+            plan = self._quote_plan(tokens)
+            if plan is None:
+                searches.append(None)
+                continue
+            allowed, sizes = plan
+            anchor, ranges = self._anchor(allowed, sizes)
+            checks = sorted((i for i in range(len(tokens)) if i != anchor), key=sizes.__getitem__)
+            search = (anchor, len(tokens), [(i - anchor, allowed[i]) for i in checks], set())
+            searches.append(search)
+            for walk in ranges:
+                walks.setdefault(walk, []).append(search)
+        pages = self._pages
+        postings = self._postings
+        for (token_id, low, high), walkers in walks.items():
+            for occurrence in postings[token_id][low:high]:
+                page_id = occurrence >> _POSITION_BITS
+                page = pages.get(page_id)
+                if page is None:
+                    continue
+                position = occurrence & _POSITION_MASK
+                token_ids = page[2]
+                for anchor, length, checks, found in walkers:
+                    start = position - anchor
+                    if page_id in found or start < 0 or start + length > len(token_ids):
+                        continue
+                    for offset, token_ids_allowed in checks:
+                        if token_ids[position + offset] not in token_ids_allowed:
+                            break
+                    else:
+                        found.add(page_id)
+        return [set() if search is None else {(pages[page_id][0], pages[page_id][1]) for page_id in search[3]}
+                for search in searches]
@@ -0,0 +1,110 @@
+import sys
+import threading
+from array import array
+
+
+class Vocabulary():
+    '''
+    Maps words to small integer ids, so word tallies can be stored as arrays of ids and counts.
+
+    Every distinct word is stored once, as an interned string, however many books use it.
+    Ids are never reused or removed, so arrays of ids stay valid for the life of the process.
+    The vocabulary therefore only grows: its size is the number of distinct words (lemmas) seen
+    by the process, which levels off as books are added, but is not reduced by removing books.
+    '''
+
+    def __init__(self):
+        # word -> id, and id -> word
+        self._ids = {}
+        self._words = []
+        self._lock = threading.Lock()
+
+    def __len__(self):
+        '''
+        Returns the number of distinct words.
+
+        Returns:
+            int: The vocabulary size.
+        '''
+        return len(self._words)
+
+    def __contains__(self, word):
+        return word in self._ids
+
+    def id_of(self, word):
+        '''
+        Returns the id of a word, adding the word if it is new.
+
+        Args:
+            word (str): The word.
+
+        Returns:
+            int: The id.
+        '''
+        word_id = self._ids.get(word)
+        if word_id is None:
+            with self._lock:
+                word_id = self._ids.get(word)
+                if word_id is None:
+                    word = sys.intern(word)
+                    word_id = self._ids[word] = len(self._words)
+                    self._words.append(word)
+        return word_id
+
+    def get_id(self, word):
+        '''
+        Returns the id of a word without adding it.
+
+        Args:
+            word (str): The word.
+
+        Returns:
+            int or None: The id, or None if the word was never seen.
+        '''
+        return self._ids.get(word)
+
+    def word(self, word_id):
+        '''
+        Returns the word with a given id.
+
+        Args:
+            word_id (int): The id.
+
+        Returns:
+            str: The word.
+        '''
+        return self._words[word_id]
+
+    def encode(self, word_dict):
+        '''
+        Converts a word tally into parallel arrays of word ids and counts.
+
+        Args:
+            word_dict (dict): Word -> count.
+
+        Returns:
+            tuple: (array('I') of ids, array('I') of counts), in the tally's order.
+        '''
+        id_of = self.id_of
+        return array('I', [id_of(word) for word in word_dict]), array('I', word_dict.values())
+
+    def decode(self, ids, counts):
+        '''
+        Converts arrays of word ids and counts back into a word tally.
+
+        Args:
+            ids (sequence of int): The word ids.
+            counts (sequence of int): The count of each word.
+
+        Returns:
+            dict: Word -> count, in the arrays' order.
+        '''
+        words = self._words
+        return {words[word_id]: count for word_id, count in zip(ids, counts)}
+
+
+# The vocabulary shared by every Book of the process. It is process-wide rather than per library
+# because a Book's tally is stored as ids and a book exists outside any library, or in several:
+# one vocabulary keeps every word_vector valid wherever the book goes, without re-encoding it.
+# Libraries only keep statistics for the words their own books use (see TermStats).
+SHARED_VOCABULARY = Vocabulary()
@@ -41,6 +41,8 @@ class Test_Book(unittest.TestCase):
     def test_search_text(self):
         self.assertEqual([0],self.book_harry_potter.search_text("young wizard"))
         self.assertEqual([],self.book_harry_potter.search_text("old wizard"))
+        self.assertEqual([1],self.book_harry_potter.search_text("Whispered Secrets"))
+        self.assertEqual([0, 1],self.book_harry_potter.search_text("magic"))
 
     #6
     def test_themes(self):
@@ -99,5 +101,20 @@ class Test_Book(unittest.TestCase):
         with self.assertRaises(TypeError):
             self.book_harry_potter.tokenize()
 
+    #16
+    def test_lazy_analysis(self):
+        book = Book(self.valid_isbn, text=['The young wizard stepped into a world unseen.'])
+        self.assertFalse(book.is_analyzed())
+        self.assertEqual(book.word_dict['wizard'], 1)
+        self.assertTrue(book.is_analyzed())
+
+    #17
+    def test_text_change_invalidates_analysis(self):
+        self.assertEqual(46, self.book_harry_potter.word_count)
+        self.book_harry_potter.text = ['Magic magic everywhere.']
+        self.assertEqual(3, self.book_harry_potter.word_count)
+        self.assertEqual(1, self.book_harry_potter.page_count)
+        self.assertEqual(['magic'], self.book_harry_potter.themes(1))
+
 if __name__ == '__main__':
     unittest.main()
\ No newline at end of file
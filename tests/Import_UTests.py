@@ -0,0 +1,19 @@
+import sys
+import os
+import subprocess
+import unittest
+
+MODULES = os.path.abspath('../modules')
+
+class TestImport(unittest.TestCase):
+
+    def test_import_is_lazy(self):
+        # Importing the module must not import nltk or matplotlib (or download anything)
+        check = 'import sys, library_project; print(sorted(m for m in sys.modules if m.split(".")[0] in ("nltk", "matplotlib")))'
+        result = subprocess.run([sys.executable, '-c', check], cwd=MODULES, capture_output=True, text=True)
+        self.assertEqual(result.returncode, 0, result.stderr)
+        self.assertEqual(result.stdout.strip(), '[]')
+        self.assertEqual(result.stderr, '')
+
+if __name__ == '__main__':
+    unittest.main()
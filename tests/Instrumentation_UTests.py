@@ -0,0 +1,62 @@
+import sys
+import os
+sys.path.append(os.path.abspath('../modules'))
+import unittest
+import instrumentation
+from library_project import Library, Book
+
+class TestInstrumentation(unittest.TestCase):
+
+    def setUp(self):
+        instrumentation.reset()
+
+    def tearDown(self):
+        instrumentation.disable()
+        instrumentation.reset()
+
+    def test_disabled_collects_nothing(self):
+        @instrumentation.timed('work')
+        def work(value):
+            return value * 2
+        self.assertEqual(work(21), 42)
+        instrumentation.count('items')
+        with instrumentation.section('block'):
+            pass
+        self.assertEqual(instrumentation.snapshot(), {'timers': {}, 'counters': {}})
+
+    def test_timers_counters_and_trace(self):
+        traced = []
+        instrumentation.enable(trace=lambda name, seconds: traced.append(name))
+
+        @instrumentation.timed('work')
+        def work(fail):
+            if fail:
+                raise ValueError
+        work(False)
+        with self.assertRaises(ValueError):
+            work(True)
+        with instrumentation.section('block'):
+            instrumentation.count('items', 3)
+        snapshot = instrumentation.snapshot()
+        self.assertEqual(snapshot['timers']['work']['calls'], 2)
+        self.assertGreaterEqual(snapshot['timers']['work']['max'], snapshot['timers']['work']['mean'])
+        self.assertEqual(snapshot['timers']['block']['calls'], 1)
+        self.assertEqual(snapshot['counters'], {'items': 3})
+        self.assertEqual(traced, ['work', 'work', 'block'])
+
+    def test_library_metrics(self):
+        library = Library()
+        library.add_book(Book("9780451524935", "Dystopian Fiction", ["The clock struck thirteen."],
+                              book_info=("Nineteen Eighty-Four", ["George Orwell"], "Signet", "1950")))
+        instrumentation.enable()
+        library.search_by_title("Nineteen Eighty-Four")
+        library.search_by_quote("clock struck")
+        metrics = library.metrics()
+        self.assertEqual(metrics['timers']['search_by_title']['calls'], 1)
+        self.assertEqual(metrics['timers']['search_by_quote']['calls'], 1)
+        self.assertEqual(metrics['indexes']['books'], 1)
+        self.assertEqual(metrics['indexes']['tokens'], 4)
+        self.assertIn('lemma', metrics['caches'])
+
+if __name__ == '__main__':
+    unittest.main()
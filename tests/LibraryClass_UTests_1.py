@@ -40,6 +40,25 @@ class TestLibraryFunctions(unittest.TestCase):
         # Test search_by_quote
         found_books = self.library.search_by_quote("The small town buzzed with the whispers of the old case")
         self.assertEqual(len(found_books), 1)  # Both added books have "text" in their content
+    #4b
+    def test_search_by_quote_pages(self):
+        # Quotes are matched case-insensitively and can report the page they were found on
+        found = self.library.search_by_quote("WORDS BECAME WHISPERS", with_pages=True)
+        self.assertEqual(found, [("Nineteen Eighty-Four - A Novel", 1)])
+        self.assertEqual(self.library.search_by_quote("whispers in the oak"), [])
+    #4c
+    def test_search_by_quote_after_remove(self):
+        self.library.remove_book("To Kill A Mockingbird")
+        self.assertEqual(self.library.search_by_quote("The small town buzzed"), [])
+    #4d
+    def test_search_by_quote_partial_words(self):
+        # Like a substring search, a quote may start or end in the middle of a word
+        self.assertEqual(self.library.search_by_quote("town buzz"), ["To Kill A Mockingbird"])
+        self.assertEqual(self.library.search_by_quote("mall town buzzed wi", with_pages=True), [("To Kill A Mockingbird", 0)])
+        self.assertEqual(self.library.search_by_quote("atchfu"), ["Nineteen Eighty-Four - A Novel", "Nineteen Eighty-Four - A Novel"])
+        self.assertEqual(self.library.search_many(["town buzz"])['quotes'], [[("To Kill A Mockingbird", 0)]])
+        self.assertEqual(self.library.list[0].search_text("own buzz"), [0])
+        self.assertEqual(self.library.search_by_quote("town buzzy"), [])
     #5
     def test_sort_by_author(self):
         # Test sort_by_author
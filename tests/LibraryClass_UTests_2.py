@@ -56,6 +56,34 @@ class TestLibrary(unittest.TestCase):
         #We test to see if the return of freq_author dictionary is correct
         self.assertEqual(self.library.freq_author(), {'Harper Lee': 1, 'George Orwell': 1, 'Paulo Coelho': 1}) #a dictionary with a key of authors and a value of 1 for each author (frequnecy 1)
 
+    def test_author_counts(self):
+        #a book with two authors counts for both of them
+        self.library.add_book(Book('9780062315007', 'Philosophical Fiction', book_info=('Co-written', ['Paulo Coelho', 'Harper Lee'], 'x', '2020')))
+        self.assertEqual(self.library.author_counts(), {'Harper Lee': 2, 'George Orwell': 1, 'Paulo Coelho': 2})
+        self.library.remove_book('To Kill A Mockingbird')
+        self.assertEqual(self.library.author_counts(), {'Harper Lee': 1, 'George Orwell': 1, 'Paulo Coelho': 2})
+
+    def test_genre_counts(self):
+        self.library.remove_book('The Alchemist')
+        self.assertEqual(self.library.genre_counts(), {'Classic Literature': 1, 'Dystopian Fiction': 1})
+
+    def test_progress_follows_bookmarks(self):
+        self.assertEqual(self.library.progress_summary(), {'Not Started': 3, 'Reading in Progress': 0, 'Completed': 0})
+        self.library.list[1].set_bookmark(1)
+        self.library.list[2].set_bookmark(2)
+        self.assertEqual(self.library.books_by_progress('Completed'), ['The Alchemist'])
+        self.library.list[2].reset_bookmark()
+        self.assertEqual(self.library.progress_summary(), {'Not Started': 2, 'Reading in Progress': 1, 'Completed': 0})
+        self.library.remove_book('Nineteen Eighty-Four - A Novel')
+        self.assertEqual(self.library.books_by_progress('Reading in Progress'), [])
+
+    def test_favorites_follow_books(self):
+        self.library.favorite_book('The Alchemist')
+        self.library.list[0].set_favorite(1)
+        self.assertEqual(self.library.list_favorites(), ['To Kill A Mockingbird', 'The Alchemist'])
+        self.library.remove_book('The Alchemist')
+        self.assertEqual(self.library.list_favorites(), ['To Kill A Mockingbird'])
+
     def test_freq_genre(self):
         #We test to see if the return of freq_genre dictionary is correct
         self.assertEqual(self.library.freq_genre(), {'Classic Literature': 1, 'Dystopian Fiction': 1, 'Philosophical Fiction': 1}) #a dictionary with a key of genres and a value of 1 for each genre (frequency 1) 
@@ -63,6 +91,25 @@ class TestLibrary(unittest.TestCase):
     def test_remove_book(self):
         self.library.remove_book('To Kill A Mockingbird')
         self.assertEqual(len(self.library.list), 2)
+        self.assertIsNone(self.library.search_by_title('To Kill A Mockingbird'))
+        self.assertIsNone(self.library.get_by_isbn('9780061120084'))
+        self.assertEqual(self.library.search_by_author('Harper Lee'), [])
+
+    def test_get_by_isbn(self):
+        self.assertEqual(self.library.get_by_isbn('9780062315007').title, 'The Alchemist')
+        self.assertIsNone(self.library.get_by_isbn('9780000000000'))
+
+    def test_search_by_author(self):
+        books = self.library.search_by_author('george orwell')
+        self.assertEqual([book.isbn for book in books], ['9780451524935'])
+
+    def test_duplicate_titles(self):
+        #a second copy of a book makes its title ambiguous
+        self.library.add_book(Book('9780061120084', 'Classic Literature'))
+        self.assertEqual(len(self.library.search_all_by_title('to kill a mockingbird')), 2)
+        with self.assertRaises(ValueError):
+            self.library.search_by_title('To Kill A Mockingbird')
+        self.assertEqual(len(self.library.list), 4)
  
 
 
@@ -0,0 +1,302 @@
+import sys
+import os
+sys.path.append(os.path.abspath('../modules'))
+import unittest
+import ast
+import asyncio
+import concurrent.futures
+import time
+import csv
+import tempfile
+import isbnlib
+from unittest import mock
+import library_project
+from library_project import Library, Book, csv_to_dict, csv_to_jsonl, iter_csv, iter_jsonl, parse_page_list
+from progress_journal import ProgressJournal
+
+def stub_meta(isbn):
+    # Local stand-in for isbnlib.meta so bulk ingestion can be tested without the network
+    if not isbn.isdigit():
+        raise isbnlib.NotValidISBNError(isbn)
+    return {'Title': 'Book ' + isbn, 'Authors': ['Author ' + isbn[-1]], 'Publisher': 'Stub Press', 'Year': '2001'}
+
+class TestBulkIngestion(unittest.TestCase):
+
+    def setUp(self):
+        self.library = Library()
+        self.records = [
+            {'isbn': '9780000000001', 'genre': 'Fantasy', 'text': ['The young wizard stepped into a world unseen.']},
+            {'isbn': 'not-an-isbn', 'genre': 'Fantasy', 'text': ['Nothing to see here.']},
+            {'isbn': '9780000000002', 'genre': 'Mystery', 'text': ['The detective found a clue.', 'The butler did it.']},
+        ]
+
+    def test_add_books_bulk(self):
+        failures = self.library.add_books_bulk(self.records, workers=4, fetch=stub_meta)
+        self.assertEqual([book.title for book in self.library.list], ['Book 9780000000001', 'Book 9780000000002'])
+        self.assertEqual(len(failures), 1)
+        self.assertEqual(failures[0][0]['isbn'], 'not-an-isbn')
+        self.assertIsInstance(failures[0][1], ValueError)
+
+    def test_retry_transient_errors(self):
+        attempts = []
+        def flaky_meta(isbn):
+            attempts.append(isbn)
+            if len(attempts) == 1:
+                raise OSError('temporary failure')
+            return stub_meta(isbn)
+        failures = self.library.add_books_bulk(self.records[:1], workers=1, fetch=flaky_meta, retry_delay=0)
+        self.assertEqual(failures, [])
+        self.assertEqual(len(attempts), 2)
+
+    def test_permanent_errors_are_not_retried(self):
+        attempts = []
+        def offline_meta(isbn):
+            attempts.append(isbn)
+            raise LookupError(isbn)
+        failures = self.library.add_books_bulk(self.records[:1], workers=1, fetch=offline_meta, retry_delay=10)
+        self.assertEqual(len(attempts), 1)
+        self.assertIsInstance(failures[0][1], LookupError)
+
+    def test_add_books_bulk_processes(self):
+        failures = self.library.add_books_bulk(self.records, fetch=stub_meta, processes=2)
+        self.assertEqual(len(self.library.list), 2)
+        self.assertEqual(self.library.list[1].page_count, 2)
+        self.assertEqual(len(failures), 1)
+
+    def test_one_process_pool_per_call(self):
+        pools = []
+        class CountingPool(concurrent.futures.ProcessPoolExecutor):
+            def __init__(self, *args, **kwargs):
+                pools.append(self)
+                super().__init__(*args, **kwargs)
+        records = [{'isbn': '97800000001%02d' % i, 'genre': 'Fantasy', 'text': ['Page %d of the book.' % i]}
+                   for i in range(40)]
+        with mock.patch.object(library_project, 'ProcessPoolExecutor', CountingPool):
+            failures = self.library.add_books_bulk(records, fetch=stub_meta, processes=2, chunk_size=10)
+        self.assertEqual(failures, [])
+        self.assertEqual(len(pools), 1)
+        self.assertEqual([book.isbn for book in self.library.list], [record['isbn'] for record in records])
+        self.assertTrue(all(book.is_analyzed() for book in self.library.list))
+
+class TestParallelAnalysis(unittest.TestCase):
+
+    def setUp(self):
+        self.library = Library()
+        records = [{'isbn': '97800000000%02d' % i, 'genre': 'Fantasy',
+                    'text': ['The young wizard stepped into a world unseen.', 'Magic breathed life into the stones %d.' % i]}
+                   for i in range(10)]
+        self.library.add_books_bulk(records, fetch=stub_meta)
+
+    def test_analyze_in_pool(self):
+        self.assertFalse(any(book.is_analyzed() for book in self.library.list))
+        self.assertEqual(self.library.analyze(workers=2), [])
+        for book in self.library.list:
+            self.assertTrue(book.is_analyzed())
+            self.assertEqual(book.word_dict, book.tally_words())
+            self.assertEqual(book.word_count, book.count_words())
+
+    def test_analyze_in_process(self):
+        self.assertEqual(self.library.analyze(workers=1, books=self.library.list[:3]), [])
+        self.assertEqual([book.is_analyzed() for book in self.library.list[:4]], [True, True, True, False])
+
+class TestStreamingImport(unittest.TestCase):
+
+    def setUp(self):
+        self.tempdir = tempfile.TemporaryDirectory()
+        self.sample = os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'sample_books.csv')
+
+    def tearDown(self):
+        self.tempdir.cleanup()
+
+    def test_parse_page_list(self):
+        pages = ['plain', "it's", 'say "hi"', 'both \' and "', 'tab\there', 'caf\u00e9']
+        self.assertEqual(parse_page_list(repr(pages)), pages)
+        self.assertEqual(parse_page_list('[]'), [])
+        with self.assertRaises(ValueError):
+            parse_page_list("['never closed'")
+
+    def test_iter_csv_matches_literal_eval(self):
+        with open(self.sample, encoding='utf-8') as file:
+            expected = [ast.literal_eval(row[2]) for row in csv.reader(file)]
+        records = iter_csv(self.sample)
+        self.assertEqual(next(records)['text'], expected[0])
+        self.assertEqual([record['text'] for record in csv_to_dict(self.sample)], expected)
+
+    def test_jsonl_round_trip(self):
+        path = os.path.join(self.tempdir.name, 'books.jsonl')
+        self.assertEqual(csv_to_jsonl(self.sample, path), 10)
+        self.assertEqual(list(iter_jsonl(path)), csv_to_dict(self.sample))
+
+    def test_from_csv_streams_in_chunks(self):
+        library, failures = Library.from_csv(self.sample, fetch=stub_meta, chunk_size=3)
+        self.assertEqual(failures, [])
+        self.assertEqual(len(library.list), 10)
+
+class TestAsyncLibrary(unittest.IsolatedAsyncioTestCase):
+
+    async def test_concurrent_adds_share_one_fetch(self):
+        calls = []
+        def counting_meta(isbn):
+            calls.append(isbn)
+            time.sleep(0.05)
+            return stub_meta(isbn)
+        library = Library()
+        book = await library.aadd_isbn('9780000000001', 'Fantasy', ['The young wizard stepped into a world unseen.'],
+                                       fetch=counting_meta)
+        self.assertEqual(book.title, 'Book 9780000000001')
+        books = await asyncio.gather(*[library.aadd_isbn('9780000000002', fetch=counting_meta) for _ in range(3)])
+        self.assertEqual(calls.count('9780000000002'), 1)
+        # The fetch is shared, but each call builds its own Book
+        self.assertEqual(library.search_all_by_title('Book 9780000000002'), books)
+        self.assertIsNot(books[0].authors, books[1].authors)
+        with self.assertRaises(ValueError):
+            await library.aadd_isbn('not-an-isbn', fetch=counting_meta)
+        self.assertEqual(await library.asearch_by_quote('world unseen', with_pages=True), [('Book 9780000000001', 0)])
+
+    def test_library_used_from_several_event_loops(self):
+        library = Library()
+        library.async_concurrency = 1
+        async def add_two(first, second):
+            # With one slot, the second call has to wait for the concurrency limit
+            await asyncio.gather(library.aadd_isbn(first, fetch=stub_meta), library.aadd_isbn(second, fetch=stub_meta))
+        with concurrent.futures.ThreadPoolExecutor(1) as executor:
+            # asyncio.run starts a new event loop every time, like per-request loops do
+            executor.submit(asyncio.run, add_two('9780000000001', '9780000000002')).result()
+            executor.submit(asyncio.run, add_two('9780000000003', '9780000000004')).result()
+        self.assertEqual(len(library.list), 4)
+
+class TestProgressJournal(unittest.TestCase):
+
+    def setUp(self):
+        self.tempdir = tempfile.TemporaryDirectory()
+        self.path = os.path.join(self.tempdir.name, 'progress.jsonl')
+
+    def tearDown(self):
+        self.tempdir.cleanup()
+
+    def make_library(self):
+        library = Library()
+        for isbn in ('9780000000001', '9780000000002'):
+            library.add_book(Book(isbn, 'Fantasy', ['page one', 'page two', 'page three'], book_info=stub_meta(isbn).values()))
+        return library
+
+    def lines(self):
+        with open(self.path) as file:
+            return file.read().splitlines()
+
+    def test_progress_survives_restart(self):
+        library = self.make_library()
+        with ProgressJournal(self.path) as journal:
+            library.attach_journal(journal)
+            library.list[0].set_bookmark(2)
+            library.favorite_book('Book 9780000000002')
+
+        restored = self.make_library()
+        with ProgressJournal(self.path) as journal:
+            restored.attach_journal(journal)
+            self.assertEqual(restored.progress_check(), {'Book 9780000000001': 'Completed',
+                                                         'Book 9780000000002': 'Not Started'})
+            self.assertEqual(restored.list_favorites(), ['Book 9780000000002'])
+            # Books added after the journal was attached get their progress back too
+            restored.remove_book('Book 9780000000001')
+            book = Book('9780000000001', 'Fantasy', ['page one', 'page two', 'page three'],
+                        book_info=stub_meta('9780000000001').values())
+            restored.add_book(book)
+            self.assertEqual(book.get_bookmark(), 2)
+
+    def test_group_commit(self):
+        library = self.make_library()
+        journal = ProgressJournal(self.path, batch_size=3, flush_interval=None)
+        library.attach_journal(journal)
+        book = library.list[0]
+        book.set_bookmark(1)
+        book.set_bookmark(1)
+        book.set_bookmark(2)
+        self.assertEqual(self.lines(), [])
+        book.reset_bookmark()
+        self.assertEqual(len(self.lines()), 3)
+        book.set_bookmark(1)
+        journal.close()
+        self.assertEqual(len(self.lines()), 4)
+        self.assertEqual(ProgressJournal(self.path).get('9780000000001'), (1, 0))
+
+    def test_compaction_and_torn_line(self):
+        with ProgressJournal(self.path, batch_size=1, min_compact_lines=10, compact_ratio=2) as journal:
+            for page in range(25):
+                journal.record('9780000000001', bookmark=page)
+            self.assertLess(len(self.lines()), 10)
+        with open(self.path, 'a') as file:
+            file.write('{"isbn": "9780000000001", "bookm')
+        with ProgressJournal(self.path) as journal:
+            self.assertEqual(journal.state(), {'9780000000001': (24, None)})
+            journal.record('9780000000002', favorite=1)
+        # The torn line was cut off, so the change recorded after it reads back
+        with ProgressJournal(self.path) as journal:
+            self.assertEqual(journal.state(), {'9780000000001': (24, None), '9780000000002': (None, 1)})
+        self.assertTrue(all(line.startswith('{"isbn"') and line.endswith('}') for line in self.lines()))
+
+class TestFullExport(unittest.TestCase):
+
+    def setUp(self):
+        self.tempdir = tempfile.TemporaryDirectory()
+        sample = os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'sample_books.csv')
+        self.library, failures = Library.from_csv(sample, fetch=stub_meta)
+        self.library.list[1].set_bookmark(1)
+        self.library.favorite_book(self.library.list[2].title)
+
+    def tearDown(self):
+        self.tempdir.cleanup()
+
+    def assertSameLibrary(self, restored):
+        self.assertEqual(len(restored.list), len(self.library.list))
+        for original, copy in zip(self.library.list, restored.list):
+            self.assertEqual((copy.isbn, copy.genre, copy.text, copy.title, copy.authors, copy.publisher, copy.year),
+                             (original.isbn, original.genre, original.text, original.title, original.authors,
+                              original.publisher, original.year))
+            self.assertEqual(copy.get_bookmark(), original.get_bookmark())
+            self.assertEqual(copy.get_favorite(), original.get_favorite())
+
+    def test_round_trip_without_lookups(self):
+        path = os.path.join(self.tempdir.name, 'library.csv')
+        self.assertEqual(self.library.export_books(path, chunk_size=3), [path])
+        def no_fetch(isbn):
+            raise AssertionError('export_books rows carry their metadata')
+        restored, failures = Library.from_csv(path, fetch=no_fetch)
+        self.assertEqual(failures, [])
+        self.assertSameLibrary(restored)
+        self.assertEqual(restored.list_favorites(), self.library.list_favorites())
+
+    def test_jsonl_keeps_metadata_and_progress(self):
+        path = os.path.join(self.tempdir.name, 'library.csv')
+        self.library.export_books(path)
+        jsonl_path = os.path.join(self.tempdir.name, 'library.jsonl.gz')
+        self.assertEqual(csv_to_jsonl(path, jsonl_path), len(self.library.list))
+        def no_fetch(isbn):
+            raise AssertionError('the JSON lines records carry their metadata')
+        restored, failures = Library.from_csv(jsonl_path, fetch=no_fetch)
+        self.assertEqual(failures, [])
+        self.assertSameLibrary(restored)
+
+    def test_csv_to_dict_builds_books(self):
+        self.library.add_book(Book('9780000000009', None, ['An untitled page.'],
+                                   book_info=(None, 'Author not found', None, None)))
+        path = os.path.join(self.tempdir.name, 'library.csv')
+        self.library.export_books(path)
+        restored = Library()
+        for record in csv_to_dict(path):
+            restored.add_book(Book(**record))
+        self.assertSameLibrary(restored)
+        self.assertIsNone(restored.list[-1].genre)
+
+    def test_gzip_shards(self):
+        path = os.path.join(self.tempdir.name, 'library.csv.gz')
+        paths = self.library.export_books(path, shards=3)
+        self.assertEqual([os.path.basename(shard) for shard in paths],
+                         ['library-00001-of-00003.csv.gz', 'library-00002-of-00003.csv.gz',
+                          'library-00003-of-00003.csv.gz'])
+        restored, failures = Library.from_csv(paths)
+        self.assertEqual(failures, [])
+        self.assertSameLibrary(restored)
+
+if __name__ == '__main__':
+    unittest.main()
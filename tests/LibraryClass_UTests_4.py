@@ -0,0 +1,428 @@
+import sys
+import os
+sys.path.append(os.path.abspath('../modules'))
+import unittest
+import io
+import pickle
+import tempfile
+from unittest.mock import patch
+from library_project import Library, Book
+from charts import top_counts
+from catalog import UNKNOWN_YEAR
+
+BOOK_DATA = [
+    {"isbn": "9780061120084", "genre": "Classic Literature", "info": ("To Kill A Mockingbird", ["Harper Lee"], "Harper", "2006"),
+     "text": ['The small town buzzed with the whispers of the old case, a tale known to all, yet understood by few.', 'Under the sprawling oak, memories of justice and injustice entwined like the branches above.', "Each passing day brought new eyes to old stories, and the town's history lived anew."]},
+    {"isbn": "9780451524935", "genre": "Dystopian Fiction", "info": ("Nineteen Eighty-Four - A Novel", ["George Orwell"], "Signet", "1950"),
+     "text": ['In the world of constant surveillance, the truth was a commodity few could afford.', 'Words became whispers in the night, a silent rebellion against the ever-watchful eyes.', 'The clock struck thirteen, marking another hour under the watchful presence of Big Brother.']},
+]
+
+class TestLibrarySnapshot(unittest.TestCase):
+
+    def setUp(self):
+        # Books are built with their metadata given, so no ISBN lookup is needed
+        self.library = Library()
+        for data in BOOK_DATA:
+            self.library.add_book(Book(data["isbn"], data["genre"], data["text"], book_info=data["info"]))
+        self.library.list[0].set_bookmark(2)
+        self.library.favorite_book("Nineteen Eighty-Four - A Novel")
+        self.tempdir = tempfile.TemporaryDirectory()
+        self.path = os.path.join(self.tempdir.name, 'library.snap')
+
+    def tearDown(self):
+        self.tempdir.cleanup()
+
+    def assertSameLibrary(self, restored):
+        self.assertEqual(len(restored.list), len(self.library.list))
+        for original, copy in zip(self.library.list, restored.list):
+            self.assertEqual(copy.isbn, original.isbn)
+            self.assertEqual(copy.title, original.title)
+            self.assertEqual(copy.authors, original.authors)
+            self.assertEqual(copy.genre, original.genre)
+            self.assertEqual(list(copy.text), list(original.text))
+            self.assertEqual(copy.get_bookmark(), original.get_bookmark())
+            self.assertEqual(copy.get_favorite(), original.get_favorite())
+
+    def test_save_and_load(self):
+        self.assertEqual(self.library.save(self.path), 2)
+        restored = Library.load(self.path)
+        self.assertSameLibrary(restored)
+        self.assertEqual(restored.list_favorites(), ["Nineteen Eighty-Four - A Novel"])
+        self.assertEqual(restored.search_by_quote("the clock struck thirteen", with_pages=True),
+                         [("Nineteen Eighty-Four - A Novel", 2)])
+
+    def test_load_eagerly(self):
+        self.library.save(self.path)
+        restored = Library.load(self.path, lazy=False)
+        self.assertSameLibrary(restored)
+        self.assertIsInstance(restored.list[0].text, list)
+
+    def test_word_tallies_are_kept(self):
+        self.library.list[0]._store_analysis(3, {'town': 2, 'oak': 1})
+        self.library.save(self.path)
+        restored = Library.load(self.path)
+        self.assertTrue(restored.list[0].is_analyzed())
+        self.assertEqual(restored.list[0].word_dict, {'town': 2, 'oak': 1})
+        self.assertFalse(restored.list[1].is_analyzed())
+
+    def test_not_a_snapshot(self):
+        with open(self.path, 'w') as file:
+            file.write('Title,Author,Genre,ISBN\n' * 10)
+        with self.assertRaises(ValueError):
+            Library.load(self.path)
+
+class TestPageStore(unittest.TestCase):
+
+    def setUp(self):
+        self.library = Library()
+        for data in BOOK_DATA:
+            self.library.add_book(Book(data["isbn"], data["genre"], data["text"], book_info=data["info"]))
+        self.tempdir = tempfile.TemporaryDirectory()
+        self.path = os.path.join(self.tempdir.name, 'pages.store')
+
+    def tearDown(self):
+        self.tempdir.cleanup()
+
+    def test_store_text(self):
+        store = self.library.store_text(self.path)
+        self.assertEqual(len(store), 6)
+        book = self.library.list[1]
+        self.assertEqual(len(book), 3)
+        self.assertEqual(book.page_count, 3)
+        self.assertEqual(book.text[2], BOOK_DATA[1]["text"][2])
+        self.assertEqual(list(book.text), BOOK_DATA[1]["text"])
+        self.assertEqual(book.count_words(), 41)
+        self.assertEqual(book.search_text("big brother"), [2])
+        book.set_bookmark(2)
+        with self.assertRaises(IndexError):
+            book.set_bookmark(3)
+        with self.assertRaises(TypeError):
+            book.text[0] = 'Pages in a store are read-only.'
+
+class TestThemes(unittest.TestCase):
+
+    def setUp(self):
+        self.library = Library()
+        self.books = [Book(data["isbn"], data["genre"], data["text"], book_info=data["info"]) for data in BOOK_DATA]
+        # Word tallies are given, so no text analysis is needed
+        self.books[0]._store_analysis(6, {'town': 3, 'whisper': 2, 'eye': 1})
+        self.books[1]._store_analysis(5, {'whisper': 2, 'clock': 2, 'eye': 1})
+        for book in self.books:
+            self.library.add_book(book)
+
+    def test_themes_by_tf_idf(self):
+        # "whisper" is frequent in both books, so "clock" ranks above it in the second one
+        self.assertEqual(self.library.themes(1), {"To Kill A Mockingbird": ['town'],
+                                                  "Nineteen Eighty-Four - A Novel": ['clock']})
+        self.assertEqual(self.library.themes(2, title="To Kill A Mockingbird"), ['town', 'whisper'])
+        self.assertEqual(self.books[1].themes(1), ['whisper'])
+
+    def test_themes_follow_changes(self):
+        self.library.themes()
+        self.assertEqual(self.library._term_stats.document_frequency('whisper'), 2)
+        self.books[1]._store_analysis(2, {'clock': 2})
+        self.assertEqual(self.library.themes(1, title="Nineteen Eighty-Four - A Novel"), ['clock'])
+        self.library.remove_book("Nineteen Eighty-Four - A Novel")
+        self.assertEqual(self.library._term_stats.document_frequency('clock'), 0)
+        self.assertEqual(len(self.library._term_stats), 1)
+        # Only the words of the remaining book are kept, not the whole shared vocabulary
+        self.assertEqual(self.library._term_stats.vocabulary_size(), 3)
+        self.assertEqual(len(self.library._term_stats.idf_table()), 3)
+        self.library.remove_book("To Kill A Mockingbird")
+        self.library.themes()
+        self.assertEqual(self.library._term_stats.vocabulary_size(), 0)
+        self.assertEqual(self.library._term_stats.total('town'), 0)
+
+    def test_word_index_and_totals(self):
+        self.assertEqual(self.library.books_with_word('whisper'), [("To Kill A Mockingbird", 2),
+                                                                  ("Nineteen Eighty-Four - A Novel", 2)])
+        self.assertEqual(self.library.books_with_word('never used'), [])
+        self.assertEqual(self.library.word_totals(), {'town': 3, 'whisper': 4, 'eye': 2, 'clock': 2})
+        self.assertEqual(self.library.word_totals(top=1), {'whisper': 4})
+        self.library.remove_book("To Kill A Mockingbird")
+        self.assertEqual(self.library.word_totals(), {'whisper': 2, 'clock': 2, 'eye': 1})
+        self.assertEqual(self.library.books_with_word('town'), [])
+
+    def test_similar_books(self):
+        third = Book("9780000000002", "Classic Literature", ["The town clock."],
+                     book_info=("A Town Clock", ["Jane Doe"], "Press", "2020"))
+        third._store_analysis(3, {'town': 2, 'clock': 1})
+        self.library.add_book(third)
+        similar = self.library.similar_books("A Town Clock", k=2)
+        self.assertEqual([title for title, score in similar], ["To Kill A Mockingbird", "Nineteen Eighty-Four - A Novel"])
+        self.assertAlmostEqual(similar[0][1], 6 / (14 ** 0.5 * 5 ** 0.5))
+        self.assertEqual(self.library.similar_books("A Town Clock", k=1, exact=True), similar[:1])
+        self.library.remove_book("To Kill A Mockingbird")
+        self.assertEqual([title for title, score in self.library.similar_books("A Town Clock")],
+                         ["Nineteen Eighty-Four - A Novel"])
+        with self.assertRaises(ValueError):
+            self.library.similar_books("Missing Book")
+
+class TestCompactStorage(unittest.TestCase):
+
+    def test_book_has_no_instance_dict(self):
+        book = Book(BOOK_DATA[0]["isbn"], BOOK_DATA[0]["genre"], BOOK_DATA[0]["text"], book_info=BOOK_DATA[0]["info"])
+        self.assertFalse(hasattr(book, '__dict__'))
+        with self.assertRaises(AttributeError):
+            book.shelf = 'A3'
+
+    def test_word_tally_as_vocabulary_ids(self):
+        book = Book(BOOK_DATA[0]["isbn"], BOOK_DATA[0]["genre"], BOOK_DATA[0]["text"], book_info=BOOK_DATA[0]["info"])
+        book._store_analysis(3, {'town': 2, 'oak': 1})
+        ids, counts = book.word_vector
+        self.assertEqual(ids.typecode, 'I')
+        self.assertEqual([Book.vocabulary.word(word_id) for word_id in ids], ['town', 'oak'])
+        self.assertEqual(list(counts), [2, 1])
+        self.assertEqual(book.word_dict, {'town': 2, 'oak': 1})
+        copy = pickle.loads(pickle.dumps(book))
+        self.assertEqual(copy.word_dict, {'town': 2, 'oak': 1})
+
+    def test_word_dict_is_read_only(self):
+        book = Book(BOOK_DATA[0]["isbn"], BOOK_DATA[0]["genre"], BOOK_DATA[0]["text"], book_info=BOOK_DATA[0]["info"])
+        book._store_analysis(3, {'town': 2, 'oak': 1})
+        # Decoded once, then kept until the tally changes
+        self.assertIs(book.word_dict, book.word_dict)
+        with self.assertRaises(TypeError):
+            book.word_dict['town'] += 1
+        book.word_dict = {'town': 3}
+        self.assertEqual(book.word_dict, {'town': 3})
+        self.assertEqual([Book.vocabulary.word(word_id) for word_id in book.word_vector[0]], ['town'])
+
+    def test_metadata_columns(self):
+        library = Library()
+        books = [Book(data["isbn"], "".join(["Classic ", "Literature"]), data["text"], book_info=data["info"]) for data in BOOK_DATA]
+        for book in books:
+            library.add_book(book)
+        self.assertIs(books[0].genre, books[1].genre)
+        columns = library._columns
+        self.assertEqual(columns.genres, ["Classic Literature"])
+        self.assertEqual(list(columns.years), [2006, 1950])
+        library.remove_book("To Kill A Mockingbird")
+        self.assertEqual(len(columns), 1)
+        library.add_book(Book("9780000000003", None, book_info=("Untitled", "Author not found", "x", "Year not found")))
+        self.assertEqual(columns.genres, ["Classic Literature", None])
+        self.assertEqual(columns.years[0], UNKNOWN_YEAR)
+        # Titles and authors stay on the books only; repeated author names and years are shared
+        self.assertFalse(hasattr(columns, 'titles'))
+        third = Book("9780000000004", None, book_info=("Another", ["".join(["George ", "Orwell"])], "x", "".join(["19", "50"])))
+        library.add_book(third)
+        self.assertIs(third.authors[0], books[1].authors[0])
+        self.assertIs(third.year, books[1].year)
+        self.assertEqual(library.search_by_author("george orwell"), [books[1], third])
+
+class TestSearchMany(unittest.TestCase):
+
+    def setUp(self):
+        self.library = Library()
+        for data in BOOK_DATA:
+            self.library.add_book(Book(data["isbn"], data["genre"], data["text"], book_info=data["info"]))
+
+    def test_matches_single_searches(self):
+        quotes = ["whispers", "watchful", "the clock struck", "not in any book", "whispers", "..."]
+        results = self.library.search_many(quotes, titles=["to kill a mockingbird", "Missing"])
+        self.assertEqual(results['quotes'], [self.library.search_by_quote(quote, with_pages=True) for quote in quotes])
+        self.assertEqual(results['quotes'][0], [("To Kill A Mockingbird", 0), ("Nineteen Eighty-Four - A Novel", 1)])
+        self.assertEqual(results['titles'], [[self.library.list[0]], []])
+
+    def test_quotes_sharing_words(self):
+        # Quotes walked from the same word are checked together, each keeping its own matches
+        quotes = ["the clock", "clock struck", "ock stru", "struck thirteen", "clock struck nine", "CLOCK"]
+        results = self.library.search_many(quotes)
+        self.assertEqual(results['quotes'], [self.library.search_by_quote(quote, with_pages=True) for quote in quotes])
+        self.assertEqual(results['quotes'][2], [("Nineteen Eighty-Four - A Novel", 2)])
+        self.assertEqual(results['quotes'][4], [])
+
+    def test_empty_batch(self):
+        self.assertEqual(self.library.search_many(), {'quotes': [], 'titles': []})
+
+class TestPageEdits(unittest.TestCase):
+
+    def setUp(self):
+        self.library = Library()
+        self.book = Book("9780451524935", "Dystopian Fiction", ["big brother", "the clock struck", "war is peace"],
+                         book_info=("Nineteen Eighty-Four", ["George Orwell"], "Signet", "1950"))
+        self.library.add_book(self.book)
+        # A plain word split stands in for the NLTK tokenizer, and records which pages were tokenized
+        self.tokenized = []
+        def tally(pages):
+            self.tokenized.extend(pages)
+            word_tally = {}
+            for page in pages:
+                for word in page.split():
+                    word_tally[word] = word_tally.get(word, 0) + 1
+            return word_tally
+        patcher = patch('library_project.tally_pages', side_effect=tally)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+        self.book._store_analysis(8, tally(self.book.text))
+        self.tokenized.clear()
+
+    def test_replace_page(self):
+        self.book.replace_page(1, "the clock struck thirteen")
+        self.assertEqual(self.book.text[1], "the clock struck thirteen")
+        self.assertEqual(self.book.word_count, 9)
+        self.assertEqual(self.book.word_dict['thirteen'], 1)
+        # Only the old and the new text of the edited page were tokenized
+        self.assertEqual(self.tokenized, ["the clock struck", "the clock struck thirteen"])
+        self.book.replace_page(1, "the clock")
+        self.assertEqual(self.tokenized[2:], ["the clock"])
+        self.assertNotIn('thirteen', self.book.word_dict)
+        with self.assertRaises(IndexError):
+            self.book.replace_page(3, "freedom is slavery")
+
+    def test_append_and_delete_page(self):
+        self.book.append_page("freedom is slavery")
+        self.assertEqual(self.book.page_count, 4)
+        self.assertEqual(self.book.word_dict['is'], 2)
+        self.book.set_bookmark(3)
+        self.book.delete_page(0)
+        self.assertEqual(self.book.text, ["the clock struck", "war is peace", "freedom is slavery"])
+        self.assertEqual(self.book.word_count, 9)
+        self.assertNotIn('brother', self.book.word_dict)
+        self.assertEqual(self.book.get_bookmark(), 2)
+        self.assertEqual(self.library.progress_check(), {"Nineteen Eighty-Four": 'Completed'})
+
+    def test_bookmark_follows_its_page(self):
+        self.book.append_page("freedom is slavery")
+        self.book.set_bookmark(2)
+        self.book.delete_page(0)
+        self.assertEqual(self.book.get_bookmark(), 1)
+        self.assertEqual(self.book.text[self.book.get_bookmark()], "war is peace")
+        self.assertEqual(self.library.progress_check(), {"Nineteen Eighty-Four": 'Reading in Progress'})
+        self.book.delete_page(2)
+        self.assertEqual(self.book.get_bookmark(), 1)
+        self.assertEqual(self.library.progress_check(), {"Nineteen Eighty-Four": 'Completed'})
+
+    def test_in_place_edit_then_invalidate(self):
+        self.assertEqual(self.library.search_by_quote("clock"), ["Nineteen Eighty-Four"])
+        self.book.text.append("gamma delta")
+        self.book.invalidate_analysis()
+        self.assertEqual(self.book.search_text("gamma"), [3])
+        self.assertEqual(self.library.search_by_quote("gamma", with_pages=True), [("Nineteen Eighty-Four", 3)])
+        by_pages = self.library.sorted_view('page_count')
+        self.book.text.append("epsilon")
+        self.book.invalidate_analysis()
+        self.assertEqual(by_pages[0].page_count, 5)
+
+    def test_search_follows_edits(self):
+        self.assertEqual(self.library.search_by_quote("clock struck", with_pages=True), [("Nineteen Eighty-Four", 1)])
+        self.book.delete_page(0)
+        self.book.replace_page(1, "ignorance is strength")
+        self.book.append_page("big brother is watching")
+        self.assertEqual(self.book.search_text("war"), [])
+        self.assertEqual(self.library.search_by_quote("clock struck", with_pages=True), [("Nineteen Eighty-Four", 0)])
+        self.assertEqual(self.library.search_by_quote("brother", with_pages=True), [("Nineteen Eighty-Four", 2)])
+        self.assertEqual(self.library.search_by_quote("war"), [])
+        self.assertEqual(self.library.books_with_word('war'), [])
+        self.assertEqual(self.library.books_with_word('ignorance'), [("Nineteen Eighty-Four", 1)])
+        self.book.text = ["a new text"]
+        self.assertEqual(self.library.search_by_quote("new text"), ["Nineteen Eighty-Four"])
+        self.assertEqual(self.library.search_by_quote("brother"), [])
+
+class TestSortedViews(unittest.TestCase):
+
+    def setUp(self):
+        self.library = Library()
+        self.books = [
+            Book("9780000000001", "Fantasy", ["one two", "three"], book_info=("B Book", ["Zed Author"], "Press", "2001")),
+            Book("9780000000002", "History", ["one"], book_info=("A Book", 'Author not found', "Press", "1999")),
+            Book("9780000000003", None, ["one two three four"], book_info=("C Book", ["Ann Writer"], "Press", "2001")),
+            Book("9780000000004", "fantasy", ["one", "two", "three"], book_info=("a book", ["Zed Author"], "Press", "n/a")),
+        ]
+        for book in self.books:
+            self.library.add_book(book)
+
+    def titles(self, view):
+        return [book.title for book in view]
+
+    def test_views_do_not_change_library_order(self):
+        self.assertEqual(self.titles(self.library.sorted_view('title')), ["A Book", "a book", "B Book", "C Book"])
+        self.assertEqual(self.titles(self.library.sorted_view('-year', 'title')), ["B Book", "C Book", "A Book", "a book"])
+        self.assertEqual(self.titles(self.library.sorted_view('genre', '-page_count')),
+                         ["C Book", "a book", "B Book", "A Book"])
+        self.assertEqual(self.titles(self.library.sorted_view('word_count')), ["A Book", "B Book", "a book", "C Book"])
+        self.assertEqual(self.library.list, tuple(self.books))
+        with self.assertRaises(ValueError):
+            self.library.sorted_view('publisher')
+
+    def test_sort_by_author(self):
+        # A missing author is the string 'Author not found', sorted as the name of a single author
+        self.library.sort_by_author()
+        self.assertEqual(self.titles(self.library.list), ["C Book", "A Book", "B Book", "a book"])
+
+    def test_views_follow_changes(self):
+        view = self.library.sorted_view('author', 'title')
+        self.assertEqual(self.titles(view), ["C Book", "A Book", "a book", "B Book"])
+        self.library.remove_book("A Book", isbn="9780000000002")
+        self.library.add_book(Book("9780000000005", "Poetry", [], book_info=("D Book", ["Bea Poet"], "Press", "2010")))
+        self.assertEqual(self.titles(view), ["C Book", "D Book", "a book", "B Book"])
+        by_pages = self.library.sorted_view('page_count')
+        self.books[2].append_page("five")
+        self.books[2].append_page("six")
+        self.books[2].append_page("seven")
+        self.assertEqual(self.titles(by_pages)[-1], "C Book")
+        self.assertIs(self.library.sorted_view('page_count'), by_pages)
+
+    def test_views_survive_reordering(self):
+        by_title = self.library.sorted_view('title')
+        by_genre = self.library.sorted_view('genre')
+        by_year = self.library.sorted_view('-year')
+        self.assertEqual(self.titles(by_genre), ["C Book", "B Book", "a book", "A Book"])
+        self.assertEqual(self.titles(by_year)[:2], ["B Book", "C Book"])
+        self.library.sort_by_author()
+        # Same view objects, with ties now broken by the new library order
+        self.assertIs(self.library.sorted_view('genre'), by_genre)
+        self.assertEqual(self.titles(by_year)[:2], ["C Book", "B Book"])
+        self.assertEqual(self.titles(by_genre), ["C Book", "B Book", "a book", "A Book"])
+        self.library.add_book(Book("9780000000005", "Fantasy", [], book_info=("D Book", ["Bea Poet"], "Press", "2010")))
+        self.assertEqual(self.titles(by_genre), ["C Book", "B Book", "a book", "D Book", "A Book"])
+        self.library.list = [self.books[3], self.books[0]]
+        self.assertIs(self.library.sorted_view('title'), by_title)
+        self.assertEqual(self.titles(by_title), ["a book", "B Book"])
+        self.assertEqual(self.titles(by_genre), ["a book", "B Book"])
+        self.library.add_book(self.books[2])
+        self.assertEqual(self.titles(by_title), ["a book", "B Book", "C Book"])
+
+    def test_pages(self):
+        view = self.library.sorted_view('title')
+        self.assertEqual(self.titles(view.page(1, page_size=3)), ["C Book"])
+        self.assertEqual(view.page(2, page_size=3), [])
+        self.assertEqual(self.titles(view[1:3]), ["a book", "B Book"])
+        self.assertEqual(len(view), 4)
+
+class TestCharts(unittest.TestCase):
+
+    def setUp(self):
+        self.library = Library()
+        for data in BOOK_DATA:
+            self.library.add_book(Book(data["isbn"], data["genre"], data["text"], book_info=data["info"]))
+        self.tempdir = tempfile.TemporaryDirectory()
+
+    def tearDown(self):
+        self.tempdir.cleanup()
+
+    def test_top_counts(self):
+        counts = {'a': 5, 'b': 1, 'c': 3, 'd': 1}
+        self.assertEqual(top_counts(counts, 2), [('a', 5), ('c', 3), ('Other', 2)])
+        self.assertEqual(top_counts(counts), list(counts.items()))
+        self.assertEqual(top_counts(counts, 4), list(counts.items()))
+
+    def test_freq_author_to_file(self):
+        path = os.path.join(self.tempdir.name, 'authors.svg')
+        self.assertEqual(self.library.freq_author(output=path), {"Harper Lee": 1, "George Orwell": 1})
+        with open(path, 'rb') as file:
+            self.assertIn(b'<svg', file.read())
+
+    def test_render_charts(self):
+        buffer = io.BytesIO()
+        rendered = self.library.render_charts({'author': None, 'genre': buffer}, fmt='png', top=1)
+        self.assertTrue(rendered['author'].startswith(b'\x89PNG'))
+        self.assertIsNone(rendered['genre'])
+        self.assertTrue(buffer.getvalue().startswith(b'\x89PNG'))
+        with self.assertRaises(ValueError):
+            self.library.render_charts({'publisher': None})
+        with self.assertRaises(ValueError):
+            self.library.freq_genre(output=io.BytesIO(), fmt='gif')
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,89 @@
+import sys
+import os
+sys.path.append(os.path.abspath('../modules'))
+import unittest
+import tempfile
+import isbnlib
+from metadata_cache import MetadataCache
+from library_project import Book
+
+class TestMetadataCache(unittest.TestCase):
+
+    def setUp(self):
+        # A local stand-in for isbnlib.meta that records every call
+        self.calls = []
+        def fetch(isbn):
+            self.calls.append(isbn)
+            if not isbn.isdigit():
+                raise isbnlib.NotValidISBNError(isbn)
+            return {'Title': 'Title ' + isbn, 'Authors': ['Some Author'], 'Publisher': 'Pub', 'Year': '2000'}
+        self.fetch = fetch
+        self.tempdir = tempfile.TemporaryDirectory()
+        self.path = os.path.join(self.tempdir.name, 'meta')
+
+    def tearDown(self):
+        self.tempdir.cleanup()
+
+    def test_lookup_fetches_once(self):
+        cache = MetadataCache(fetch=self.fetch)
+        first = cache.lookup('9780061120084')
+        second = cache.lookup('9780061120084')
+        self.assertEqual(first, second)
+        self.assertEqual(self.calls, ['9780061120084'])
+        self.assertEqual(cache.stats()['hits'], 1)
+
+    def test_negative_caching(self):
+        cache = MetadataCache(fetch=self.fetch)
+        for _ in range(3):
+            with self.assertRaises(isbnlib.NotValidISBNError):
+                cache.lookup('invalid_isbn')
+        self.assertEqual(self.calls, ['invalid_isbn'])
+
+    def test_lru_eviction(self):
+        cache = MetadataCache(maxsize=2, fetch=self.fetch)
+        cache.lookup('1')
+        cache.lookup('2')
+        cache.lookup('1')
+        cache.lookup('3')
+        self.assertEqual(len(cache), 2)
+        self.assertIn('1', cache)
+        self.assertNotIn('2', cache)
+
+    def test_ttl_expiry(self):
+        cache = MetadataCache(ttl=0, fetch=self.fetch)
+        cache.lookup('1')
+        cache.lookup('1')
+        self.assertEqual(self.calls, ['1', '1'])
+
+    def test_disk_store_survives_restart(self):
+        with MetadataCache(path=self.path, fetch=self.fetch) as cache:
+            cache.lookup('9780451524935')
+        with MetadataCache(path=self.path, offline=True, fetch=self.fetch) as cache:
+            self.assertEqual(cache.lookup('9780451524935')['Title'], 'Title 9780451524935')
+        self.assertEqual(self.calls, ['9780451524935'])
+
+    def test_lookup_returns_copies(self):
+        cache = MetadataCache(fetch=self.fetch)
+        cache.lookup('9780061120084')['Authors'].append('Someone Else')
+        record = cache.lookup('9780061120084')
+        self.assertEqual(record['Authors'], ['Some Author'])
+        self.assertIsNot(record['Authors'], cache.lookup('9780061120084')['Authors'])
+
+    def test_books_do_not_share_authors(self):
+        Book.metadata_cache = MetadataCache(fetch=self.fetch)
+        try:
+            first = Book('9780061120084')
+            second = Book('9780061120084')
+        finally:
+            Book.metadata_cache = None
+        first.authors.append('Someone Else')
+        self.assertEqual(second.authors, ['Some Author'])
+
+    def test_offline_miss(self):
+        cache = MetadataCache(offline=True, fetch=self.fetch)
+        with self.assertRaises(LookupError):
+            cache.lookup('9780451524935')
+        self.assertEqual(self.calls, [])
+
+if __name__ == '__main__':
+    unittest.main()